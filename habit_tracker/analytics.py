@@ -1,52 +1,250 @@
-# analytics.py
-"""
-Функции для аналитики привычек: вычисление средних, выявление проблем и советы.
-"""
-
-from typing import List, Dict
-from statistics import mean
-
-from habit_manager import HabitManager
-
-
-def active_habits(habits: List[Dict[str, str]]) -> int:
-    """Количество активных привычек."""
-    return len(habits)
-
-
-def average_streak(habits: List[Dict[str, str]]) -> float:
-    """Средняя длина streak по всем привычкам."""
-    streaks = []
-    for h in habits:
-        try:
-            streaks.append(int(h.get("streak", "0")))
-        except Exception:
-            continue
-    return mean(streaks) if streaks else 0.0
-
-
-def top_problem_habits(habits: List[Dict[str, str]], threshold: float = 50.0) -> List[str]:
-    """
-    Возвращает список привычек, у которых прогресс ниже threshold процентов.
-    """
-    problems = []
-    for h in habits:
-        try:
-            p = float(h.get("progress", "0%").strip().strip("%"))
-            if p < threshold:
-                problems.append(h["name"])
-        except Exception:
-            continue
-    return problems
-
-
-def summary(manager: HabitManager) -> Dict[str, object]:
-    """
-    Возвращает словарь с основными метриками (число привычек, avg streak, проблемные).
-    """
-    habits = manager.list_habits()
-    return {
-        "total": active_habits(habits),
-        "avg_streak": average_streak(habits),
-        "problems": top_problem_habits(habits)
-    }
+# analytics.py
+"""
+Функции для аналитики привычек: вычисление средних, выявление проблем и советы.
+
+Если установлен numpy, функции — тонкие обёртки над колоночным движком
+analytics_engine; иначе используются чистые версии ``*_py`` с тем же
+результатом. Движок (и numpy) импортируется при первом обращении, чтобы
+не замедлять запуск CLI.
+"""
+
+import importlib.util
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional
+from statistics import mean
+
+from habit_manager import HabitManager
+from habit_record import streak_of, progress_of
+from analytics_cache import IncrementalSummary
+from instrumentation import timed
+from notifications import needs_attention
+from storage import JOURNAL_SUFFIX, open_storage
+
+_HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+def _columns(habits: List[Dict[str, str]]):
+    """HabitColumns по habits или None, если numpy не установлен."""
+    if not _HAS_NUMPY:
+        return None
+    from analytics_engine import HabitColumns
+    return HabitColumns(habits)
+
+
+def active_habits(habits: List[Dict[str, str]]) -> int:
+    """Количество активных привычек."""
+    return len(habits)
+
+
+def average_streak_py(habits: List[Dict[str, str]]) -> float:
+    """Средняя длина streak по всем привычкам (чистый Python)."""
+    streaks = []
+    for h in habits:
+        try:
+            streaks.append(streak_of(h))
+        except Exception:
+            continue
+    return mean(streaks) if streaks else 0.0
+
+
+def top_problem_habits_py(habits: List[Dict[str, str]], threshold: float = 50.0) -> List[str]:
+    """
+    Возвращает список привычек, у которых прогресс ниже threshold процентов (чистый Python).
+    """
+    problems = []
+    for h in habits:
+        try:
+            if progress_of(h) < threshold:
+                problems.append(h["name"])
+        except Exception:
+            continue
+    return problems
+
+
+@timed("analytics.average_streak")
+def average_streak(habits: List[Dict[str, str]]) -> float:
+    """Средняя длина streak по всем привычкам."""
+    columns = _columns(habits)
+    if columns is None:
+        return average_streak_py(habits)
+    return columns.mean_streak()
+
+
+@timed("analytics.top_problem_habits")
+def top_problem_habits(habits: List[Dict[str, str]], threshold: float = 50.0) -> List[str]:
+    """
+    Возвращает список привычек, у которых прогресс ниже threshold процентов.
+    """
+    columns = _columns(habits)
+    if columns is None:
+        return top_problem_habits_py(habits, threshold)
+    return columns.below_progress(threshold)
+
+
+@timed("analytics.summary")
+def summary(manager: HabitManager) -> Dict[str, object]:
+    """
+    Возвращает словарь с основными метриками (число привычек, avg streak, проблемные).
+
+    Значения берутся из инкрементального кэша менеджера (analytics_cache);
+    в отладочном режиме кэша результат сверяется с summary_full.
+
+    Raises:
+        RuntimeError: если в отладочном режиме кэш разошёлся с пересчётом.
+    """
+    cache = IncrementalSummary.for_manager(manager)
+    result = cache.summary()
+    if cache.debug:
+        expected = summary_full(manager)
+        if result != expected:
+            raise RuntimeError(f"Кэш аналитики рассогласован: {result} != {expected}")
+    return result
+
+
+@timed("analytics.summary_full")
+def summary_full(manager: HabitManager) -> Dict[str, object]:
+    """Сводка как в summary(), но полным пересчётом по всем привычкам."""
+    habits = manager.list_habits()
+    columns = _columns(habits)
+    if columns is None:
+        return {
+            "total": active_habits(habits),
+            "avg_streak": average_streak_py(habits),
+            "problems": top_problem_habits_py(habits)
+        }
+    return {
+        "total": columns.total(),
+        "avg_streak": columns.mean_streak(),
+        "problems": columns.below_progress()
+    }
+
+
+@timed("analytics.detailed_summary")
+def detailed_summary(manager: HabitManager, days_threshold: int = 3) -> Dict[str, object]:
+    """
+    Расширенная сводка для дашборда: перцентили streak, агрегаты по
+    категориям и число просроченных привычек. Требует numpy.
+    """
+    columns = _columns(manager.list_habits())
+    if columns is None:
+        raise RuntimeError("detailed_summary требует numpy")
+    return {
+        "total": columns.total(),
+        "avg_streak": columns.mean_streak(),
+        "streak_percentiles": columns.streak_percentiles(),
+        "problems": columns.below_progress(),
+        "overdue": columns.overdue_count(days_threshold),
+        "categories": columns.per_category(),
+    }
+
+
+class SummaryAccumulator:
+    """
+    Однопроходная сводка по потоку порций привычек с ограниченной памятью.
+
+    Хранит только счётчики, поэтому подходит для файлов, которые не
+    помещаются в память (см. HabitStorage.iter_chunks).
+    """
+
+    def __init__(self, threshold: float = 50.0, days_threshold: int = 3):
+        self.threshold = threshold
+        self.days_threshold = days_threshold
+        self.total = 0
+        self.streak_sum = 0
+        self.streak_count = 0
+        self.problems = 0
+        self.attention = 0
+
+    def add_chunk(self, habits: List[Dict[str, str]], rows: bool = True) -> List[Dict[str, object]]:
+        """
+        Учитывает порцию и возвращает по строке на привычку для вывода.
+
+        Args:
+            habits: Порция привычек.
+            rows (bool): Собирать строки для вывода (False — только счётчики).
+
+        Returns:
+            list: Словари name, streak, progress, problem, attention.
+        """
+        collected = []
+        attention = set(needs_attention(habits, self.days_threshold))
+        for h in habits:
+            self.total += 1
+            try:
+                streak = streak_of(h)
+                self.streak_sum += streak
+                self.streak_count += 1
+            except Exception:
+                streak = None
+            try:
+                progress = progress_of(h)
+                problem = progress < self.threshold
+            except Exception:
+                progress, problem = None, False
+            self.problems += problem
+            late = h["name"] in attention
+            self.attention += late
+            if rows:
+                collected.append({"name": h["name"], "streak": streak, "progress": progress,
+                                  "problem": problem, "attention": late})
+        return collected
+
+    def merge(self, other: "SummaryAccumulator") -> None:
+        """Добавляет счётчики другого аккумулятора (частичный итог шарда)."""
+        self.total += other.total
+        self.streak_sum += other.streak_sum
+        self.streak_count += other.streak_count
+        self.problems += other.problems
+        self.attention += other.attention
+
+    def result(self) -> Dict[str, object]:
+        """Итог: total, avg_streak, число проблемных и требующих внимания."""
+        return {
+            "total": self.total,
+            "avg_streak": self.streak_sum / self.streak_count if self.streak_count else 0.0,
+            "problems": self.problems,
+            "attention": self.attention,
+        }
+
+
+def _shard_summary(paths: List[str], threshold: float, days_threshold: int) -> SummaryAccumulator:
+    """Частичная сводка по файлам одного шарда (выполняется в процессе пула)."""
+    acc = SummaryAccumulator(threshold, days_threshold)
+    for path in paths:
+        storage = open_storage(path, journal=os.path.exists(path + JOURNAL_SUFFIX))
+        try:
+            for chunk in storage.iter_chunks():
+                acc.add_chunk(chunk, rows=False)
+        finally:
+            storage.close()
+    return acc
+
+
+@timed("analytics.fleet_summary")
+def fleet_summary(store, workers: Optional[int] = None, threshold: float = 50.0,
+                  days_threshold: int = 3) -> Dict[str, object]:
+    """
+    Сводка по всем пользователям ShardedStore.
+
+    Каждый шард агрегируется в отдельном процессе пула (файлы читаются
+    потоково, см. SummaryAccumulator), частичные итоги складываются.
+
+    Args:
+        store (ShardedStore): Хранилище пользователей.
+        workers (int): Размер пула (None — число ядер; 0 — без пула).
+
+    Returns:
+        dict: total, avg_streak, problems, attention, users.
+    """
+    shards = [files for files in store.shard_files() if files]
+    acc = SummaryAccumulator(threshold, days_threshold)
+    if workers == 0 or len(shards) <= 1:
+        partials = [_shard_summary(files, threshold, days_threshold) for files in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(_shard_summary, shards,
+                                     [threshold] * len(shards), [days_threshold] * len(shards)))
+    for partial in partials:
+        acc.merge(partial)
+    return dict(acc.result(), users=sum(len(files) for files in shards))
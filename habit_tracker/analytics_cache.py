@@ -0,0 +1,120 @@
+# analytics_cache.py
+"""
+Инкрементальная сводка аналитики.
+
+IncrementalSummary подписывается на события HabitManager и поддерживает
+агрегаты (число привычек, сумма streak, проблемные привычки, число привычек
+по категориям) за O(1) на изменение, так что summary() не пересчитывает
+всё заново.
+"""
+
+import os
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+from habit_manager import HabitManager
+from habit_record import Habit, normalize_name
+
+DEFAULT_CATEGORY = "Общее"
+
+_caches: "weakref.WeakKeyDictionary[HabitManager, IncrementalSummary]" = weakref.WeakKeyDictionary()
+
+
+class IncrementalSummary:
+    """
+    Агрегаты по привычкам менеджера, обновляемые по событиям.
+
+    Attributes:
+        threshold (float): Порог прогресса для проблемных привычек.
+        debug (bool): Сверять summary() с полным пересчётом (см. analytics.summary).
+        count (int): Число привычек.
+        streak_sum (int): Сумма streak.
+        categories (dict): Категория -> число привычек.
+    """
+
+    def __init__(self, manager: HabitManager, threshold: float = 50.0, debug: bool = False):
+        self._manager = weakref.ref(manager)
+        self.threshold = threshold
+        self.debug = debug
+        self._rebuild(manager)
+        manager.subscribe(self._on_change)
+
+    @classmethod
+    def for_manager(cls, manager: HabitManager) -> "IncrementalSummary":
+        """
+        Кэш, привязанный к manager (создаётся при первом обращении).
+
+        Отладочная сверка включается переменной окружения HABIT_ANALYTICS_DEBUG=1.
+        """
+        cache = _caches.get(manager)
+        if cache is None:
+            cache = cls(manager, debug=os.environ.get("HABIT_ANALYTICS_DEBUG") == "1")
+            _caches[manager] = cache
+        return cache
+
+    def _rebuild(self, manager: HabitManager) -> None:
+        """Полный пересчёт агрегатов (при создании и событии "load")."""
+        self.count = 0
+        self.streak_sum = 0
+        self.categories: Dict[str, int] = {}
+        self._seq: Dict[str, int] = {}
+        self._next_seq = 0
+        self._problems: Dict[str, Tuple[int, str]] = {}
+        self._problem_list: Optional[List[str]] = None
+        for habit in manager.list_habits():
+            self._add(normalize_name(habit.name), habit)
+
+    def _add(self, key: str, habit: Habit) -> None:
+        self._seq[key] = self._next_seq
+        self._next_seq += 1
+        self.count += 1
+        self._apply(key, habit, +1)
+
+    def _remove(self, key: str, habit: Habit) -> None:
+        self.count -= 1
+        self._apply(key, habit, -1)
+        del self._seq[key]
+
+    def _apply(self, key: str, habit: Habit, sign: int) -> None:
+        """Добавляет (sign=+1) или вычитает (-1) вклад записи в агрегаты."""
+        self.streak_sum += sign * habit.streak
+        category = habit.category or DEFAULT_CATEGORY
+        left = self.categories.get(category, 0) + sign
+        if left:
+            self.categories[category] = left
+        else:
+            del self.categories[category]
+        if habit.progress < self.threshold:
+            if sign > 0:
+                self._problems[key] = (self._seq[key], habit.name)
+            else:
+                del self._problems[key]
+            self._problem_list = None
+
+    def _on_change(self, event: str, key: Optional[str],
+                   before: Optional[Habit], after: Optional[Habit]) -> None:
+        if event == "add":
+            self._add(key, after)
+        elif event == "remove":
+            self._remove(key, before)
+        elif event == "update":
+            self._apply(key, before, -1)
+            self._apply(key, after, +1)
+        elif event == "load":
+            manager = self._manager()
+            if manager is not None:
+                self._rebuild(manager)
+
+    def problems(self) -> List[str]:
+        """Проблемные привычки в порядке менеджера (список кэшируется)."""
+        if self._problem_list is None:
+            self._problem_list = [name for _, name in sorted(self._problems.values())]
+        return list(self._problem_list)
+
+    def summary(self) -> Dict[str, object]:
+        """Та же сводка, что analytics.summary, без обхода привычек."""
+        return {
+            "total": self.count,
+            "avg_streak": self.streak_sum / self.count if self.count else 0.0,
+            "problems": self.problems(),
+        }
@@ -0,0 +1,142 @@
+# analytics_engine.py
+"""
+Колоночный движок аналитики на NumPy.
+
+HabitColumns один раз раскладывает привычки по массивам (streak, target,
+progress, день последней отметки, код категории), после чего все метрики
+считаются векторными операциями. Требует numpy; analytics.py использует
+движок, только если numpy установлен.
+"""
+
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from date_codec import today as today_ordinal
+from habit_record import Habit, streak_of, progress_of, last_done_of
+
+
+def _column(habits: Sequence[Mapping], getter: Callable, dtype) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Значения поля и маска корректных строк.
+
+    Строки-словари с неразбираемым значением помечаются как некорректные —
+    так же, как их пропускают чистые функции analytics.
+    """
+    n = len(habits)
+    values = np.zeros(n, dtype=dtype)
+    valid = np.ones(n, dtype=bool)
+    for i, h in enumerate(habits):
+        try:
+            values[i] = getter(h)
+        except Exception:
+            valid[i] = False
+    return values, valid
+
+
+class HabitColumns:
+    """
+    Привычки в виде столбцов NumPy.
+
+    Attributes:
+        names (list): Имена в исходном порядке.
+        streak (np.ndarray): int64.
+        target (np.ndarray): int64.
+        progress (np.ndarray): float64, проценты.
+        last (np.ndarray): int64, порядковый номер дня (0 — не отмечалась).
+        category_codes (np.ndarray): int32, индекс в categories.
+        categories (list): Названия категорий по коду.
+    """
+
+    def __init__(self, habits: Sequence[Mapping]):
+        habits = list(habits)
+        n = len(habits)
+        self.names: List[str] = [h["name"] for h in habits]
+        if all(isinstance(h, Habit) for h in habits):
+            # записи менеджера уже типизированы — без разбора и проверок
+            self.streak = np.fromiter((h.streak for h in habits), np.int64, n)
+            self.target = np.fromiter((h.target for h in habits), np.int64, n)
+            self.progress = np.fromiter((h.progress for h in habits), np.float64, n)
+            self.last = np.fromiter((h.last for h in habits), np.int64, n)
+            self.streak_valid = self.progress_valid = self.last_valid = np.ones(n, dtype=bool)
+        else:
+            self.streak, self.streak_valid = _column(habits, streak_of, np.int64)
+            self.target, _ = _column(habits, lambda h: int(h.get("target", "30")), np.int64)
+            self.progress, self.progress_valid = _column(habits, progress_of, np.float64)
+            self.last, self.last_valid = _column(habits, last_done_of, np.int64)
+        codes: Dict[str, int] = {}
+        self.category_codes = np.fromiter(
+            (codes.setdefault(h.get("category", "Общее") or "Общее", len(codes)) for h in habits),
+            np.int32, n)
+        self.categories: List[str] = list(codes)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def total(self) -> int:
+        """Количество привычек."""
+        return len(self.names)
+
+    def mean_streak(self) -> float:
+        """
+        Средний streak по корректным строкам.
+
+        Сумма берётся в целых числах, поэтому результат совпадает со
+        statistics.mean до последнего бита.
+        """
+        streaks = self.streak[self.streak_valid]
+        if not streaks.size:
+            return 0.0
+        return int(streaks.sum()) / int(streaks.size)
+
+    def streak_percentiles(self, q: Sequence[float] = (50, 90, 99)) -> Dict[float, float]:
+        """Перцентили streak (линейная интерполяция numpy)."""
+        streaks = self.streak[self.streak_valid]
+        if not streaks.size:
+            return {p: 0.0 for p in q}
+        return dict(zip(q, np.percentile(streaks, q).tolist()))
+
+    def below_progress(self, threshold: float = 50.0) -> List[str]:
+        """Имена привычек с прогрессом ниже threshold (в исходном порядке)."""
+        mask = self.progress_valid & (self.progress < threshold)
+        return [self.names[i] for i in np.flatnonzero(mask)]
+
+    def progress_between(self, low: float, high: float) -> List[str]:
+        """Имена привычек с прогрессом в диапазоне [low, high]."""
+        mask = self.progress_valid & (self.progress >= low) & (self.progress <= high)
+        return [self.names[i] for i in np.flatnonzero(mask)]
+
+    def _overdue_mask(self, days_threshold: int, today: Optional[int]) -> np.ndarray:
+        if today is None:
+            today = today_ordinal()
+        return ~self.last_valid | (self.last == 0) | (today - self.last >= days_threshold)
+
+    def overdue(self, days_threshold: int = 3, today: Optional[int] = None) -> List[str]:
+        """Имена привычек без отметки days_threshold дней (как needs_attention)."""
+        return [self.names[i] for i in np.flatnonzero(self._overdue_mask(days_threshold, today))]
+
+    def overdue_count(self, days_threshold: int = 3, today: Optional[int] = None) -> int:
+        """Число привычек без отметки days_threshold дней."""
+        return int(np.count_nonzero(self._overdue_mask(days_threshold, today)))
+
+    def per_category(self) -> Dict[str, Dict[str, float]]:
+        """Число привычек, средний streak и средний прогресс по категориям."""
+        k = len(self.categories)
+        codes = self.category_codes
+        counts = np.bincount(codes, minlength=k)
+
+        def mean_by(values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+            sums = np.bincount(codes[valid], weights=values[valid], minlength=k)
+            n = np.bincount(codes[valid], minlength=k)
+            return np.divide(sums, n, out=np.zeros(k), where=n > 0)
+
+        avg_streak = mean_by(self.streak, self.streak_valid)
+        avg_progress = mean_by(self.progress, self.progress_valid)
+        return {
+            cat: {
+                "count": int(counts[i]),
+                "avg_streak": float(avg_streak[i]),
+                "avg_progress": float(avg_progress[i]),
+            }
+            for i, cat in enumerate(self.categories)
+        }
@@ -0,0 +1,546 @@
+# api_server.py
+"""
+Локальный HTTP/JSON API поверх HabitManager на asyncio (без сторонних
+зависимостей).
+
+Чтение и запись разделены:
+- чтения (список, привычка, сводка, требующие внимания) обслуживаются в
+  цикле событий из неизменяемого снимка Snapshot; если файл изменил другой
+  процесс (сверка метки версии), снимок сначала перестраивает писатель;
+- мутации (добавить, удалить, отметить) кладутся в ограниченную очередь,
+  а единственная задача-писатель забирает всё накопившееся, применяет
+  пачкой внутри HabitManager.batch() в рабочем потоке (одна запись на
+  диск на пачку) и публикует новый снимок. Ответы на мутации отправляются
+  после того, как пачка сохранена.
+
+Ограничения нагрузки: число соединений, длина очереди мутаций (при
+переполнении — 503 с Retry-After), размер тела запроса, таймаут простоя.
+
+Маршруты:
+    GET    /habits                  список привычек
+    GET    /habits/<имя>            одна привычка
+    POST   /habits                  {"name", "category", "frequency", "target"}
+    DELETE /habits/<имя>            удалить
+    POST   /habits/<имя>/mark       {"date": "DD-MM-YYYY"} (по умолчанию сегодня)
+    GET    /summary                 analytics.summary
+    GET    /attention?days=N        notifications.needs_attention
+    GET    /health                  версия снимка и длина очереди
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from analytics import summary
+from habit_manager import HabitManager, HabitError
+from habit_record import Habit, normalize_name
+from instrumentation import count, timed
+from notifications import needs_attention
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_CONNECTIONS = 256
+MAX_PENDING = 1024
+MAX_BATCH = 512
+MAX_BODY = 64 * 1024
+IDLE_TIMEOUT = 30.0
+
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+            431: "Request Header Fields Too Large", 500: "Internal Server Error",
+            503: "Service Unavailable"}
+
+# (статус, тело ответа)
+Response = Tuple[int, Any]
+
+
+class ApiError(Exception):
+    """Ошибка запроса с HTTP-статусом."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Snapshot:
+    """
+    Неизменяемое состояние для чтений.
+
+    JSON каждой записи кодируется один раз и переходит в следующий снимок,
+    если запись не менялась, поэтому список собирается склейкой байтов.
+
+    Attributes:
+        version (int): Номер снимка (растёт с каждой пачкой мутаций).
+        habits (dict): Ключ -> копия записи без истории, в порядке менеджера.
+        summary (dict): analytics.summary на момент снимка.
+    """
+
+    __slots__ = ("version", "habits", "summary", "_rows", "_list_body")
+
+    def __init__(self, version: int, habits: Dict[str, Habit], summary_data: Dict[str, Any],
+                 rows: Optional[Dict[str, bytes]] = None):
+        self.version = version
+        self.habits = habits
+        self.summary = summary_data
+        self._rows: Dict[str, bytes] = rows if rows is not None else {}
+        self._list_body: Optional[bytes] = None
+
+    def row_body(self, key: str) -> Optional[bytes]:
+        """JSON одной записи по ключу (None, если её нет)."""
+        body = self._rows.get(key)
+        if body is None:
+            habit = self.habits.get(key)
+            if habit is None:
+                return None
+            body = self._rows[key] = _dumps(habit.to_row())
+        return body
+
+    def list_body(self) -> bytes:
+        """JSON списка привычек (собирается один раз на снимок)."""
+        if self._list_body is None:
+            self._list_body = b"[" + b",".join(self.row_body(k) for k in self.habits) + b"]"
+        return self._list_body
+
+    def patched(self, version: int, habits: Dict[str, Habit], summary_data: Dict[str, Any],
+                changed: Set[str]) -> "Snapshot":
+        """Следующий снимок, переиспользующий JSON неизменённых записей."""
+        rows = dict(self._rows)
+        for key in changed:
+            rows.pop(key, None)
+        return Snapshot(version, habits, summary_data, rows)
+
+
+class RawJson(bytes):
+    """Уже закодированное тело ответа."""
+
+
+def _dumps(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+class HabitServer:
+    """
+    HTTP-сервер API.
+
+    Args:
+        manager (HabitManager): Хранилище привычек; после start() трогается
+            только из потока писателя.
+        max_connections (int): Одновременных соединений.
+        max_pending (int): Мутаций в очереди до отказа 503.
+        max_batch (int): Мутаций в одной пачке писателя.
+    """
+
+    def __init__(self, manager: HabitManager, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 max_connections: int = MAX_CONNECTIONS, max_pending: int = MAX_PENDING,
+                 max_batch: int = MAX_BATCH, max_body: int = MAX_BODY,
+                 idle_timeout: float = IDLE_TIMEOUT):
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.max_body = max_body
+        self.idle_timeout = idle_timeout
+        self.flushes = 0
+        self.rejected = 0
+        self.snapshot = self._build_snapshot(0)
+        self._connections = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._reloaded = False
+        manager.subscribe(self._on_change)
+
+    # --- снимки -----------------------------------------------------------
+
+    def _on_change(self, event: str, key, before, after) -> None:
+        if event == "load":
+            self._reloaded = True
+
+    def _build_snapshot(self, version: int) -> Snapshot:
+        habits = {normalize_name(h.name): h.snapshot() for h in self.manager.list_habits()}
+        return Snapshot(version, habits, summary(self.manager))
+
+    def _patch_snapshot(self, changed: Set[str]) -> Snapshot:
+        """Новый снимок: копия словаря старого с заменой изменённых записей."""
+        if self._reloaded:
+            self._reloaded = False
+            return self._build_snapshot(self.snapshot.version + 1)
+        habits = dict(self.snapshot.habits)
+        for key in changed:
+            try:
+                habits[key] = self.manager.find_habit(key).snapshot()
+            except HabitError:
+                habits.pop(key, None)
+        return self.snapshot.patched(self.snapshot.version + 1, habits, summary(self.manager), changed)
+
+    # --- писатель ---------------------------------------------------------
+
+    def _apply(self, op: str, args: Dict[str, Any]) -> Tuple[str, Response]:
+        """Одна мутация (в потоке писателя). Возвращает (ключ, ответ)."""
+        name = args.get("name")
+        if not isinstance(name, str):
+            raise ApiError(400, "name должно быть строкой")
+        key = normalize_name(name)
+        if op == "add":
+            for field in ("category", "frequency"):
+                if args.get(field) is not None and not isinstance(args[field], str):
+                    raise ApiError(400, f"{field} должно быть строкой")
+            target = args.get("target", 30)
+            if isinstance(target, bool) or not isinstance(target, int) or target <= 0:
+                raise ApiError(400, "target должно быть положительным целым числом")
+            try:
+                self.manager.find_habit(name)
+            except HabitError:
+                pass
+            else:
+                raise ApiError(409, "Привычка с таким именем уже существует.")
+            self.manager.add_habit(name, category=args.get("category") or "Общее",
+                                   frequency=args.get("frequency") or "daily", target=target)
+            return key, (201, self.manager.find_habit(name).to_row())
+        try:
+            habit = self.manager.find_habit(name)
+        except HabitError as exc:
+            raise ApiError(404, str(exc))
+        if op == "remove":
+            self.manager.remove_habit(name)
+            return key, (200, {"removed": habit.name})
+        if not isinstance(args.get("date") or "", str):
+            raise ApiError(400, "date должно быть строкой")
+        try:
+            self.manager.mark_done(name, args.get("date") or "")
+        except ValueError as exc:
+            raise ApiError(400, str(exc))
+        return key, (200, habit.to_row())
+
+    @timed("api.flush")
+    def _apply_batch(self, items: List[Tuple[str, Dict[str, Any]]]) -> Tuple[List[Response], Snapshot]:
+        """
+        Применяет пачку мутаций с одним сохранением (в рабочем потоке).
+
+        Ошибка отдельной мутации не откатывает остальные: проверки делаются
+        до изменения, поэтому неудачная мутация ничего не меняет. Элемент
+        "refresh" ничего не меняет: данные перечитываются в начале пачки.
+        """
+        self.manager.refresh()
+        responses: List[Response] = []
+        changed: Set[str] = set()
+        try:
+            with self.manager.batch():
+                for op, args in items:
+                    if op == "refresh":
+                        responses.append((200, None))
+                        continue
+                    try:
+                        key, response = self._apply(op, args)
+                        changed.add(key)
+                    except ApiError as exc:
+                        response = (exc.status, {"error": str(exc)})
+                    except HabitError as exc:
+                        response = (400, {"error": str(exc)})
+                    except Exception as exc:  # неожиданная ошибка — только этому запросу
+                        response = (500, {"error": str(exc)})
+                    responses.append(response)
+        except HabitError as exc:
+            # пачка не сохранилась: всем её запросам — 500, снимок строится заново
+            self._reloaded = True
+            responses = [(500, {"error": str(exc)})] * len(items)
+        return responses, self._patch_snapshot(changed)
+
+    async def _writer_loop(self) -> None:
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            items = [(op, args) for op, args, _ in batch]
+            try:
+                responses, snapshot = await asyncio.to_thread(self._apply_batch, items)
+            except Exception as exc:  # не даём писателю умереть
+                responses = [(500, {"error": str(exc)})] * len(batch)
+                snapshot = self.snapshot
+            self.snapshot = snapshot
+            self.flushes += 1
+            count("api.mutations", len(batch))
+            for (_, _, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response)
+
+    async def _submit(self, op: str, args: Dict[str, Any]) -> Response:
+        """Ставит мутацию в очередь писателя; при переполнении — 503."""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((op, args, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise ApiError(503, "Сервер перегружен, повторите позже.")
+        return await future
+
+    async def _fresh_snapshot(self) -> Snapshot:
+        """Текущий снимок; если файл изменил другой процесс — после перечитывания."""
+        try:
+            stale = self.manager.is_stale()
+        except HabitError:
+            stale = False
+        if stale:
+            try:
+                await self._submit("refresh", {})
+            except ApiError:  # очередь переполнена: отдаём что есть
+                pass
+        return self.snapshot
+
+    # --- маршрутизация ----------------------------------------------------
+
+    async def handle(self, method: str, target: str, body: bytes) -> Response:
+        """Обрабатывает запрос: метод, путь с query, тело."""
+        url = urlsplit(target)
+        parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        snapshot = await self._fresh_snapshot() if method == "GET" else self.snapshot
+        if parts == ["habits"]:
+            if method == "GET":
+                return 200, RawJson(snapshot.list_body())
+            if method == "POST":
+                return await self._submit("add", _json_body(body))
+        elif len(parts) == 2 and parts[0] == "habits":
+            if method == "GET":
+                body = snapshot.row_body(normalize_name(parts[1]))
+                if body is None:
+                    raise ApiError(404, "Привычка не найдена.")
+                return 200, RawJson(body)
+            if method == "DELETE":
+                return await self._submit("remove", {"name": parts[1]})
+        elif len(parts) == 3 and parts[0] == "habits" and parts[2] == "mark":
+            if method == "POST":
+                args = _json_body(body) if body else {}
+                return await self._submit("mark", {"name": parts[1], "date": args.get("date", "")})
+        elif parts == ["summary"] and method == "GET":
+            return 200, snapshot.summary
+        elif parts == ["attention"] and method == "GET":
+            try:
+                days = int(parse_qs(url.query).get("days", ["3"])[0])
+            except ValueError:
+                raise ApiError(400, "days должно быть целым числом")
+            return 200, needs_attention(list(snapshot.habits.values()), days_threshold=days)
+        elif parts == ["health"] and method == "GET":
+            return 200, {"version": snapshot.version, "pending": self._queue.qsize(),
+                         "flushes": self.flushes, "connections": self._connections}
+        else:
+            raise ApiError(404, "Нет такого маршрута.")
+        raise ApiError(405, "Метод не поддерживается.")
+
+    # --- HTTP -------------------------------------------------------------
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self._connections >= self.max_connections:
+            self.rejected += 1
+            writer.write(_response(503, {"error": "Слишком много соединений."}, False))
+            await _close(writer)
+            return
+        self._connections += 1
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.idle_timeout)
+                except asyncio.LimitOverrunError:
+                    writer.write(_response(431, {"error": "Слишком длинные заголовки."}, False))
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                try:
+                    request_line, *lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+                    method, target, version = request_line.split(" ", 2)
+                    headers = {}
+                    for line in lines:
+                        name, _, value = line.partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length", "0"))
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    writer.write(_response(400, {"error": "Неверный запрос."}, False))
+                    break
+                if length > self.max_body:
+                    writer.write(_response(413, {"error": "Слишком большое тело запроса."}, False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = (version == "HTTP/1.1"
+                              and headers.get("connection", "").lower() != "close")
+                try:
+                    status, payload = await self.handle(method, target, body)
+                except ApiError as exc:
+                    status, payload = exc.status, {"error": str(exc)}
+                    if status == 503:
+                        keep_alive = False
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections -= 1
+            await _close(writer)
+
+    async def start(self) -> None:
+        """Запускает писателя и слушающий сокет (port=0 — любой свободный)."""
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._writer = asyncio.create_task(self._writer_loop())
+        self._server = await asyncio.start_server(self._connection, self.host, self.port,
+                                                  limit=self.max_body)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Перестаёт принимать соединения, дожидается очереди мутаций."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        while self._queue is not None and not self._queue.empty():
+            await asyncio.sleep(0.01)
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+        self.manager.unsubscribe(self._on_change)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+
+def _json_body(body: bytes) -> Dict[str, Any]:
+    try:
+        data = json.loads(body.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError):
+        raise ApiError(400, "Тело запроса должно быть JSON.")
+    if not isinstance(data, dict):
+        raise ApiError(400, "Тело запроса должно быть JSON-объектом.")
+    return data
+
+
+def _response(status: int, payload: Any, keep_alive: bool) -> bytes:
+    body = payload if isinstance(payload, RawJson) else _dumps(payload)
+    head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+    if status == 503:
+        head += "Retry-After: 1\r\n"
+    return head.encode("latin-1") + b"\r\n" + body
+
+
+async def _close(writer: asyncio.StreamWriter) -> None:
+    try:
+        writer.close()
+        await writer.wait_closed()
+    except (ConnectionError, OSError):
+        pass
+
+
+# --- клиент и нагрузочный тест -------------------------------------------
+
+class ApiClient:
+    """Минимальный HTTP/1.1 клиент с keep-alive (для тестов и нагрузки)."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, data: Any = None,
+                      decode: bool = True) -> Tuple[int, Any]:
+        """Отправляет запрос и возвращает (статус, разобранный JSON или байты при decode=False)."""
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        body = _dumps(data) if data is not None else b""
+        self._writer.write((f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                            f"Content-Length: {len(body)}\r\n\r\n").encode("utf-8") + body)
+        await self._writer.drain()
+        head = await self._reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lines[1:] if l)}
+        payload = await self._reader.readexactly(int(headers["content-length"]))
+        if decode:
+            payload = json.loads(payload)
+        if headers.get("connection") == "close":
+            await self.close()
+        return status, payload
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            await _close(self._writer)
+            self._reader = self._writer = None
+
+
+async def load_test(server: HabitServer, total: int = 2000, concurrency: int = 32,
+                    write_ratio: float = 0.2) -> Dict[str, float]:
+    """
+    Нагрузочный тест в том же процессе: concurrency клиентов с keep-alive
+    делают total запросов (доля write_ratio — отметки выполнения, остальное
+    — чтения списка, сводки и отдельных привычек).
+
+    Returns:
+        dict: requests, seconds, rps, p50_ms, p99_ms, errors, flushes.
+    """
+    names = list(server.snapshot.habits.values())
+    if not names:
+        raise HabitError("Для нагрузочного теста нужна хотя бы одна привычка.")
+    latencies: List[float] = []
+    errors = 0
+    loop = asyncio.get_running_loop()
+    counter = iter(range(total))
+    flushes_before = server.flushes
+
+    async def worker(n: int) -> None:
+        nonlocal errors
+        client = ApiClient(server.host, server.port)
+        try:
+            for i in counter:
+                habit = quote(names[(i * 7 + n) % len(names)].name)
+                roll = (i * 0.6180339887) % 1.0
+                start = loop.time()
+                if roll < write_ratio:
+                    status, _ = await client.request("POST", f"/habits/{habit}/mark", {}, False)
+                elif roll < write_ratio + 0.1:
+                    status, _ = await client.request("GET", "/habits", decode=False)
+                elif roll < write_ratio + 0.3:
+                    status, _ = await client.request("GET", "/summary", decode=False)
+                else:
+                    status, _ = await client.request("GET", f"/habits/{habit}", decode=False)
+                latencies.append(loop.time() - start)
+                errors += status >= 400
+        finally:
+            await client.close()
+
+    start = loop.time()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    seconds = loop.time() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": seconds,
+        "rps": len(latencies) / seconds if seconds else 0.0,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "errors": errors,
+        "flushes": server.flushes - flushes_before,
+    }
+
+
+async def serve(manager: HabitManager, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    """Запускает сервер до отмены (Ctrl+C)."""
+    server = HabitServer(manager, host, port)
+    await server.start()
+    print(f"Habit Tracker API: http://{server.host}:{server.port}/habits")
+    try:
+        await server._server.serve_forever()
+    finally:
+        await server.stop()
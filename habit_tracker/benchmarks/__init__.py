@@ -0,0 +1,8 @@
+# benchmarks/__init__.py
+"""
+Бенчмарки горячих путей Habit Tracker.
+
+Запуск из каталога habit_tracker:
+    python -m benchmarks.run --sizes 1000 10000 --out results.json
+    python -m benchmarks.run --baseline results.json
+"""
@@ -0,0 +1,53 @@
+# benchmarks/bench_api.py
+"""
+Нагрузочный тест api_server в одном процессе.
+
+Запуск из каталога habit_tracker:
+    python -m benchmarks.bench_api --habits 10000 --requests 20000 --concurrency 64
+Сервер поднимается на свободном порту поверх сгенерированного набора
+(datagen) во временном каталоге; клиенты с keep-alive смешивают чтения и
+отметки выполнения. Печатаются запросы в секунду, p50/p99 и сколько раз
+писатель сбрасывал данные на диск.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+
+from api_server import HabitServer, load_test
+from benchmarks.datagen import generate_csv
+from habit_manager import HabitManager
+
+
+async def _run(path: str, total: int, concurrency: int, write_ratio: float) -> dict:
+    server = HabitServer(HabitManager(file_path=path), port=0)
+    await server.start()
+    try:
+        return await load_test(server, total, concurrency, write_ratio)
+    finally:
+        await server.stop()
+
+
+def run(habits: int, total: int, concurrency: int, write_ratio: float, seed: int = 42) -> dict:
+    with tempfile.TemporaryDirectory(prefix="habit_api_") as workdir:
+        path = generate_csv(os.path.join(workdir, "habits.csv"), habits, seed)
+        return asyncio.run(_run(path, total, concurrency, write_ratio))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест api_server")
+    parser.add_argument("--habits", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args(argv)
+    r = run(args.habits, args.requests, args.concurrency, args.write_ratio)
+    print(f"запросов {r['requests']} за {r['seconds']:.2f} с: {r['rps']:.0f} req/s, "
+          f"p50 {r['p50_ms']:.2f} мс, p99 {r['p99_ms']:.2f} мс, ошибок {r['errors']}, "
+          f"сбросов на диск {r['flushes']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
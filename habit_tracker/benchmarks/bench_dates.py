@@ -0,0 +1,61 @@
+# benchmarks/bench_dates.py
+"""
+Микробенчмарк date_codec против datetime.strptime.
+
+Запуск из каталога habit_tracker:
+    python -m benchmarks.bench_dates --count 200000
+Сравниваются уникальные строки (чистый разбор без memo) и поток с
+повторами, как в реальном CSV, где много строк с одинаковыми датами.
+"""
+
+import argparse
+import random
+import time
+from datetime import date, datetime
+
+import date_codec
+from date_codec import DATE_FORMAT, parse_day
+
+
+def _time(fn, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return time.perf_counter() - start
+
+
+def run(count: int, seed: int = 42) -> dict:
+    """Секунды на разбор count строк для strptime и parse_day."""
+    rng = random.Random(seed)
+    base = date(2020, 1, 1).toordinal()
+    repeated = [date.fromordinal(base + rng.randrange(730)).strftime(DATE_FORMAT)
+                for _ in range(count)]
+    unique_days = list(range(base, base + count))
+    unique = [date.fromordinal(d).strftime(DATE_FORMAT) for d in unique_days]
+
+    strptime = lambda text: datetime.strptime(text, DATE_FORMAT).toordinal()
+    date_codec._parse.cache_clear()
+    results = {
+        "strptime_unique": _time(strptime, unique),
+        "codec_unique": _time(parse_day, unique),
+        "strptime_repeated": _time(strptime, repeated),
+    }
+    date_codec._parse.cache_clear()
+    results["codec_repeated"] = _time(parse_day, repeated)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="date_codec vs strptime")
+    parser.add_argument("--count", type=int, default=200000)
+    args = parser.parse_args(argv)
+    r = run(args.count)
+    for kind in ("unique", "repeated"):
+        slow, fast = r[f"strptime_{kind}"], r[f"codec_{kind}"]
+        print(f"{kind:9} strptime {slow / args.count * 1e9:7.0f} нс/дата   "
+              f"parse_day {fast / args.count * 1e9:7.0f} нс/дата   x{slow / fast:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
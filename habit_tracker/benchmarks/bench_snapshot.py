@@ -0,0 +1,116 @@
+# benchmarks/bench_snapshot.py
+"""
+Холодный старт: CSV против бинарного снимка (mmap).
+
+Запуск из каталога habit_tracker:
+    python -m benchmarks.bench_snapshot --count 1000000
+Каждый замер — отдельный процесс: старт HabitManager и первый запрос
+(find_habit одной привычки или list_habits всех). Для CSV менеджер
+загружает и разбирает весь файл; со снимком старт читает только
+заголовок, find_habit декодирует одну строку. Печатаются время от
+создания менеджера до ответа, полное время процесса и пиковый RSS.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.datagen import generate_csv
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("csv", "snapshot")
+SCENARIOS = ("find", "list")
+
+
+def _peak_rss_kb():
+    # в Linux ru_maxrss наследуется через exec от родителя, VmHWM — нет
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS отдаёт байты
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def child(mode: str, scenario: str, path: str, name: str) -> dict:
+    """Один холодный старт (вызывается в отдельном процессе)."""
+    from habit_manager import HabitManager
+    from storage import CsvStorage
+
+    start = time.perf_counter()
+    manager = HabitManager(storage=CsvStorage(path)) if mode == "csv" else HabitManager(file_path=path)
+    if scenario == "find":
+        found = 1 if manager.find_habit(name) is not None else 0
+    else:
+        found = len(manager.list_habits())
+    return {"seconds": time.perf_counter() - start, "found": found, "rss_kb": _peak_rss_kb()}
+
+
+def _spawn(mode: str, scenario: str, path: str, name: str) -> dict:
+    started = time.perf_counter()
+    out = subprocess.run([sys.executable, "-m", "benchmarks.bench_snapshot", "--child",
+                          mode, scenario, path, name],
+                         cwd=APP_DIR, capture_output=True, text=True, check=True).stdout
+    result = json.loads(out)
+    result["wall"] = time.perf_counter() - started
+    return result
+
+
+def run(count: int, seed: int = 42) -> dict:
+    """Замеры для набора из count привычек во временном каталоге."""
+    from habit_manager import HabitManager
+
+    with tempfile.TemporaryDirectory(prefix="habit_snap_") as workdir:
+        path = generate_csv(os.path.join(workdir, "habits.csv"), count, seed)
+        # первое открытие пишет историю и снимок; CSV-путь читает те же файлы
+        manager = HabitManager(file_path=path)
+        manager.add_habit("Снимок")
+        start = time.perf_counter()
+        manager.compact()
+        build = time.perf_counter() - start
+        manager.close()
+        name = "Бег 0" if count else "Снимок"
+        results = {"count": count, "build_seconds": build,
+                   "csv_bytes": os.path.getsize(path) + os.path.getsize(path + ".history"),
+                   "snapshot_bytes": os.path.getsize(path + ".snap")}
+        for scenario in SCENARIOS:
+            for mode in MODES:
+                results[f"{mode}_{scenario}"] = _spawn(mode, scenario, path, name)
+        return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Холодный старт: CSV против снимка")
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--child", nargs=4, metavar=("MODE", "SCENARIO", "PATH", "NAME"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        print(json.dumps(child(*args.child)))
+        return 0
+    r = run(args.count)
+    print(f"{r['count']} привычек: CSV+история {r['csv_bytes'] / 2 ** 20:.1f} МБ, "
+          f"снимок {r['snapshot_bytes'] / 2 ** 20:.1f} МБ, запись {r['build_seconds']:.2f} с")
+    for scenario in SCENARIOS:
+        for mode in MODES:
+            m = r[f"{mode}_{scenario}"]
+            rss = f"{m['rss_kb'] / 1024:7.1f} МБ" if m["rss_kb"] is not None else "      —"
+            print(f"{scenario:4} {mode:8} старт+запрос {m['seconds']:7.3f} с   "
+                  f"процесс {m['wall']:7.3f} с   RSS {rss}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+# benchmarks/datagen.py
+"""
+Генератор синтетических habits.csv для бенчмарков.
+
+Данные воспроизводимы (seed) и похожи на реальные: категории с неравными
+весами, разные частоты, даты начала за последние два года, большинство
+привычек отмечалось недавно, часть — давно или ни разу. streak не больше
+числа дней с начала, progress согласован со streak и target.
+"""
+
+import argparse
+import csv
+import random
+from datetime import date
+from typing import Optional
+
+from habit_entry import DATE_FORMAT
+from habit_record import FIELDNAMES
+
+CATEGORIES = [("Здоровье", 30), ("Спорт", 20), ("Учёба", 15), ("Работа", 12),
+              ("Общее", 10), ("Финансы", 6), ("Хобби", 5), ("Дом", 2)]
+FREQUENCIES = [("daily", 80), ("weekly", 15), ("every 3 days", 5)]
+BASE_NAMES = ["Бег", "Чтение", "Медитация", "Вода", "Английский", "Растяжка",
+              "Сон до 23", "Планирование", "Прогулка", "Дневник"]
+
+
+def _date(ordinal: int) -> str:
+    return date.fromordinal(ordinal).strftime(DATE_FORMAT)
+
+
+def generate_csv(path: str, count: int, seed: int = 42, today: Optional[int] = None) -> str:
+    """
+    Пишет CSV с count привычками и возвращает путь.
+
+    Args:
+        path (str): Куда писать.
+        count (int): Число привычек (имена уникальны).
+        seed (int): Зерно генератора.
+        today (int): Порядковый номер «сегодня» (по умолчанию текущая дата).
+    """
+    rng = random.Random(seed)
+    today = today or date.today().toordinal()
+    categories, cat_weights = zip(*CATEGORIES)
+    frequencies, freq_weights = zip(*FREQUENCIES)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDNAMES)
+        for i in range(count):
+            start = today - rng.randrange(730)
+            roll = rng.random()
+            if roll < 0.7:
+                last = today - rng.randrange(min(30, today - start + 1))
+            elif roll < 0.9:
+                last = start + rng.randrange(today - start + 1)
+            else:
+                last = 0
+            streak = rng.randint(1, min(60, last - start + 1)) if last else 0
+            target = rng.choice((7, 14, 21, 30, 60, 90))
+            writer.writerow([
+                f"{BASE_NAMES[i % len(BASE_NAMES)]} {i}",
+                rng.choices(categories, cat_weights)[0],
+                rng.choices(frequencies, freq_weights)[0],
+                _date(start),
+                _date(last) if last else "",
+                streak,
+                target,
+                f"{round(streak / target * 100, 1)}%",
+            ])
+    return path
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Синтетический habits.csv")
+    parser.add_argument("path")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    generate_csv(args.path, args.count, args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
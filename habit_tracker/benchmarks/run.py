@@ -0,0 +1,203 @@
+# benchmarks/run.py
+"""
+Запуск бенчмарков и сравнение с базовой линией.
+
+Для каждого размера набора генерируется habits.csv (datagen), затем
+замеряются холодный старт HabitManager с первым find_habit (load_find) и
+с полным list_habits (load_list) — ленивое хранилище при создании
+менеджера данных не читает, — add_habit, find_habit, mark_done,
+_save_habits, analytics.summary, notifications.needs_attention,
+HabitManager.search (по началу слова, подстроке и с фильтрами) и
+построение фигур visualizer (если установлен matplotlib). Результат —
+JSON с медианой и минимумом времени на операцию; с --baseline текущий
+прогон сравнивается с сохранённым, регрессии печатаются, код выхода 1.
+Бенчмарки, которых нет в базовой линии (например, load@N из старых
+прогонов), не сравниваются — после смены набора замеров её нужно
+пересохранить через --out.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.datagen import generate_csv
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_TOLERANCE = 0.25
+# на больших наборах каждая запись переписывает весь файл — меньше повторов
+DEFAULT_REPEAT = 5
+
+
+def measure(fn: Callable[[], None], ops: int = 1, repeat: int = DEFAULT_REPEAT,
+            setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """
+    Замер fn (ops операций за вызов) repeat раз.
+
+    Returns:
+        dict: median и min — секунды на одну операцию; ops, repeat.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) / ops)
+    return {"median": statistics.median(times), "min": min(times), "ops": ops, "repeat": repeat}
+
+
+def bench_size(size: int, workdir: str, seed: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    """Все бенчмарки для набора из size привычек."""
+    from habit_manager import HabitManager, DATE_FORMAT
+    from analytics import summary, summary_full
+    from notifications import needs_attention
+
+    source = generate_csv(os.path.join(workdir, f"source_{size}.csv"), size, seed)
+    path = os.path.join(workdir, f"habits_{size}.csv")
+
+    def fresh_copy():
+        shutil.copyfile(source, path)
+        for suffix in (".history", ".snap"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    fresh_copy()
+    manager = HabitManager(file_path=path)
+    habits = manager.list_habits()
+    names = [habits[i * 7919 % size].name for i in range(min(1000, size))]
+    manager.close()
+
+    results = {}
+    results["load_find"] = measure(lambda: HabitManager(file_path=path).find_habit(names[0]),
+                                   repeat=repeat, setup=fresh_copy)
+    results["load_list"] = measure(lambda: HabitManager(file_path=path).list_habits(),
+                                   repeat=repeat, setup=fresh_copy)
+
+    fresh_copy()
+    manager = HabitManager(file_path=path)
+
+    counter = iter(range(10 ** 9))
+    results["add_habit"] = measure(
+        lambda: manager.add_habit(f"Новая {next(counter)}"), repeat=repeat)
+
+    def find_all():
+        for name in names:
+            manager.find_habit(name)
+    results["find_habit"] = measure(find_all, ops=len(names), repeat=repeat)
+
+    # отметки подряд идущих дней одной привычки — обычный сценарий
+    manager.add_habit("Бенчмарк")
+    days = iter(range(datetime.now().toordinal(), 10 ** 7))
+    results["mark_done"] = measure(
+        lambda: manager.mark_done("Бенчмарк", datetime.fromordinal(next(days)).strftime(DATE_FORMAT)),
+        repeat=repeat)
+    results["save_habits"] = measure(manager._save_habits, repeat=repeat)
+
+    results["summary_full"] = measure(lambda: summary_full(manager), repeat=repeat)
+    summary(manager)
+    results["summary"] = measure(lambda: summary(manager), repeat=repeat)
+    results["needs_attention"] = measure(lambda: needs_attention(manager.list_habits()), repeat=repeat)
+
+    manager.search()  # построение индекса не входит в замер запросов
+    queries = ["чт", "бег 1", "медитация 12", "англ", "zzz"]
+
+    def search_all(**kwargs):
+        for query in queries:
+            manager.search(query, limit=100, **kwargs)
+    results["search_prefix"] = measure(lambda: search_all(prefix_only=True), ops=len(queries),
+                                       repeat=repeat)
+    results["search_substring"] = measure(search_all, ops=len(queries), repeat=repeat)
+    results["search_filters"] = measure(
+        lambda: manager.search(category="Здоровье", overdue_days=3, min_progress=10, limit=100),
+        repeat=repeat)
+
+    if importlib.util.find_spec("matplotlib") is not None:
+        from visualizer import plot_category_distribution, plot_progress_single
+        results["plot_progress_single"] = measure(lambda: plot_progress_single(habits[0]), repeat=repeat)
+        results["plot_category_distribution"] = measure(
+            lambda: plot_category_distribution(habits), repeat=repeat)
+    return results
+
+
+def run(sizes: List[int], seed: int = 42, repeat: int = DEFAULT_REPEAT) -> Dict[str, object]:
+    """Прогоняет бенчмарки для всех размеров; ключи результатов — "<имя>@<размер>"."""
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="habit_bench_") as workdir:
+        for size in sizes:
+            for name, value in bench_size(size, workdir, seed, repeat).items():
+                results[f"{name}@{size}"] = value
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "seed": seed,
+            "sizes": sizes,
+            "date": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, object], baseline: Dict[str, object],
+            tolerance: float = DEFAULT_TOLERANCE) -> List[Dict[str, object]]:
+    """
+    Бенчмарки, замедлившиеся больше чем на tolerance относительно baseline.
+
+    Сравниваются медианы времени на операцию; бенчмарки, которых нет в
+    одном из прогонов, пропускаются.
+    """
+    regressions = []
+    base_results = baseline.get("results", {})
+    for key, value in current.get("results", {}).items():
+        base = base_results.get(key)
+        if not value or not base:
+            continue
+        ratio = value["median"] / base["median"] if base["median"] else float("inf")
+        if ratio > 1 + tolerance:
+            regressions.append({"name": key, "baseline": base["median"],
+                                "current": value["median"], "ratio": ratio})
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки Habit Tracker")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Размеры наборов (1000 … 1000000).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--out", default="", help="Сохранить результаты в JSON.")
+    parser.add_argument("--baseline", default="", help="JSON прошлого прогона для сравнения.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Допустимое замедление (0.25 = 25%%).")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.seed, args.repeat)
+    for key, value in report["results"].items():
+        if value:
+            print(f"{key:32} {value['median'] * 1e6:12.1f} мкс/оп (min {value['min'] * 1e6:.1f})")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for r in regressions:
+            print(f"РЕГРЕССИЯ {r['name']}: {r['baseline'] * 1e6:.1f} -> "
+                  f"{r['current'] * 1e6:.1f} мкс/оп (x{r['ratio']:.2f})")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
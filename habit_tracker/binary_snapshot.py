@@ -0,0 +1,235 @@
+# binary_snapshot.py
+"""
+Бинарный снимок привычек для быстрого старта.
+
+Файл ``<habits.csv>.snap`` лежит рядом с CSV и открывается через mmap:
+открытие — O(1) (заголовок), строки декодируются только при обращении.
+Снимок пишется при полной перезаписи данных и пересобирается лениво, когда
+устарел (см. storage.SnapshotStorage).
+
+Формат (little-endian):
+    заголовок  HEADER: магия, версия, число строк, метки stat_token CSV и
+               файла истории на момент записи, смещения секций;
+    строки     ROW на запись: start, last, streak, target, progress,
+               base истории и пары (смещение, длина) для имени, ключа,
+               категории, периодичности и байтов истории в таблице строк;
+    порядок    uint32 номера строк, отсортированные по ключу (UTF-8) —
+               поиск по ключу бисекцией без загрузки всего файла;
+    строки     таблица строк UTF-8; повторяющиеся категории и
+               периодичности хранятся один раз.
+
+Снимок действителен, только пока метки в заголовке совпадают с текущими
+метками CSV и истории; иначе (или если файла нет) читается CSV.
+"""
+
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from habit_history import CompletionHistory
+from habit_record import Habit, normalize_name
+
+SNAPSHOT_SUFFIX = ".snap"
+MAGIC = b"HABSNAP\x01"
+# 2: start, last, streak, target и base — int64 (в версии 1 были int32)
+FORMAT_VERSION = 2
+
+# магия, версия, число строк, метки CSV и истории (mtime_ns, размер, inode;
+# нули — файла нет), смещения секций строк, порядка и таблицы строк
+HEADER = struct.Struct("<8sII6q3Q")
+# start, last, streak, target, base истории (0 — нет истории) как int64,
+# progress, затем 5 пар (смещение, длина)
+ROW = struct.Struct("<5qd10I")
+_ORDER = struct.Struct("<I")
+# строк за один срез при последовательном чтении
+_BLOCK_ROWS = 4096
+
+Token = Optional[Tuple[int, int, int]]
+
+
+def _pack_token(token: Token) -> Tuple[int, int, int]:
+    return tuple(token) if token is not None else (0, 0, 0)
+
+
+def _unpack_token(values: Tuple[int, int, int]) -> Token:
+    return tuple(values) if any(values) else None
+
+
+class _StringTable:
+    """Таблица строк с дедупликацией повторяющихся значений."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.size = 0
+        self._seen: Dict[bytes, int] = {}
+
+    def add(self, data: bytes, dedupe: bool = False) -> Tuple[int, int]:
+        if dedupe:
+            offset = self._seen.get(data)
+            if offset is not None:
+                return offset, len(data)
+        offset = self.size
+        self.chunks.append(data)
+        self.size += len(data)
+        if dedupe:
+            self._seen[data] = offset
+        return offset, len(data)
+
+
+def write_snapshot(path: str, habits: Iterable[Habit], csv_token: Token,
+                   history_token: Token) -> int:
+    """
+    Записывает снимок атомарно (временный файл, fsync, os.replace).
+
+    Args:
+        path (str): Путь к файлу снимка.
+        habits: Записи в порядке хранения.
+        csv_token, history_token: Метки файлов, которым соответствует снимок.
+
+    Returns:
+        int: Число записанных строк.
+
+    Raises:
+        struct.error: Значение поля не помещается в формат строки.
+    """
+    strings = _StringTable()
+    rows = []
+    keys = []
+    for habit in habits:
+        name = habit.name.encode("utf-8")
+        key = normalize_name(habit.name).encode("utf-8")
+        history = habit.history
+        bits = bytes(history.bits).rstrip(b"\x00") if history is not None else b""
+        name_ref = strings.add(name)
+        # обычно ключ совпадает с именем — тогда ссылается на те же байты
+        key_ref = name_ref if key == name else strings.add(key)
+        rows.append(ROW.pack(
+            habit.start, habit.last, habit.streak, habit.target,
+            history.base if history is not None else 0, habit.progress,
+            *name_ref, *key_ref,
+            *strings.add(habit.category.encode("utf-8"), dedupe=True),
+            *strings.add(habit.frequency.encode("utf-8"), dedupe=True),
+            *strings.add(bits)))
+        keys.append(key)
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    rows_offset = HEADER.size
+    order_offset = rows_offset + len(rows) * ROW.size
+    strings_offset = order_offset + len(order) * _ORDER.size
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(rows), *_pack_token(csv_token),
+                         *_pack_token(history_token), rows_offset, order_offset, strings_offset)
+    # у каждого процесса свой временный файл: снимок может пересобираться при чтении
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(b"".join(rows))
+        f.write(struct.pack(f"<{len(order)}I", *order))
+        f.write(b"".join(strings.chunks))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+class Snapshot:
+    """
+    Открытый через mmap снимок.
+
+    Attributes:
+        count (int): Число строк.
+        csv_token, history_token: Метки файлов, для которых снимок записан.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            fields = HEADER.unpack_from(self._mm, 0)
+        except struct.error:
+            self.close()
+            raise ValueError(f"Повреждённый снимок: {path}")
+        magic, version, self.count = fields[:3]
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Неизвестный формат снимка: {path}")
+        self.csv_token = _unpack_token(fields[3:6])
+        self.history_token = _unpack_token(fields[6:9])
+        self._rows, self._order, self._strings = fields[9:12]
+        if self._strings > len(self._mm):
+            self.close()
+            raise ValueError(f"Обрезанный снимок: {path}")
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def matches(self, csv_token: Token, history_token: Token) -> bool:
+        """Соответствует ли снимок текущему состоянию CSV и истории."""
+        return self.csv_token == csv_token and self.history_token == history_token
+
+    def _text(self, offset: int, length: int) -> str:
+        start = self._strings + offset
+        return self._mm[start:start + length].decode("utf-8")
+
+    def _habit(self, fields: tuple, categories: Dict[int, str]) -> Habit:
+        (start, last, streak, target, base, progress,
+         name_off, name_len, _, _, cat_off, cat_len, freq_off, freq_len,
+         bits_off, bits_len) = fields
+        # категории и периодичности повторяются: декодируем каждую один раз
+        category = categories.get(cat_off)
+        if category is None:
+            category = categories[cat_off] = self._text(cat_off, cat_len)
+        frequency = categories.get(-1 - freq_off)
+        if frequency is None:
+            frequency = categories[-1 - freq_off] = self._text(freq_off, freq_len)
+        history = None
+        if base:
+            bits_start = self._strings + bits_off
+            history = CompletionHistory(base, bytearray(self._mm[bits_start:bits_start + bits_len]))
+        return Habit(self._text(name_off, name_len), category, frequency, start, last,
+                     streak, target, progress, history)
+
+    def row(self, index: int) -> Habit:
+        """Декодирует одну строку."""
+        return self._habit(ROW.unpack_from(self._mm, self._rows + index * ROW.size), {})
+
+    def _key(self, index: int) -> bytes:
+        fields = ROW.unpack_from(self._mm, self._rows + index * ROW.size)
+        start = self._strings + fields[8]
+        return self._mm[start:start + fields[9]]
+
+    def find(self, key: str) -> Optional[Habit]:
+        """Строка по нормализованному имени: бисекция по секции порядка."""
+        target = key.encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            index = _ORDER.unpack_from(self._mm, self._order + mid * _ORDER.size)[0]
+            probe = self._key(index)
+            if probe < target:
+                lo = mid + 1
+            elif probe > target:
+                hi = mid
+            else:
+                return self.row(index)
+        return None
+
+    def iter_keys(self) -> Iterator[str]:
+        """Ключи строк в порядке хранения (без декодирования остальных полей)."""
+        for block in range(0, self.count, _BLOCK_ROWS):
+            end = min(block + _BLOCK_ROWS, self.count)
+            data = self._mm[self._rows + block * ROW.size:self._rows + end * ROW.size]
+            for fields in ROW.iter_unpack(data):
+                yield self._text(fields[8], fields[9])
+
+    def iter_rows(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Habit]:
+        """Строки [start, stop) в порядке хранения."""
+        stop = self.count if stop is None else min(stop, self.count)
+        if start >= stop:
+            return
+        categories: Dict[int, str] = {}
+        # срезы-копии, а не memoryview: открытый буфер помешал бы close()
+        for block in range(start, stop, _BLOCK_ROWS):
+            end = min(block + _BLOCK_ROWS, stop)
+            data = self._mm[self._rows + block * ROW.size:self._rows + end * ROW.size]
+            for fields in ROW.iter_unpack(data):
+                yield self._habit(fields, categories)
@@ -0,0 +1,191 @@
+# bulk_io.py
+"""
+Потоковый импорт и экспорт привычек (CSV и JSON Lines).
+
+Импорт читает файл порциями, проверяет записи пачкой
+(habit_entry.record_error), отсеивает дубликаты по множеству ключей и
+собирает ошибки по строкам в отчёт, не прерываясь. Корректные записи
+добавляются через HabitManager.insert_habits — одной транзакцией с одним
+сбросом на диск.
+
+Экспорт идёт прямо из хранилища (HabitStorage.iter_chunks) и пишет
+порциями во временный файл, поэтому память не зависит от размера данных.
+"""
+
+import csv
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from date_codec import today as today_ordinal
+from habit_entry import record_error
+from habit_history import CompletionHistory
+from habit_manager import HabitManager, HabitError
+from habit_record import FIELDNAMES, Habit, normalize_name
+from instrumentation import timed
+from storage import DEFAULT_CHUNK_SIZE, HabitStorage, chunked
+
+FORMATS = ("csv", "jsonl")
+# сколько ошибок хранить в отчёте построчно (остальные только считаются)
+MAX_REPORTED_ERRORS = 1000
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    """Формат по явному значению или расширению (.jsonl/.ndjson — JSON Lines)."""
+    if fmt:
+        if fmt not in FORMATS:
+            raise HabitError(f"Неизвестный формат: {fmt}")
+        return fmt
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+class ImportReport:
+    """
+    Итог импорта.
+
+    Attributes:
+        imported (int): Добавлено записей.
+        failed (int): Отклонено записей (ошибки и дубликаты).
+        errors (list): Пары (номер строки, описание) — первые MAX_REPORTED_ERRORS.
+    """
+
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Tuple[int, str]] = []
+
+    def reject(self, line: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"imported": self.imported, "failed": self.failed,
+                "errors": [{"line": line, "error": msg} for line, msg in self.errors]}
+
+
+def _read_rows(path: str, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Пары (номер строки файла, запись); неразбираемая строка JSON — запись None."""
+    if fmt == "csv":
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError:
+                yield line_no, None
+
+
+def _to_habit(record: Dict[str, Any], today: int) -> Habit:
+    """Запись (уже проверенная) -> Habit; история берётся из base/bits, если есть."""
+    row = {k: ("" if v is None else str(v)) for k, v in record.items() if k in FIELDNAMES}
+    habit = Habit.from_row(row)
+    habit.name = habit.name.strip()
+    habit.category = habit.category.strip() or "Общее"
+    habit.start = habit.start or today
+    if "bits" in record and "base" in record:
+        habit.history = CompletionHistory.decode(int(record["base"]), record["bits"])
+    return habit
+
+
+@timed("bulk.import")
+def import_habits(manager: HabitManager, path: str, fmt: Optional[str] = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> ImportReport:
+    """
+    Импортирует привычки из CSV или JSON Lines.
+
+    Некорректные записи и дубликаты (с уже существующими или между собой)
+    попадают в отчёт, остальные добавляются одной транзакцией.
+
+    Args:
+        manager (HabitManager): Куда импортировать.
+        path (str): Файл импорта.
+        fmt (str): "csv" или "jsonl" (по умолчанию — по расширению).
+        chunk_size (int): Размер порции чтения и проверки.
+
+    Raises:
+        HabitError: если файл не удалось прочитать или сохранить.
+    """
+    fmt = detect_format(path, fmt)
+    report = ImportReport()
+    seen = {normalize_name(h.name) for h in manager.list_habits()}
+    today = today_ordinal()
+    accepted: List[Habit] = []
+    try:
+        for chunk in chunked(_read_rows(path, fmt), chunk_size):
+            for line, record in chunk:
+                if not isinstance(record, dict):
+                    report.reject(line, "строка не является JSON-объектом")
+                    continue
+                error = record_error(record)
+                if error is not None:
+                    report.reject(line, error)
+                    continue
+                key = normalize_name(record["name"])
+                if key in seen:
+                    report.reject(line, f"дубликат: {record['name']!r}")
+                    continue
+                try:
+                    habit = _to_habit(record, today)
+                except (ValueError, TypeError) as exc:
+                    report.reject(line, f"неверная история выполнений: {exc}")
+                    continue
+                seen.add(key)
+                accepted.append(habit)
+    except (OSError, UnicodeDecodeError, csv.Error) as exc:
+        raise HabitError(f"Ошибка чтения файла импорта: {exc}") from exc
+    report.imported = manager.insert_habits(accepted)
+    return report
+
+
+def _habit_record(habit: Habit) -> Dict[str, Any]:
+    record = habit.to_row()
+    if habit.history is not None:
+        record["base"] = habit.history.base
+        record["bits"] = habit.history.encode()
+    return record
+
+
+@timed("bulk.export")
+def export_habits(storage: HabitStorage, path: str, fmt: Optional[str] = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Потоково выгружает все записи хранилища в CSV или JSON Lines.
+
+    Файл пишется во временный и подменяется атомарно. JSON Lines включает
+    историю выполнений (base, bits), если хранилище её отдаёт.
+
+    Returns:
+        int: Число выгруженных записей.
+
+    Raises:
+        HabitError: при ошибке чтения или записи.
+    """
+    fmt = detect_format(path, fmt)
+    tmp_path = path + ".tmp"
+    total = 0
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            writer = None
+            if fmt == "csv":
+                writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+                writer.writeheader()
+            for chunk in storage.iter_chunks(chunk_size):
+                if writer is not None:
+                    writer.writerows(h.to_row() for h in chunk)
+                else:
+                    f.write("".join(json.dumps(_habit_record(h), ensure_ascii=False) + "\n"
+                                    for h in chunk))
+                total += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except (OSError, ValueError) as exc:
+        raise HabitError(f"Ошибка экспорта: {exc}") from exc
+    return total
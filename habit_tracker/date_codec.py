@@ -0,0 +1,71 @@
+# date_codec.py
+"""
+Кодек дат: внутри приложения дата — целый порядковый номер дня
+(date.toordinal()), снаружи — строка DD-MM-YYYY.
+
+Единственное место, где задан формат даты (DATE_FORMAT). Разбор строк
+написан вручную по позициям символов (без strptime) и кэшируется в
+ограниченном memo, так как одни и те же даты повторяются тысячами строк.
+День и месяц, как и у strptime, могут быть без ведущего нуля (1-2-2024).
+Для строк в ISO-формате (YYYY-MM-DD) есть запасной путь.
+"""
+
+from datetime import date
+from functools import lru_cache
+
+DATE_FORMAT = "%d-%m-%Y"
+MEMO_SIZE = 4096
+
+
+def today() -> int:
+    """Порядковый номер сегодняшнего дня."""
+    return date.today().toordinal()
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _parse(text: str) -> int:
+    if len(text) == 10 and text[2] == "-" and text[5] == "-":
+        day, month, year = text[0:2], text[3:5], text[6:10]
+        if day.isdigit() and month.isdigit() and year.isdigit():
+            # date() проверяет диапазоны (31-02 и т.п.) и бросает ValueError
+            return date(int(year), int(month), int(day)).toordinal()
+    # день и месяц из одной цифры, как принимал strptime
+    parts = text.split("-")
+    if len(parts) == 3:
+        day, month, year = parts
+        if (0 < len(day) <= 2 and 0 < len(month) <= 2 and len(year) == 4
+                and day.isdigit() and month.isdigit() and year.isdigit()):
+            return date(int(year), int(month), int(day)).toordinal()
+    # запасной путь: ISO 8601 (YYYY-MM-DD)
+    return date.fromisoformat(text).toordinal()
+
+
+def parse_day(text: str) -> int:
+    """
+    Строка DD-MM-YYYY (или YYYY-MM-DD) -> порядковый номер дня.
+
+    Raises:
+        ValueError: если строка не является корректной датой.
+    """
+    if not isinstance(text, str):
+        raise ValueError(f"Дата должна быть строкой: {text!r}")
+    return _parse(text.strip())
+
+
+def day_or_zero(text: str) -> int:
+    """Как parse_day, но пустая или неверная строка даёт 0 (нет даты)."""
+    if not text:
+        return 0
+    try:
+        return parse_day(text)
+    except ValueError:
+        return 0
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def format_day(ordinal: int) -> str:
+    """Порядковый номер дня -> строка DD-MM-YYYY ("" для 0)."""
+    if not ordinal:
+        return ""
+    d = date.fromordinal(ordinal)
+    return f"{d.day:02d}-{d.month:02d}-{d.year:04d}"
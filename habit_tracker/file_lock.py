@@ -0,0 +1,103 @@
+# file_lock.py
+"""
+Межпроцессная блокировка файла данных.
+
+FileLock берёт эксклюзивную блокировку на отдельном файле ``<path>.lock``
+(fcntl.flock в POSIX, msvcrt.locking в Windows). Сам файл данных
+подменяется через os.replace, поэтому блокировать его напрямую нельзя.
+"""
+
+import os
+import time
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_SUFFIX = ".lock"
+LOCK_TIMEOUT = 30.0
+_POLL_INTERVAL = 0.01
+
+
+class LockTimeout(OSError):
+    """Блокировку не удалось получить за отведённое время."""
+
+
+class FileLock:
+    """
+    Эксклюзивная блокировка между процессами.
+
+    Повторный вход из того же объекта не блокирует (счётчик вложенности),
+    поэтому, например, компактация внутри записи не берёт её второй раз.
+
+    Args:
+        path (str): Путь к файлу блокировки.
+        timeout (float): Сколько ждать блокировку, секунд (None — бесконечно).
+    """
+
+    def __init__(self, path: str, timeout: Optional[float] = LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._fd: Optional[int] = None
+        self._depth = 0
+
+    def _try_lock(self, fd: int) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def acquire(self) -> None:
+        """
+        Берёт блокировку, ожидая её освобождения другим процессом.
+
+        Raises:
+            LockTimeout: если блокировка не получена за timeout секунд.
+        """
+        if self._depth:
+            self._depth += 1
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while not self._try_lock(fd):
+            if deadline is not None and time.monotonic() >= deadline:
+                os.close(fd)
+                raise LockTimeout(f"Файл занят другим процессом: {self.path}")
+            time.sleep(_POLL_INTERVAL)
+        self._fd = fd
+        self._depth = 1
+
+    def release(self) -> None:
+        """Снимает блокировку (внешний уровень вложенности)."""
+        if not self._depth:
+            return
+        self._depth -= 1
+        if self._depth:
+            return
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    @property
+    def locked(self) -> bool:
+        return self._depth > 0
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
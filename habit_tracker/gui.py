@@ -1,181 +1,371 @@
-# gui.py
-"""
-GUI приложение Habit Tracker на CustomTkinter.
-Весь GUI изолирован в классе HabitTrackerApp.
-"""
-
-import os
-import threading
-import customtkinter as ctk
-from tkinter import messagebox
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-from habit_manager import HabitManager, HabitError
-from visualizer import plot_progress_single, plot_category_distribution
-from notifications import random_motivation, needs_attention
-
-
-ctk.set_appearance_mode("System")  # "Dark" / "Light" / "System"
-ctk.set_default_color_theme("blue")
-
-
-class HabitTrackerApp(ctk.CTk):
-    """Главный GUI-класс приложения."""
-
-    def __init__(self, manager: HabitManager = None):
-        super().__init__()
-        self.title("Habit Tracker Pro")
-        self.geometry("900x650")
-        self.manager = manager or HabitManager()
-        self._build_ui()
-        self._refresh_list()
-
-    def _build_ui(self):
-        """Создаёт виджеты."""
-        # Заголовок
-        header = ctk.CTkLabel(self, text="Habit Tracker Pro", font=ctk.CTkFont(size=24, weight="bold"))
-        header.pack(pady=(12, 6))
-
-        # Верхняя рамка — ввод
-        top_frame = ctk.CTkFrame(self)
-        top_frame.pack(fill="x", padx=12, pady=6)
-
-        self.name_entry = ctk.CTkEntry(top_frame, placeholder_text="Название привычки")
-        self.name_entry.grid(row=0, column=0, padx=6, pady=6)
-        self.category_entry = ctk.CTkEntry(top_frame, placeholder_text="Категория (Здоровье/Работа/Другое)")
-        self.category_entry.grid(row=0, column=1, padx=6, pady=6)
-        self.target_entry = ctk.CTkEntry(top_frame, placeholder_text="Цель в днях (например, 30)")
-        self.target_entry.grid(row=0, column=2, padx=6, pady=6)
-
-        add_btn = ctk.CTkButton(top_frame, text="Добавить", command=self._on_add)
-        add_btn.grid(row=0, column=3, padx=6)
-
-        remove_btn = ctk.CTkButton(top_frame, text="Удалить", fg_color="tomato", hover_color="#ff7b7b", command=self._on_remove)
-        remove_btn.grid(row=0, column=4, padx=6)
-
-        # Слева — список привычек, справа — график/инфо
-        body = ctk.CTkFrame(self)
-        body.pack(fill="both", expand=True, padx=12, pady=6)
-
-        left = ctk.CTkFrame(body, width=300)
-        left.pack(side="left", fill="y", padx=(0, 6), pady=6)
-
-        self.habit_list = ctk.CTkTextbox(left, width=300, height=400, state="disabled")
-        self.habit_list.pack(padx=6, pady=6)
-
-        mark_btn = ctk.CTkButton(left, text="Отметить выполнено", command=self._on_mark_done)
-        mark_btn.pack(pady=6)
-
-        stats_btn = ctk.CTkButton(left, text="Показать категорийный график", command=self._show_category_chart)
-        stats_btn.pack(pady=6)
-
-        right = ctk.CTkFrame(body)
-        right.pack(side="left", fill="both", expand=True, padx=(6, 0), pady=6)
-
-        self.canvas_container = ctk.CTkFrame(right)
-        self.canvas_container.pack(fill="both", expand=True, padx=6, pady=6)
-
-        # Нижняя строка — мотивация
-        bottom = ctk.CTkFrame(self)
-        bottom.pack(fill="x", padx=12, pady=(6, 12))
-
-        self.motivation_label = ctk.CTkLabel(bottom, text=random_motivation())
-        self.motivation_label.pack(side="left", padx=6)
-
-        refresh_btn = ctk.CTkButton(bottom, text="Обновить", command=self._refresh_list)
-        refresh_btn.pack(side="right", padx=6)
-
-        check_btn = ctk.CTkButton(bottom, text="Проверить пропуски", command=self._show_attention)
-        check_btn.pack(side="right", padx=6)
-
-    def _on_add(self):
-        """Обработчик добавления привычки."""
-        name = self.name_entry.get().strip()
-        cat = self.category_entry.get().strip() or "Общее"
-        target_text = self.target_entry.get().strip() or "30"
-        try:
-            target = int(target_text)
-        except Exception:
-            messagebox.showerror("Ошибка", "Цель должна быть целым числом.")
-            return
-        try:
-            self.manager.add_habit(name=name, category=cat, target=target)
-            messagebox.showinfo("OK", f"Привычка '{name}' добавлена.")
-            self._refresh_list()
-        except Exception as exc:
-            messagebox.showerror("Ошибка", str(exc))
-
-    def _on_remove(self):
-        """Удалить выбранную привычку (берём из name_entry)."""
-        name = self.name_entry.get().strip()
-        if not name:
-            messagebox.showerror("Ошибка", "Введите имя привычки для удаления.")
-            return
-        try:
-            self.manager.remove_habit(name)
-            messagebox.showinfo("OK", f"Привычка '{name}' удалена.")
-            self._refresh_list()
-        except Exception as exc:
-            messagebox.showerror("Ошибка", str(exc))
-
-    def _on_mark_done(self):
-        """Отметить выбранную привычку выполненной."""
-        name = self.name_entry.get().strip()
-        if not name:
-            messagebox.showerror("Ошибка", "Введите имя привычки для отметки.")
-            return
-        try:
-            self.manager.mark_done(name)
-            messagebox.showinfo("OK", f"Привычка '{name}' отмечена выполненной.")
-            self._refresh_list()
-            # показ графика в отдельном потоке, чтобы GUI не блокировался
-            threading.Thread(target=self._show_single_chart, args=(name,), daemon=True).start()
-        except Exception as exc:
-            messagebox.showerror("Ошибка", str(exc))
-
-    def _refresh_list(self):
-        """Обновляет текстовое поле со списком привычек."""
-        habits = self.manager.list_habits()
-        text = ""
-        for h in habits:
-            text += f"{h['name']} [{h.get('category','')}] — streak: {h.get('streak','0')} — progress: {h.get('progress','0%')}\n"
-        self.habit_list.configure(state="normal")
-        self.habit_list.delete("0.0", "end")
-        self.habit_list.insert("0.0", text or "Нет привычек. Добавьте первую!")
-        self.habit_list.configure(state="disabled")
-
-    def _clear_canvas(self):
-        """Удаляет все вложенные виджеты в контейнере canvas."""
-        for w in self.canvas_container.winfo_children():
-            w.destroy()
-
-    def _show_single_chart(self, habit_name: str):
-        """Показывает график для одной привычки."""
-        try:
-            habit = self.manager.find_habit(habit_name)
-            fig = plot_progress_single(habit)
-            self._clear_canvas()
-            canvas = FigureCanvasTkAgg(fig, master=self.canvas_container)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill="both", expand=True)
-        except Exception as exc:
-            messagebox.showerror("Ошибка", f"Невозможно отобразить график: {exc}")
-
-    def _show_category_chart(self):
-        """Показывает круговую диаграмму категорий."""
-        try:
-            fig = plot_category_distribution(self.manager.list_habits())
-            self._clear_canvas()
-            canvas = FigureCanvasTkAgg(fig, master=self.canvas_container)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill="both", expand=True)
-        except Exception as exc:
-            messagebox.showerror("Ошибка", f"Невозможно отобразить график: {exc}")
-
-    def _show_attention(self):
-        """Показывает список привычек, требующих внимания."""
-        problems = needs_attention(self.manager.list_habits(), days_threshold=3)
-        if not problems:
-            messagebox.showinfo("Всё в порядке", "Нет привычек, требующих внимания.")
-        else:
-            messagebox.showwarning("Внимание", "Не выполнялись: " + ", ".join(problems))
+# gui.py
+"""
+GUI приложение Habit Tracker на CustomTkinter.
+Весь GUI изолирован в классе HabitTrackerApp.
+"""
+
+import os
+import threading
+import customtkinter as ctk
+import numpy as np
+from tkinter import messagebox
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+
+from habit_manager import HabitManager, HabitError
+from visualizer import plot_progress_single, plot_category_counts
+from notifications import random_motivation
+from list_model import HabitListModel
+from analytics_cache import IncrementalSummary
+from render_pipeline import RenderPipeline
+from instrumentation import timed
+
+CHART_POLL_MS = 50
+# окно отложенной записи: клики не ждут диска, всплеск изменений пишется одним разом
+WRITE_BEHIND_WINDOW = 0.5
+PERSIST_POLL_MS = 1000
+# фильтр пересчитывается после паузы в наборе, а не на каждое отпускание клавиши
+FILTER_DEBOUNCE_MS = 150
+# сколько совпадений показывать в отфильтрованном списке
+FILTER_LIMIT = 1000
+
+
+ctk.set_appearance_mode("System")  # "Dark" / "Light" / "System"
+ctk.set_default_color_theme("blue")
+
+
+class VirtualHabitList(ctk.CTkFrame):
+    """
+    Виртуализированный список привычек.
+
+    Держит фиксированный пул строк-меток и показывает в них окно модели,
+    начиная с self.first; прокрутка и изменения перерисовывают только
+    видимые строки, поэтому стоимость не зависит от числа привычек.
+    """
+
+    def __init__(self, master, model: HabitListModel, rows: int = 18, on_select=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.model = model
+        self.rows = rows
+        self.first = 0
+        self.on_select = on_select
+        self._texts = [None] * rows
+        self._labels = []
+        for i in range(rows):
+            label = ctk.CTkLabel(self, text="", anchor="w", width=280)
+            label.grid(row=i, column=0, sticky="we", padx=(6, 0))
+            label.bind("<Button-1>", lambda _e, i=i: self._select(i))
+            self._bind_wheel(label)
+            self._labels.append(label)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scroll)
+        self.scrollbar.grid(row=0, column=1, rowspan=rows, sticky="ns")
+        self._bind_wheel(self)
+        self.render()
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda e: self.scroll_to(self.first - (1 if e.delta > 0 else -1) * 3))
+        widget.bind("<Button-4>", lambda _e: self.scroll_to(self.first - 3))
+        widget.bind("<Button-5>", lambda _e: self.scroll_to(self.first + 3))
+
+    def _on_scroll(self, action, value, unit=None):
+        """Команда скроллбара: ("moveto", доля) или ("scroll", n, "units"|"pages")."""
+        if action == "moveto":
+            self.scroll_to(int(float(value) * len(self.model)))
+        else:
+            step = self.rows if unit == "pages" else 1
+            self.scroll_to(self.first + int(value) * step)
+
+    def scroll_to(self, first: int):
+        """Прокручивает так, чтобы строка first была верхней видимой."""
+        first = max(0, min(first, len(self.model) - self.rows))
+        if first != self.first:
+            self.first = first
+            self.render()
+
+    @timed("gui.list_render")
+    def render(self):
+        """Перерисовывает видимое окно; метки с прежним текстом не трогаются."""
+        self.first = max(0, min(self.first, len(self.model) - self.rows))
+        texts = self.model.window(self.first, self.rows)
+        texts += [""] * (self.rows - len(texts))
+        for i, text in enumerate(texts):
+            if self._texts[i] != text:
+                self._texts[i] = text
+                self._labels[i].configure(text=text)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = max(1, len(self.model))
+        self.scrollbar.set(self.first / total, min(1.0, (self.first + self.rows) / total))
+
+    def _select(self, i: int):
+        index = self.first + i
+        if self.on_select and index < len(self.model):
+            self.on_select(self.model.row(index)["name"])
+
+    def on_change(self, event, key, before, after, habits=None):
+        """
+        Применяет событие HabitManager: перерисовка, только если задеты
+        видимые строки. Для "load" habits — новое содержимое.
+        """
+        index = self.model.on_change(event, key, before, after)
+        if index < 0:
+            if event == "load":
+                self.model.reset(habits or [])
+                self.render()
+            return
+        last_visible = self.first + self.rows
+        if event == "update":
+            if self.first <= index < last_visible:
+                self.render()
+        elif index < last_visible:
+            self.render()
+        else:
+            self._update_scrollbar()
+
+
+class HabitTrackerApp(ctk.CTk):
+    """Главный GUI-класс приложения."""
+
+    def __init__(self, manager: HabitManager = None):
+        super().__init__()
+        self.title("Habit Tracker Pro")
+        self.geometry("900x650")
+        self.manager = manager or HabitManager(write_behind=WRITE_BEHIND_WINDOW)
+        self._write_errors = 0
+        self._filter_job = None
+        self._filter_query = None
+        self._build_ui()
+        self._refresh_list()
+        self.manager.subscribe(self._on_manager_change)
+        self.after(PERSIST_POLL_MS, self._poll_persistence)
+        # поисковый индекс строится заранее и вне потока Tk, до первого нажатия в фильтре
+        threading.Thread(target=self.manager.search_index_builder(), daemon=True).start()
+
+    def _build_ui(self):
+        """Создаёт виджеты."""
+        # Заголовок
+        header = ctk.CTkLabel(self, text="Habit Tracker Pro", font=ctk.CTkFont(size=24, weight="bold"))
+        header.pack(pady=(12, 6))
+
+        # Верхняя рамка — ввод
+        top_frame = ctk.CTkFrame(self)
+        top_frame.pack(fill="x", padx=12, pady=6)
+
+        self.name_entry = ctk.CTkEntry(top_frame, placeholder_text="Название привычки")
+        self.name_entry.grid(row=0, column=0, padx=6, pady=6)
+        self.category_entry = ctk.CTkEntry(top_frame, placeholder_text="Категория (Здоровье/Работа/Другое)")
+        self.category_entry.grid(row=0, column=1, padx=6, pady=6)
+        self.target_entry = ctk.CTkEntry(top_frame, placeholder_text="Цель в днях (например, 30)")
+        self.target_entry.grid(row=0, column=2, padx=6, pady=6)
+
+        add_btn = ctk.CTkButton(top_frame, text="Добавить", command=self._on_add)
+        add_btn.grid(row=0, column=3, padx=6)
+
+        remove_btn = ctk.CTkButton(top_frame, text="Удалить", fg_color="tomato", hover_color="#ff7b7b", command=self._on_remove)
+        remove_btn.grid(row=0, column=4, padx=6)
+
+        # Слева — список привычек, справа — график/инфо
+        body = ctk.CTkFrame(self)
+        body.pack(fill="both", expand=True, padx=12, pady=6)
+
+        left = ctk.CTkFrame(body, width=300)
+        left.pack(side="left", fill="y", padx=(0, 6), pady=6)
+
+        # фильтр по началу слов имени: список обновляется при каждом нажатии
+        self.filter_entry = ctk.CTkEntry(left, placeholder_text="Поиск")
+        self.filter_entry.pack(fill="x", padx=6, pady=(6, 0))
+        self.filter_entry.bind("<KeyRelease>", self._on_filter_key)
+
+        self.habit_list = VirtualHabitList(left, HabitListModel(), on_select=self._on_select)
+        self.habit_list.pack(padx=6, pady=6)
+
+        mark_btn = ctk.CTkButton(left, text="Отметить выполнено", command=self._on_mark_done)
+        mark_btn.pack(pady=6)
+
+        stats_btn = ctk.CTkButton(left, text="Показать категорийный график", command=self._show_category_chart)
+        stats_btn.pack(pady=6)
+
+        right = ctk.CTkFrame(body)
+        right.pack(side="left", fill="both", expand=True, padx=(6, 0), pady=6)
+
+        self.canvas_container = ctk.CTkFrame(right)
+        self.canvas_container.pack(fill="both", expand=True, padx=6, pady=6)
+        self._build_chart_area()
+
+        # Нижняя строка — мотивация
+        bottom = ctk.CTkFrame(self)
+        bottom.pack(fill="x", padx=12, pady=(6, 12))
+
+        self.motivation_label = ctk.CTkLabel(bottom, text=random_motivation())
+        self.motivation_label.pack(side="left", padx=6)
+
+        refresh_btn = ctk.CTkButton(bottom, text="Обновить", command=self._refresh_list)
+        refresh_btn.pack(side="right", padx=6)
+
+        check_btn = ctk.CTkButton(bottom, text="Проверить пропуски", command=self._show_attention)
+        check_btn.pack(side="right", padx=6)
+
+    @timed("gui.on_add")
+    def _on_add(self):
+        """Обработчик добавления привычки."""
+        name = self.name_entry.get().strip()
+        cat = self.category_entry.get().strip() or "Общее"
+        target_text = self.target_entry.get().strip() or "30"
+        try:
+            target = int(target_text)
+        except Exception:
+            messagebox.showerror("Ошибка", "Цель должна быть целым числом.")
+            return
+        try:
+            self.manager.add_habit(name=name, category=cat, target=target)
+            messagebox.showinfo("OK", f"Привычка '{name}' добавлена.")
+        except Exception as exc:
+            messagebox.showerror("Ошибка", str(exc))
+
+    @timed("gui.on_remove")
+    def _on_remove(self):
+        """Удалить выбранную привычку (берём из name_entry)."""
+        name = self.name_entry.get().strip()
+        if not name:
+            messagebox.showerror("Ошибка", "Введите имя привычки для удаления.")
+            return
+        try:
+            self.manager.remove_habit(name)
+            messagebox.showinfo("OK", f"Привычка '{name}' удалена.")
+        except Exception as exc:
+            messagebox.showerror("Ошибка", str(exc))
+
+    @timed("gui.on_mark_done")
+    def _on_mark_done(self):
+        """Отметить выбранную привычку выполненной."""
+        name = self.name_entry.get().strip()
+        if not name:
+            messagebox.showerror("Ошибка", "Введите имя привычки для отметки.")
+            return
+        try:
+            self.manager.mark_done(name)
+            messagebox.showinfo("OK", f"Привычка '{name}' отмечена выполненной.")
+            # график рисуется в пуле рендера, GUI не блокируется
+            self._show_single_chart(name)
+        except Exception as exc:
+            messagebox.showerror("Ошибка", str(exc))
+
+    def _visible_habits(self):
+        """Привычки для списка: все или подходящие под текст фильтра."""
+        query = self.filter_entry.get().strip()
+        if not query:
+            return self.manager.list_habits()
+        return self.manager.search(query, prefix_only=True, limit=FILTER_LIMIT)
+
+    def _on_filter_key(self, _event):
+        """Откладывает пересчёт фильтра до паузы в наборе."""
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(FILTER_DEBOUNCE_MS, self._apply_filter)
+
+    def _apply_filter(self):
+        """Пересчитывает список, только если текст фильтра изменился (не стрелки, Shift и т.п.)."""
+        self._filter_job = None
+        if self.filter_entry.get().strip() != self._filter_query:
+            self._refresh_list()
+
+    @timed("gui.refresh_list")
+    def _refresh_list(self):
+        """Полностью перечитывает список привычек из менеджера (с учётом фильтра)."""
+        self._filter_query = self.filter_entry.get().strip()
+        self.habit_list.model.reset(self._visible_habits())
+        self.habit_list.render()
+
+    @timed("gui.on_manager_change")
+    def _on_manager_change(self, event, key, before, after):
+        """Построчно обновляет список по событию менеджера."""
+        if event != "update" and self.filter_entry.get().strip():
+            # состав отфильтрованного списка пересчитывается запросом к индексу
+            event = "load"
+        habits = self._visible_habits() if event == "load" else None
+        self.habit_list.on_change(event, key, before, after, habits)
+
+    def _on_select(self, name: str):
+        """Клик по строке списка подставляет имя привычки в поле ввода."""
+        self.name_entry.delete(0, "end")
+        self.name_entry.insert(0, name)
+
+    def _build_chart_area(self):
+        """
+        Один встроенный холст для всех графиков: готовые RGBA-буферы из
+        RenderPipeline подставляются в его AxesImage на месте.
+        """
+        self._chart_fig = Figure(figsize=(5, 4), dpi=100)
+        self._chart_ax = self._chart_fig.add_axes([0, 0, 1, 1])
+        self._chart_ax.axis("off")
+        self._chart_image = self._chart_ax.imshow(np.zeros((1, 1, 4), dtype=np.uint8))
+        self._chart_canvas = FigureCanvasTkAgg(self._chart_fig, master=self.canvas_container)
+        self._chart_canvas.get_tk_widget().pack(fill="both", expand=True)
+        self._renderer = RenderPipeline(self._show_chart_buffer, self._on_chart_error)
+        self.after(CHART_POLL_MS, self._poll_charts)
+
+    def _poll_charts(self):
+        """Забирает готовые графики из пула рендера (главный поток Tk)."""
+        self._renderer.poll()
+        self.after(CHART_POLL_MS, self._poll_charts)
+
+    @timed("gui.show_chart_buffer")
+    def _show_chart_buffer(self, buffer):
+        """Показывает отрендеренный буфер на встроенном холсте."""
+        height, width = buffer.shape[:2]
+        self._chart_image.set_data(buffer)
+        self._chart_image.set_extent((0, width, height, 0))
+        self._chart_ax.set_xlim(0, width)
+        self._chart_ax.set_ylim(height, 0)
+        self._chart_canvas.draw_idle()
+
+    def _on_chart_error(self, exc: Exception):
+        messagebox.showerror("Ошибка", f"Невозможно отобразить график: {exc}")
+
+    @timed("gui.show_single_chart")
+    def _show_single_chart(self, habit_name: str):
+        """Показывает график для одной привычки."""
+        try:
+            habit = self.manager.find_habit(habit_name).snapshot()
+        except Exception as exc:
+            messagebox.showerror("Ошибка", f"Невозможно отобразить график: {exc}")
+            return
+        self._renderer.request(("single", habit.name, habit.progress),
+                               lambda: plot_progress_single(habit))
+
+    @timed("gui.show_category_chart")
+    def _show_category_chart(self):
+        """Показывает круговую диаграмму категорий."""
+        counts = dict(IncrementalSummary.for_manager(self.manager).categories)
+        self._renderer.request(("categories", tuple(counts.items())),
+                               lambda: plot_category_counts(counts))
+
+    def _poll_persistence(self):
+        """Сообщает о новых ошибках фоновой записи (один раз на серию)."""
+        stats = self.manager.persistence_stats()
+        errors = stats.get("errors", 0)
+        if errors > self._write_errors and stats.get("pending"):
+            messagebox.showerror("Ошибка", f"Не удалось сохранить данные: {stats['last_error']}")
+        self._write_errors = errors
+        self.after(PERSIST_POLL_MS, self._poll_persistence)
+
+    def destroy(self):
+        """Дописывает отложенные изменения и останавливает пул рендера вместе с окном."""
+        try:
+            self.manager.flush()
+        except HabitError as exc:
+            messagebox.showerror("Ошибка", str(exc))
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._renderer.shutdown()
+        super().destroy()
+
+    @timed("gui.show_attention")
+    def _show_attention(self):
+        """Показывает список привычек, требующих внимания."""
+        problems = self.manager.overdue(days_threshold=3)
+        if not problems:
+            messagebox.showinfo("Всё в порядке", "Нет привычек, требующих внимания.")
+        else:
+            messagebox.showwarning("Внимание", "Не выполнялись: " + ", ".join(problems))
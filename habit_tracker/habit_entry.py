@@ -1,66 +1,133 @@
-# habit_entry.py
-"""
-Ввод и валидация данных для Habit Tracker.
-
-Содержит функции по валидации названия, даты и целого числа.
-Все функции документированы в стиле Google.
-"""
-
-from datetime import datetime
-import re
-
-
-DATE_FORMAT = "%d-%m-%Y"
-
-
-def validate_name(name: str) -> bool:
-    """
-    Проверяет корректность названия привычки.
-
-    Args:
-        name (str): Название привычки.
-
-    Returns:
-        bool: True если название корректно (не пустое, не длиннее 100, без спецсимволов).
-    """
-    if not isinstance(name, str):
-        raise TypeError("name must be a string")
-    name = name.strip()
-    if not name:
-        return False
-    if len(name) > 100:
-        return False
-    # Разрешаем буквы, цифры, пробелы, дефис и подчёркивание
-    return bool(re.match(r"^[\w\s\-]+$", name))
-
-
-def validate_category(category: str) -> bool:
-    """
-    Проверка категории (необязательное поле, но если задано — должно быть строкой).
-    """
-    if category is None:
-        return True
-    if not isinstance(category, str):
-        raise TypeError("category must be a string or None")
-    return 0 < len(category.strip()) <= 50
-
-
-def parse_date(text: str) -> datetime:
-    """
-    Парсит дату в формате DD-MM-YYYY. Если пусто — возвращает сегодняшнюю дату.
-
-    Args:
-        text (str): Текст даты.
-
-    Returns:
-        datetime: parsed date
-
-    Raises:
-        ValueError: если формат неверный.
-    """
-    if text is None or not str(text).strip():
-        return datetime.now()
-    try:
-        return datetime.strptime(text.strip(), DATE_FORMAT)
-    except ValueError as exc:
-        raise ValueError(f"Неверный формат даты: ожидается {DATE_FORMAT}") from exc
+# habit_entry.py
+"""
+Ввод и валидация данных для Habit Tracker.
+
+Содержит функции по валидации названия, даты и целого числа.
+Все функции документированы в стиле Google.
+"""
+
+from datetime import datetime
+import re
+from typing import Any, Mapping, Optional
+
+from date_codec import DATE_FORMAT, day_or_zero, parse_day as _parse_day, today
+from instrumentation import timed
+
+MAX_NAME_LEN = 100
+MAX_CATEGORY_LEN = 50
+# верхняя граница target и streak в днях: больше любой реальной цели и
+# заведомо помещается в поля хранилищ
+MAX_DAYS = 1_000_000
+
+# Разрешаем буквы, цифры, пробелы, дефис и подчёркивание
+_NAME_RE = re.compile(r"^[\w\s\-]+$")
+# DD-MM-YYYY (день и месяц можно без ведущего нуля) или ISO YYYY-MM-DD —
+# формы, которые понимает date_codec
+_DATE_SHAPE_RE = re.compile(r"^(\d{1,2}-\d{1,2}-\d{4}|\d{4}-\d{2}-\d{2})$")
+
+
+def validate_name(name: str) -> bool:
+    """
+    Проверяет корректность названия привычки.
+
+    Args:
+        name (str): Название привычки.
+
+    Returns:
+        bool: True если название корректно (не пустое, не длиннее 100, без спецсимволов).
+    """
+    if not isinstance(name, str):
+        raise TypeError("name must be a string")
+    name = name.strip()
+    if not name:
+        return False
+    if len(name) > MAX_NAME_LEN:
+        return False
+    return _NAME_RE.match(name) is not None
+
+
+def validate_category(category: str) -> bool:
+    """
+    Проверка категории (необязательное поле, но если задано — должно быть строкой).
+    """
+    if category is None:
+        return True
+    if not isinstance(category, str):
+        raise TypeError("category must be a string or None")
+    return 0 < len(category.strip()) <= MAX_CATEGORY_LEN
+
+
+def record_error(record: Mapping[str, Any]) -> Optional[str]:
+    """
+    Проверяет запись импорта (словарь полей CSV) без исключений.
+
+    Проверки те же, что у add_habit, плюс формат target и дат; регулярные
+    выражения скомпилированы один раз, поэтому проверка пачки записей не
+    разбирает шаблоны заново.
+
+    Args:
+        record: Поля name, category, frequency, target, start_date,
+            last_done, streak (все, кроме name, необязательны).
+
+    Returns:
+        str: Описание первой ошибки или None, если запись корректна.
+    """
+    name = record.get("name")
+    if not isinstance(name, str) or not validate_name(name):
+        return f"неверное имя: {name!r}"
+    category = record.get("category")
+    if category not in (None, "") and (not isinstance(category, str) or not validate_category(category)):
+        return f"неверная категория: {category!r}"
+    for field in ("target", "streak"):
+        value = record.get(field)
+        if value in (None, ""):
+            continue
+        try:
+            number = int(str(value).strip())
+        except ValueError:
+            return f"{field} должно быть целым числом: {value!r}"
+        if number < 0 or number > MAX_DAYS or (field == "target" and number == 0):
+            return f"{field} вне допустимого диапазона: {value!r}"
+    for field in ("start_date", "last_done"):
+        value = record.get(field)
+        if value in (None, ""):
+            continue
+        if not isinstance(value, str) or not _DATE_SHAPE_RE.match(value.strip()):
+            return f"{field}: ожидается {DATE_FORMAT}, получено {value!r}"
+        if not day_or_zero(value):
+            return f"{field}: несуществующая дата {value!r}"
+    return None
+
+
+def parse_date(text: str) -> datetime:
+    """
+    Парсит дату в формате DD-MM-YYYY. Если пусто — возвращает сегодняшнюю дату.
+
+    Args:
+        text (str): Текст даты.
+
+    Returns:
+        datetime: parsed date
+
+    Raises:
+        ValueError: если формат неверный.
+    """
+    if text is None or not str(text).strip():
+        return datetime.now()
+    return datetime.fromordinal(parse_day(text))
+
+
+@timed("entry.parse_day")
+def parse_day(text: str) -> int:
+    """
+    Как parse_date, но сразу порядковый номер дня (см. date_codec).
+
+    Raises:
+        ValueError: если формат неверный.
+    """
+    if text is None or not str(text).strip():
+        return today()
+    try:
+        return _parse_day(text)
+    except ValueError as exc:
+        raise ValueError(f"Неверный формат даты: ожидается {DATE_FORMAT}") from exc
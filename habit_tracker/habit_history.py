@@ -0,0 +1,128 @@
+# habit_history.py
+"""
+История выполнений привычки в виде битового множества дней.
+
+Бит i соответствует дню ``base + i`` (порядковый номер дня). Отметка и
+снятие отметки — O(1), серия и число выполнений за окно считаются
+битовыми операциями над целым числом.
+"""
+
+import base64
+from typing import Optional
+
+
+class CompletionHistory:
+    """
+    Битовое множество выполненных дней.
+
+    Attributes:
+        base (int): Порядковый номер дня, соответствующий биту 0. Пустая
+            история перепривязывается к первой отметке; отметки раньше base
+            расширяют буфер влево целыми байтами.
+        bits (bytearray): Биты в порядке little-endian.
+    """
+
+    __slots__ = ("base", "bits")
+
+    def __init__(self, base: int, bits: Optional[bytearray] = None):
+        self.base = base
+        self.bits = bits if bits is not None else bytearray()
+
+    def _offset(self, day: int) -> int:
+        """Индекс бита для дня; расширяет буфер влево при необходимости."""
+        if not self.bits:
+            self.base = day
+        elif day < self.base:
+            grow = (self.base - day + 7) // 8
+            self.bits[0:0] = bytes(grow)
+            self.base -= grow * 8
+        return day - self.base
+
+    def is_done(self, day: int) -> bool:
+        """Отмечен ли день."""
+        i = day - self.base
+        if i < 0 or (i >> 3) >= len(self.bits):
+            return False
+        return bool(self.bits[i >> 3] & (1 << (i & 7)))
+
+    def mark(self, day: int) -> bool:
+        """Отмечает день. Возвращает False, если он уже был отмечен."""
+        i = self._offset(day)
+        byte = i >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte - len(self.bits) + 1))
+        mask = 1 << (i & 7)
+        if self.bits[byte] & mask:
+            return False
+        self.bits[byte] |= mask
+        return True
+
+    def unmark(self, day: int) -> bool:
+        """Снимает отметку. Возвращает False, если день не был отмечен."""
+        if not self.is_done(day):
+            return False
+        i = day - self.base
+        self.bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+        return True
+
+    def last_day(self) -> int:
+        """Последний отмеченный день (0 — нет отметок)."""
+        for byte in range(len(self.bits) - 1, -1, -1):
+            if self.bits[byte]:
+                return self.base + byte * 8 + self.bits[byte].bit_length() - 1
+        return 0
+
+    def _as_int(self, upto: int) -> int:
+        """Биты дней base..upto (включительно) как целое число."""
+        i = upto - self.base
+        if i < 0:
+            return 0
+        value = int.from_bytes(self.bits[:(i >> 3) + 1], "little")
+        return value & ((1 << (i + 1)) - 1)
+
+    def streak(self, end: Optional[int] = None) -> int:
+        """
+        Длина непрерывной серии отмеченных дней, заканчивающейся в end.
+
+        Args:
+            end (int): День окончания серии; по умолчанию — последний отмеченный.
+        """
+        if end is None:
+            end = self.last_day()
+            if not end:
+                return 0
+        if not self.is_done(end):
+            return 0
+        width = end - self.base + 1
+        gaps = ~self._as_int(end) & ((1 << width) - 1)
+        if not gaps:
+            return width
+        return width - gaps.bit_length()
+
+    def count(self, start: int, end: int) -> int:
+        """Число отмеченных дней в окне [start, end]."""
+        if end < start:
+            return 0
+        value = self._as_int(end)
+        if start > self.base:
+            value >>= start - self.base
+        return value.bit_count()
+
+    def completion_rate(self, start: int, end: int) -> float:
+        """Доля отмеченных дней в окне [start, end] в процентах."""
+        if end < start:
+            return 0.0
+        return self.count(start, end) / (end - start + 1) * 100
+
+    def copy(self) -> "CompletionHistory":
+        """Независимая копия истории."""
+        return CompletionHistory(self.base, bytearray(self.bits))
+
+    def encode(self) -> str:
+        """Компактная строка для хранения на диске: base64 без хвостовых нулей."""
+        return base64.b64encode(bytes(self.bits).rstrip(b"\x00")).decode("ascii")
+
+    @classmethod
+    def decode(cls, base: int, text: str) -> "CompletionHistory":
+        """Восстанавливает историю из base и строки encode()."""
+        return cls(base, bytearray(base64.b64decode(text or "")))
@@ -1,138 +1,834 @@
-# habit_manager.py
-"""
-Класс HabitManager — CRUD и работа с CSV.
-Документация Google-style для методов.
-"""
-
-import csv
-import os
-from datetime import datetime, timedelta
-from typing import List, Dict
-
-from habit_entry import parse_date, validate_name, validate_category, DATE_FORMAT
-
-DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
-DEFAULT_FILE = os.path.join(DATA_DIR, "habits.csv")
-
-
-class HabitError(Exception):
-    """Базовое исключение для менеджера привычек."""
-    pass
-
-
-class HabitManager:
-    """Менеджер привычек: загрузка, сохранение, добавление, отметка, поиск."""
-
-    FIELDNAMES = ["name", "category", "frequency", "start_date",
-                  "last_done", "streak", "target", "progress"]
-
-    def __init__(self, file_path: str = DEFAULT_FILE):
-        """Инициализация менеджера — загружает данные или создаёт файл."""
-        self.file_path = file_path
-        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
-        if not os.path.exists(self.file_path):
-            # создаём CSV с заголовком
-            with open(self.file_path, "w", encoding="utf-8", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=self.FIELDNAMES)
-                writer.writeheader()
-        self.habits = self._load_habits()
-
-    def _load_habits(self) -> List[Dict[str, str]]:
-        """Загружает все привычки из CSV в список словарей."""
-        try:
-            with open(self.file_path, "r", encoding="utf-8", newline="") as f:
-                reader = csv.DictReader(f)
-                return list(reader)
-        except Exception as exc:
-            raise HabitError(f"Ошибка загрузки данных: {exc}") from exc
-
-    def _save_habits(self) -> None:
-        """Сохраняет self.habits в CSV."""
-        try:
-            with open(self.file_path, "w", encoding="utf-8", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=self.FIELDNAMES)
-                writer.writeheader()
-                writer.writerows(self.habits)
-        except Exception as exc:
-            raise HabitError(f"Ошибка сохранения данных: {exc}") from exc
-
-    def add_habit(self, name: str, category: str = "Общее", frequency: str = "daily", target: int = 30) -> None:
-        """
-        Добавляет новую привычку.
-
-        Raises:
-            HabitError: если имя некорректно или привычка уже существует.
-        """
-        if not validate_name(name):
-            raise HabitError("Неверное имя привычки.")
-        if not validate_category(category):
-            raise HabitError("Неверная категория.")
-        if any(h["name"].strip().lower() == name.strip().lower() for h in self.habits):
-            raise HabitError("Привычка с таким именем уже существует.")
-        now = datetime.now().strftime(DATE_FORMAT)
-        entry = {
-            "name": name.strip(),
-            "category": category.strip(),
-            "frequency": frequency,
-            "start_date": now,
-            "last_done": "",
-            "streak": "0",
-            "target": str(int(target)),
-            "progress": "0%"
-        }
-        self.habits.append(entry)
-        self._save_habits()
-
-    def remove_habit(self, name: str) -> None:
-        """Удаляет привычку по имени. Если нет — бросает исключение."""
-        before = len(self.habits)
-        self.habits = [h for h in self.habits if h["name"].strip().lower() != name.strip().lower()]
-        if len(self.habits) == before:
-            raise HabitError("Привычка не найдена.")
-        self._save_habits()
-
-    def list_habits(self) -> List[Dict[str, str]]:
-        """Возвращает список всех привычек."""
-        return self.habits
-
-    def find_habit(self, name: str) -> Dict[str, str]:
-        """Ищет привычку по имени, возвращает словарь или бросает HabitError."""
-        for h in self.habits:
-            if h["name"].strip().lower() == name.strip().lower():
-                return h
-        raise HabitError("Привычка не найдена.")
-
-    def mark_done(self, name: str, date_text: str = "") -> None:
-        """
-        Отметить выполнение привычки на дату date_text (если пусто — сегодня).
-        Обновляет last_done, streak и progress.
-        """
-        d = parse_date(date_text).strftime(DATE_FORMAT)
-        habit = self.find_habit(name)
-        last_done = habit.get("last_done", "").strip()
-        if last_done:
-            try:
-                last_dt = datetime.strptime(last_done, DATE_FORMAT)
-                curr_dt = datetime.strptime(d, DATE_FORMAT)
-                delta = (curr_dt - last_dt).days
-                if delta == 0:
-                    # Уже отмечено за этот день — ничего не делаем
-                    return
-                elif delta == 1:
-                    habit["streak"] = str(int(habit.get("streak", "0")) + 1)
-                elif delta > 1:
-                    habit["streak"] = "1"
-                else:
-                    # дата раньше — игнорируем или считаем как отдельная отметка
-                    habit["streak"] = str(int(habit.get("streak", "0")) + 1)
-            except ValueError:
-                habit["streak"] = "1"
-        else:
-            habit["streak"] = "1"
-        habit["last_done"] = d
-        try:
-            progress = int(habit["streak"]) / max(1, int(habit.get("target", "30"))) * 100
-        except Exception:
-            progress = 0.0
-        habit["progress"] = f"{progress:.1f}%"
-        self._save_habits()
+# habit_manager.py
+"""
+Класс HabitManager — CRUD и работа с CSV.
+Документация Google-style для методов.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from date_codec import DATE_FORMAT, today as _today
+from habit_entry import parse_day, validate_name, validate_category
+from habit_record import Habit, FIELDNAMES, normalize_name as _normalize
+from habit_history import CompletionHistory
+from instrumentation import count, timed
+from overdue_index import OverdueIndex
+from search_index import SearchIndex
+from storage import COMPACT_THRESHOLD, HabitStorage, Op, SnapshotStorage, SqliteStorage, open_storage
+from write_behind import DEFAULT_MAX_DELAY, WriteBehind, close_at_exit, forget
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DEFAULT_FILE = os.path.join(DATA_DIR, "habits.csv")
+# аргументы add_habit, которые принимает add_habits
+_ADD_HABIT_FIELDS = {"name", "category", "frequency", "target"}
+
+# listener(event, key, before, after); event: "add" | "remove" | "update" | "load"
+Listener = Callable[[str, Optional[str], Optional[Habit], Optional[Habit]], None]
+
+
+class HabitError(Exception):
+    """Базовое исключение для менеджера привычек."""
+    pass
+
+
+class HabitManager:
+    """
+    Менеджер привычек: загрузка, сохранение, добавление, отметка, поиск.
+
+    Привычки хранятся в словаре ``_index`` (нормализованное имя -> Habit),
+    поэтому поиск, проверка дубликатов и удаление выполняются за O(1).
+    Порядок вставки словаря совпадает с порядком строк в хранилище.
+
+    Данные лежат в хранилище (см. storage.py): CSV, CSV с журналом
+    (``journal=True``) или SQLite (файл .db). Для ленивого хранилища
+    ``_index`` — кэш: записи подтягиваются по одной при обращении, а всё
+    содержимое загружается только при list_habits().
+
+    История выполнений каждой привычки (CompletionHistory) является
+    источником истины: last_done, streak и progress выводятся из неё. Для
+    строк без истории она восстанавливается из last_done и streak.
+
+    Внутри ``with manager.batch():`` мутации копятся в памяти и сохраняются
+    одним сбросом при выходе; при исключении состояние откатывается.
+
+    Запросы "не выполнялись N дней" (overdue, most_overdue) отвечает
+    OverdueIndex — отсортированный по дню последней отметки индекс, который
+    строится при первом запросе и затем поддерживается при каждом изменении.
+    Так же устроен SearchIndex для search(): категория, начало слова и
+    подстрока имени, прогресс.
+
+    Подписчики (subscribe) получают событие о каждом изменении в памяти:
+    "add" и "remove" с записью, "update" со снимком до и записью после,
+    "load" — когда содержимое заменено целиком (загрузка, откат batch(),
+    перечитывание после записи другим процессом).
+
+    С одним файлом могут работать несколько процессов. Запись идёт под
+    межпроцессной блокировкой хранилища; если метка версии файла
+    изменилась с момента чтения, свежие данные перечитываются и мутации
+    накладываются на них построчно (последняя запись строки выигрывает).
+    Публичные методы сначала вызывают refresh(): он сравнивает метку
+    версии (stat файлов, без чтения) и перечитывает данные, только если
+    файл действительно изменился.
+
+    С ``write_behind=<секунды>`` мутации не ждут диска: операции уходят в
+    очередь WriteBehind, и фоновый поток пишет их пачкой, когда поток
+    изменений утихнет. flush() и close() дожидаются записи. Фоновый поток
+    не меняет состояние менеджера и не рассылает событий: если файл
+    изменён другим процессом, запись откладывается, а слияние делает
+    refresh() в потоке вызывающего.
+    """
+
+    FIELDNAMES = FIELDNAMES
+
+    def __init__(self, file_path: str = DEFAULT_FILE, journal: bool = False,
+                 compact_threshold: int = COMPACT_THRESHOLD,
+                 storage: Optional[HabitStorage] = None,
+                 write_behind: Optional[float] = None,
+                 write_behind_max_delay: float = DEFAULT_MAX_DELAY):
+        """
+        Инициализация менеджера — загружает данные или создаёт файл.
+
+        Args:
+            file_path (str): Путь к CSV-файлу или базе SQLite (.db).
+            journal (bool): Писать мутации в журнал вместо перезаписи CSV.
+            compact_threshold (int): Число записей журнала до компактации.
+            storage (HabitStorage): Готовое хранилище (перекрывает file_path).
+            write_behind (float): Окно отложенной записи в секундах
+                (None — писать синхронно при каждой мутации).
+            write_behind_max_delay (float): Предельная задержка отложенной записи.
+        """
+        try:
+            self.storage = storage or open_storage(file_path, journal, compact_threshold)
+        except Exception as exc:
+            raise HabitError(f"Ошибка открытия хранилища: {exc}") from exc
+        self.file_path = self.storage.path
+        self._batch_depth = 0
+        self._pending: List[Op] = []
+        self._batch_index: Dict[str, Habit] = {}
+        self._batch_complete = False
+        self._batch_rows: Dict[int, Tuple[Habit, Habit]] = {}
+        self._index: Dict[str, Habit] = {}
+        self._complete = False
+        self._listeners: List[Listener] = []
+        self._overdue: Optional[OverdueIndex] = None
+        self._search: Optional[SearchIndex] = None
+        # индекс, построенный в другом потоке (search_index_builder), и номер
+        # изменения, на котором снят его список записей
+        self._prebuilt: Optional[Tuple[int, SearchIndex]] = None
+        self._changes = 0
+        self._version: Any = None
+        # сериализует запись и перечитывание между потоком вызывающего и WriteBehind
+        self._io_lock = threading.RLock()
+        self._writer: Optional[WriteBehind] = None
+        if not self.storage.lazy:
+            self._load_habits()
+        else:
+            self._version = self._storage_version()
+        if write_behind is not None:
+            self._writer = WriteBehind(self._write_behind, window=write_behind,
+                                       max_delay=write_behind_max_delay)
+            close_at_exit(self)
+
+    @property
+    def habits(self) -> List[Habit]:
+        """Список привычек в порядке добавления."""
+        self.refresh()
+        self._ensure_complete()
+        return list(self._index.values())
+
+    @timed("manager.load")
+    def _load_habits(self) -> List[Habit]:
+        """Загружает все привычки из хранилища и перестраивает индекс по имени."""
+        try:
+            with self._io_lock, self.storage.lock():
+                version = self.storage.version()
+                index = self.storage.load_all()
+        except Exception as exc:
+            raise HabitError(f"Ошибка загрузки данных: {exc}") from exc
+        for habit in index.values():
+            self._prepare(habit)
+        self._index = index
+        self._complete = True
+        self._version = version
+        self._notify("load", None, None, None)
+        return self.habits
+
+    def _storage_version(self) -> Any:
+        try:
+            return self.storage.version()
+        except Exception as exc:
+            raise HabitError(f"Ошибка чтения данных: {exc}") from exc
+
+    def is_stale(self) -> bool:
+        """
+        Изменены ли данные другим процессом (без перечитывания).
+
+        Только сверяет метку версии, поэтому безопасно вызывается из другого
+        потока; перечитывает refresh().
+        """
+        return self._storage_version() != self._version
+
+    @timed("manager.refresh")
+    def refresh(self) -> bool:
+        """
+        Перечитывает данные, если их изменил другой процесс.
+
+        Проверка стоит несколько вызовов stat (для SQLite — один PRAGMA),
+        поэтому вызывается перед каждой публичной операцией. Внутри batch()
+        не выполняется, чтобы не подменить состояние транзакции.
+
+        Returns:
+            bool: True, если данные были перечитаны (подписчики получили "load").
+        """
+        if self._batch_depth:
+            return False
+        if self._writer is None:
+            return self._refresh()
+        # фоновая запись идёт прямо сейчас: метка версии вот-вот обновится
+        if not self._io_lock.acquire(blocking=False):
+            return False
+        try:
+            return self._refresh()
+        finally:
+            self._io_lock.release()
+
+    def _refresh(self) -> bool:
+        version = self._storage_version()
+        if version == self._version:
+            return False
+        count("manager.external_reload")
+        unwritten = self._writer.unwritten() if self._writer is not None else {}
+        if unwritten:
+            self._merge_unwritten(list(unwritten.values()))
+        elif self.storage.lazy:
+            # ленивый кэш просто сбрасывается: строки подтянутся по запросу
+            self._index = {}
+            self._complete = False
+            self._version = version
+            self._notify("load", None, None, None)
+        else:
+            self._load_habits()
+        return True
+
+    def subscribe(self, listener: Listener) -> None:
+        """Подписывает listener(event, key, before, after) на изменения."""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Listener) -> None:
+        """Отменяет подписку."""
+        self._listeners.remove(listener)
+
+    def _notify(self, event: str, key: Optional[str],
+                before: Optional[Habit], after: Optional[Habit]) -> None:
+        self._changes += 1
+        if event == "load":
+            # перестроятся при следующем запросе
+            self._overdue = None
+            self._search = None
+        else:
+            if self._overdue is not None:
+                self._overdue.on_change(event, key, before, after)
+            if self._search is not None:
+                self._search.on_change(event, key, before, after)
+        for listener in self._listeners:
+            listener(event, key, before, after)
+
+    def _ensure_complete(self) -> None:
+        """Догружает ленивое хранилище целиком, сохраняя уже выданные записи."""
+        if self._complete:
+            return
+        # фоновый поток WriteBehind меняет состояние хранилища под той же блокировкой
+        with self._io_lock:
+            if self._complete:
+                return
+            try:
+                loaded = self.storage.load_all()
+            except Exception as exc:
+                raise HabitError(f"Ошибка загрузки данных: {exc}") from exc
+            # внутри batch() и в очереди WriteBehind удаления ещё не сброшены в хранилище
+            deleted = self._unwritten_deletes() - self._index.keys()
+            index = {}
+            for key, habit in loaded.items():
+                if key not in deleted:
+                    cached = self._index.get(key)
+                    index[key] = cached if cached is not None else self._prepare(habit)
+            for key, habit in self._index.items():
+                index.setdefault(key, habit)
+            self._index = index
+            self._complete = True
+
+    def _lookup(self, key: str) -> Optional[Habit]:
+        """Запись по ключу: из индекса или, для ленивого хранилища, из базы."""
+        habit = self._index.get(key)
+        if habit is not None or self._complete:
+            return habit
+        with self._io_lock:
+            if key in self._unwritten_deletes():
+                return None
+            try:
+                habit = self.storage.get(key)
+            except Exception as exc:
+                raise HabitError(f"Ошибка загрузки данных: {exc}") from exc
+            if habit is not None:
+                self._index[key] = self._prepare(habit)
+        return habit
+
+    def _unwritten_deletes(self) -> set:
+        """Ключи удалений, ещё не дошедших до хранилища."""
+        deleted = {key for op, key, _ in self._pending if op == "del"}
+        if self._writer is not None:
+            deleted.update(key for key, (op, _, _) in self._writer.unwritten().items() if op == "del")
+        return deleted
+
+    def _prepare(self, habit: Habit) -> Habit:
+        """Создаёт историю для старых строк и выводит из неё производные поля."""
+        if habit.history is None:
+            habit.history = self._seed_history(habit)
+        self._derive(habit)
+        return habit
+
+    @staticmethod
+    def _seed_history(habit: Habit) -> CompletionHistory:
+        """История для старых строк: streak дней подряд, заканчивая last_done."""
+        history = CompletionHistory(habit.start or habit.last)
+        if habit.last:
+            for day in range(habit.last - max(1, habit.streak) + 1, habit.last + 1):
+                history.mark(day)
+        return history
+
+    @staticmethod
+    def _derive(habit: Habit) -> None:
+        """Пересчитывает last_done, streak и progress по истории выполнений."""
+        habit.last = habit.history.last_day()
+        habit.streak = habit.history.streak()
+        habit.progress = round(habit.streak / max(1, habit.target) * 100, 1)
+
+    @timed("manager.save_all")
+    def _save_habits(self) -> None:
+        """Сохраняет все записи в хранилище целиком."""
+        # у ленивого хранилища в индексе только запрошенные записи
+        self._ensure_complete()
+        try:
+            self.storage.save_all(self._index)
+        except Exception as exc:
+            raise HabitError(f"Ошибка сохранения данных: {exc}") from exc
+
+    def _persist(self, op: str, key: str, habit: Habit = None) -> None:
+        """
+        Фиксирует одну мутацию в хранилище (или откладывает до конца batch()).
+
+        Args:
+            op (str): "put" (добавление/изменение) или "del" (удаление).
+            key (str): Нормализованное имя привычки.
+            habit (Habit): Новая версия записи для "put".
+        """
+        if self._batch_depth:
+            self._pending.append((op, key, habit))
+            return
+        self._commit([(op, key, habit)])
+
+    @timed("manager.flush")
+    def _flush(self, ops: List[Op]) -> None:
+        """
+        Записывает накопленные мутации одной операцией ввода-вывода.
+
+        Под блокировкой хранилища сверяет метку версии: если файл изменён
+        другим процессом, сначала накладывает ops на свежие данные.
+        """
+        if not ops:
+            return
+        try:
+            with self._io_lock, self.storage.lock():
+                merged = self.storage.version() != self._version
+                if merged:
+                    self._merge_external(ops)
+                self.storage.write(ops, self._index)
+                self._version = self.storage.version()
+        except Exception as exc:
+            raise HabitError(f"Ошибка сохранения данных: {exc}") from exc
+        if merged:
+            count("manager.external_merge")
+            self._notify("load", None, None, None)
+
+    def _merge_unwritten(self, ops: List[Op]) -> None:
+        """Перечитывает данные другого процесса поверх ещё не записанных ops."""
+        try:
+            with self.storage.lock():
+                version = self.storage.version()
+                self._merge_external(ops)
+        except Exception as exc:
+            raise HabitError(f"Ошибка загрузки данных: {exc}") from exc
+        self._version = version
+        self._notify("load", None, None, None)
+        self._writer.resume()
+
+    def _write_behind(self, ops: List[Op]) -> bool:
+        """
+        Запись очереди WriteBehind (в фоновом потоке).
+
+        Returns:
+            bool: False — запись отложена: идёт batch() или файл изменён
+            другим процессом (слияние выполнит refresh()).
+        """
+        with self._io_lock:
+            if self._batch_depth:
+                return False
+            # копия словаря атомарна под GIL; записи пишутся в текущем состоянии
+            index = dict(self._index)
+            with self.storage.lock():
+                if self.storage.version() != self._version:
+                    return False
+                self.storage.write(ops, index)
+                self._version = self.storage.version()
+        return True
+
+    def _commit(self, ops: List[Op]) -> None:
+        """Сохраняет ops сразу или ставит в очередь отложенной записи."""
+        if self._writer is not None:
+            self._writer.submit(ops)
+        else:
+            self._flush(ops)
+
+    def flush(self) -> None:
+        """
+        Дожидается записи всех отложенных мутаций (без write_behind — ничего).
+
+        Raises:
+            HabitError: если запись не удалась.
+        """
+        if self._writer is None:
+            return
+        try:
+            if not self._writer.flush():
+                # отложено из-за изменений другого процесса: сливаем и пишем
+                self._refresh_locked()
+                self._writer.flush()
+        except HabitError:
+            raise
+        except Exception as exc:
+            raise HabitError(f"Ошибка сохранения данных: {exc}") from exc
+
+    def _refresh_locked(self) -> None:
+        with self._io_lock:
+            self._refresh()
+
+    def persistence_stats(self) -> Dict[str, Any]:
+        """Счётчики отложенной записи (пусто без write_behind)."""
+        return self._writer.stats() if self._writer is not None else {}
+
+    def _merge_external(self, ops: List[Op]) -> None:
+        """Заменяет индекс свежими данными хранилища с наложенными ops."""
+        if self.storage.lazy:
+            # строки пишутся по одной, затирать нечего — сбрасываем кэш
+            self._index = {key: habit for op, key, habit in ops if op == "put"}
+            self._complete = False
+            return
+        index = self.storage.load_all()
+        for habit in index.values():
+            self._prepare(habit)
+        for op, key, habit in ops:
+            if op == "put":
+                index[key] = habit
+            else:
+                index.pop(key, None)
+        self._index = index
+        self._complete = True
+
+    def _touch(self, habit: Habit) -> None:
+        """Запоминает исходную версию записи перед изменением внутри batch()."""
+        if self._batch_depth and id(habit) not in self._batch_rows:
+            self._batch_rows[id(habit)] = (habit, habit.copy())
+
+    @contextmanager
+    def batch(self) -> Iterator["HabitManager"]:
+        """
+        Откладывает сохранение до конца блока и делает его атомарным.
+
+        Все мутации внутри блока сбрасываются на диск один раз. Если блок
+        завершился исключением (например, HabitError), индекс и изменённые
+        записи возвращаются к состоянию на входе, а на диск ничего не пишется.
+        Вложенные вызовы присоединяются к внешней транзакции.
+        """
+        if self._batch_depth:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+            return
+        self._batch_index = dict(self._index)
+        self._batch_complete = self._complete
+        self._batch_rows = {}
+        self._pending = []
+        self._batch_depth = 1
+        try:
+            yield self
+        except BaseException:
+            self._index = self._batch_index
+            self._complete = self._batch_complete
+            for habit, original in self._batch_rows.values():
+                habit.restore(original)
+            self._notify("load", None, None, None)
+            raise
+        else:
+            self._commit(self._pending)
+        finally:
+            self._batch_depth = 0
+            self._pending = []
+            self._batch_index = {}
+            self._batch_rows = {}
+
+    def compact(self) -> None:
+        """Сжимает хранилище: переписывает CSV-снимок и очищает журнал и т.п."""
+        self.flush()
+        try:
+            with self._io_lock:
+                if isinstance(self.storage, SnapshotStorage):
+                    # файл переписывается целиком: заодно сохраняем истории,
+                    # выведенные для старых строк, чтобы не выводить их при каждом старте
+                    self._ensure_complete()
+                self.storage.compact(self._index)
+        except Exception as exc:
+            raise HabitError(f"Ошибка компактации: {exc}") from exc
+
+    def close(self) -> None:
+        """Дописывает отложенные мутации, останавливает WriteBehind и закрывает хранилище."""
+        try:
+            self.flush()
+        finally:
+            if self._writer is not None:
+                self._writer.stop()
+                self._writer = None
+                forget(self)
+            self.storage.close()
+
+    @timed("manager.add_habit")
+    def add_habit(self, name: str, category: str = "Общее", frequency: str = "daily", target: int = 30) -> None:
+        """
+        Добавляет новую привычку.
+
+        Raises:
+            HabitError: если имя некорректно или привычка уже существует.
+        """
+        if not validate_name(name):
+            raise HabitError("Неверное имя привычки.")
+        if not validate_category(category):
+            raise HabitError("Неверная категория.")
+        self.refresh()
+        key = _normalize(name)
+        if self._lookup(key) is not None:
+            raise HabitError("Привычка с таким именем уже существует.")
+        today = _today()
+        entry = Habit(
+            name=name.strip(),
+            category=category.strip(),
+            frequency=frequency,
+            start=today,
+            target=int(target),
+            history=CompletionHistory(today),
+        )
+        self._index[key] = entry
+        self._notify("add", key, None, entry)
+        self._persist("put", key, entry)
+
+    @timed("manager.remove_habit")
+    def remove_habit(self, name: str) -> None:
+        """Удаляет привычку по имени. Если нет — бросает исключение."""
+        self.refresh()
+        key = _normalize(name)
+        habit = self._lookup(key)
+        if habit is None:
+            raise HabitError("Привычка не найдена.")
+        del self._index[key]
+        self._notify("remove", key, habit, None)
+        self._persist("del", key)
+
+    def list_habits(self) -> List[Habit]:
+        """Возвращает список всех привычек."""
+        return self.habits
+
+    @timed("manager.find_habit")
+    def find_habit(self, name: str) -> Habit:
+        """Ищет привычку по имени, возвращает запись Habit или бросает HabitError."""
+        self.refresh()
+        return self._find(name)
+
+    def _find(self, name: str) -> Habit:
+        """find_habit без проверки изменений файла (записи остаются в текущем индексе)."""
+        habit = self._lookup(_normalize(name))
+        if habit is None:
+            raise HabitError("Привычка не найдена.")
+        return habit
+
+    def check_consistency(self) -> None:
+        """
+        Проверяет, что индекс согласован с записями.
+
+        Raises:
+            HabitError: если ключ не совпадает с нормализованным именем записи.
+        """
+        for key, habit in self._index.items():
+            if key != _normalize(habit.name):
+                raise HabitError(f"Индекс рассогласован: '{key}' -> '{habit.name}'")
+
+    @timed("manager.mark_done")
+    def mark_done(self, name: str, date_text: str = "") -> None:
+        """
+        Отметить выполнение привычки на дату date_text (если пусто — сегодня).
+        Обновляет историю, а по ней last_done, streak и progress. Отметка
+        задним числом корректно заполняет пропуск в серии.
+        """
+        day = parse_day(date_text)
+        self._apply_mark(self.find_habit(name), day)
+
+    def _apply_mark(self, habit: Habit, day: int) -> None:
+        """Применяет отметку на уже разобранную дату (порядковый номер дня)."""
+        if habit.history.is_done(day):
+            # Уже отмечено за этот день — ничего не делаем
+            return
+        self._change(habit, habit.history.mark, day)
+
+    def _change(self, habit: Habit, mutate: Callable[[int], bool], day: int) -> None:
+        """Общая часть mark/unmark: откат, пересчёт полей, событие, сохранение."""
+        self._touch(habit)
+        before = habit.snapshot() if self._listeners else None
+        mutate(day)
+        self._derive(habit)
+        key = _normalize(habit.name)
+        self._notify("update", key, before, habit)
+        self._persist("put", key, habit)
+
+    @timed("manager.unmark_done")
+    def unmark_done(self, name: str, date_text: str = "") -> None:
+        """
+        Снять отметку выполнения за дату date_text (если пусто — сегодня).
+
+        Raises:
+            HabitError: если привычка не найдена.
+        """
+        day = parse_day(date_text)
+        habit = self.find_habit(name)
+        if not habit.history.is_done(day):
+            return
+        self._change(habit, habit.history.unmark, day)
+
+    @timed("manager.completion_rate")
+    def completion_rate(self, name: str, start_text: str, end_text: str = "") -> float:
+        """
+        Процент выполненных дней привычки в окне [start_text, end_text].
+
+        Args:
+            name (str): Название привычки.
+            start_text (str): Начало окна DD-MM-YYYY.
+            end_text (str): Конец окна DD-MM-YYYY (пусто — сегодня).
+        """
+        habit = self.find_habit(name)
+        return habit.history.completion_rate(parse_day(start_text),
+                                             parse_day(end_text))
+
+    def _overdue_index(self) -> OverdueIndex:
+        if self._overdue is None:
+            self._overdue = OverdueIndex(self.habits)
+        return self._overdue
+
+    @timed("manager.overdue")
+    def overdue(self, days_threshold: int = 3, today: Optional[int] = None) -> List[str]:
+        """
+        Привычки, не выполнявшиеся days_threshold дней, за O(log n + k).
+
+        Результат совпадает с notifications.needs_attention(list_habits()).
+
+        Args:
+            days_threshold (int): Порог в днях.
+            today (int): Порядковый номер «сегодня» (по умолчанию текущая дата).
+        """
+        return self._overdue_index().overdue(days_threshold, today)
+
+    def overdue_many(self, thresholds: Iterable[int],
+                     today: Optional[int] = None) -> Dict[int, List[str]]:
+        """overdue() для нескольких порогов сразу: порог -> имена."""
+        return self._overdue_index().overdue_many(thresholds, today)
+
+    def most_overdue(self, k: int, today: Optional[int] = None) -> List[Tuple[str, Optional[int]]]:
+        """
+        k самых запущенных привычек: сначала ни разу не отмеченные, затем по давности.
+
+        Returns:
+            list: Пары (имя, дней с последней отметки или None).
+        """
+        return self._overdue_index().most_overdue(k, today)
+
+    def _search_index(self) -> SearchIndex:
+        if self._search is None:
+            prebuilt, self._prebuilt = self._prebuilt, None
+            if prebuilt is not None and prebuilt[0] == self._changes:
+                self._search = prebuilt[1]
+            else:
+                self._search = SearchIndex(self.habits)
+        return self._search
+
+    def search_index_builder(self) -> Callable[[], None]:
+        """
+        Построение поискового индекса для запуска в другом потоке.
+
+        Список записей снимается сразу, в потоке вызова; возвращаемая
+        функция только строит по нему индекс и не трогает остальное
+        состояние менеджера. search() подключит готовый индекс, если с
+        момента снимка не было изменений, иначе построит заново.
+        """
+        habits = self.habits
+        changes = self._changes
+
+        def build() -> None:
+            self._prebuilt = (changes, SearchIndex(habits))
+        return build
+
+    @timed("manager.search")
+    def search(self, query: str = "", category: Optional[str] = None,
+               overdue_days: Optional[int] = None, min_progress: Optional[float] = None,
+               max_progress: Optional[float] = None, prefix_only: bool = False,
+               limit: Optional[int] = None, today: Optional[int] = None) -> List[Habit]:
+        """
+        Фильтр привычек: подстрока или начало слова имени, категория,
+        давность отметки и диапазон прогресса (условия объединяются по «и»).
+
+        Поиск без учёта регистра, «ё» равна «е». Результат — записи
+        менеджера в его порядке.
+
+        Args:
+            query (str): Подстрока имени (с prefix_only=True — начало слова).
+            category (str): Категория.
+            overdue_days (int): Только не отмечавшиеся столько дней.
+            min_progress (float): Прогресс не меньше, %.
+            max_progress (float): Прогресс не больше, %.
+            limit (int): Не больше стольких записей.
+            today (int): Порядковый номер «сегодня» (по умолчанию текущая дата).
+        """
+        self.refresh()
+        return self._search_index().search(query, category, overdue_days, min_progress,
+                                           max_progress, prefix_only, limit, today)
+
+    @timed("manager.mark_done_many")
+    def mark_done_many(self, items: Iterable[Tuple[str, str]]) -> None:
+        """
+        Отмечает сразу несколько выполнений с одним сохранением.
+
+        Args:
+            items: Пары (имя, дата DD-MM-YYYY или "" для сегодня).
+
+        Raises:
+            HabitError: если хоть одна привычка не найдена или дата неверна;
+                в этом случае ничего не меняется.
+        """
+        self.refresh()
+        resolved = []
+        for name, date_text in items:
+            habit = self._find(name)
+            try:
+                day = parse_day(date_text)
+            except ValueError as exc:
+                raise HabitError(f"{name}: {exc}") from exc
+            resolved.append((habit, day))
+        with self.batch():
+            for habit, day in resolved:
+                self._apply_mark(habit, day)
+
+    @timed("manager.add_habits")
+    def add_habits(self, items: Iterable[Dict[str, Any]]) -> None:
+        """
+        Добавляет несколько привычек с одним сохранением.
+
+        Args:
+            items: Словари с аргументами add_habit (name, category, frequency, target).
+
+        Raises:
+            HabitError: если хоть одна запись некорректна или имя повторяется;
+                в этом случае ничего не добавляется.
+        """
+        items = list(items)
+        self.refresh()
+        seen = set()
+        for number, item in enumerate(items, 1):
+            if not isinstance(item, dict):
+                raise HabitError(f"Запись {number}: ожидается словарь, получено {item!r}.")
+            name = item.get("name", "")
+            unknown = item.keys() - _ADD_HABIT_FIELDS
+            if unknown:
+                fields = ", ".join(sorted(map(str, unknown)))
+                raise HabitError(f"Неизвестные поля привычки '{name}': {fields}.")
+            if not isinstance(name, str) or not validate_name(name):
+                raise HabitError(f"Неверное имя привычки: '{name}'.")
+            category = item.get("category", "Общее")
+            if not isinstance(category, str) or not validate_category(category):
+                raise HabitError(f"Неверная категория: '{name}'.")
+            if not isinstance(item.get("frequency", "daily"), str):
+                raise HabitError(f"Неверная периодичность привычки '{name}'.")
+            target = item.get("target", 30)
+            try:
+                valid_target = not isinstance(target, bool) and int(target) > 0
+            except (TypeError, ValueError):
+                valid_target = False
+            if not valid_target:
+                raise HabitError(f"Неверная цель привычки '{name}': {target!r}.")
+            key = _normalize(name)
+            if key in seen or self._lookup(key) is not None:
+                raise HabitError(f"Привычка '{name}' уже существует.")
+            seen.add(key)
+        with self.batch():
+            for item in items:
+                self.add_habit(**item)
+
+    @timed("manager.insert_habits")
+    def insert_habits(self, habits: Iterable[Habit]) -> int:
+        """
+        Добавляет готовые записи как есть (импорт) с одним сохранением.
+
+        В отличие от add_habit сохраняет даты, streak и историю записей.
+        Записи должны быть уже проверены (habit_entry.record_error).
+
+        Returns:
+            int: Число добавленных записей.
+
+        Raises:
+            HabitError: если имя уже существует; в этом случае ничего не добавляется.
+        """
+        self.refresh()
+        added = 0
+        with self.batch():
+            for habit in habits:
+                key = _normalize(habit.name)
+                if self._lookup(key) is not None:
+                    raise HabitError(f"Привычка '{habit.name}' уже существует.")
+                self._prepare(habit)
+                self._index[key] = habit
+                self._notify("add", key, None, habit)
+                self._persist("put", key, habit)
+                added += 1
+        return added
+
+
+def migrate_to_sqlite(csv_path: str, db_path: str) -> int:
+    """
+    Переносит привычки (с историей выполнений) из CSV в базу SQLite.
+
+    Args:
+        csv_path (str): Исходный habits.csv.
+        db_path (str): Файл базы; существующие записи с теми же именами
+            перезаписываются.
+
+    Returns:
+        int: Число перенесённых привычек.
+    """
+    source = HabitManager(file_path=csv_path)
+    target = HabitManager(storage=SqliteStorage(db_path))
+    try:
+        source._ensure_complete()
+        target.storage.save_all(source._index)
+    except Exception as exc:
+        raise HabitError(f"Ошибка миграции: {exc}") from exc
+    finally:
+        target.close()
+        source.close()
+    return len(source._index)
@@ -0,0 +1,169 @@
+# habit_record.py
+"""
+Типизированная запись привычки.
+
+Habit хранит поля в нативных типах (int, float, порядковые номера дней),
+поэтому горячие пути не разбирают строки. Для совместимости запись ведёт
+себя как read-only словарь строк: h["streak"], h.get("progress", "0%").
+"""
+
+from collections.abc import Mapping
+from typing import Dict, Iterator, Union
+
+from date_codec import day_or_zero, format_day, parse_day
+from habit_history import CompletionHistory
+
+FIELDNAMES = ["name", "category", "frequency", "start_date",
+              "last_done", "streak", "target", "progress"]
+
+
+def normalize_name(name: str) -> str:
+    """Ключ индекса: имя без пробелов по краям и в нижнем регистре."""
+    return name.strip().lower()
+
+
+def date_to_ordinal(text: str) -> int:
+    """Строка DD-MM-YYYY -> порядковый номер дня (0 для пустой или неверной)."""
+    return day_or_zero(text)
+
+
+def ordinal_to_date(ordinal: int) -> str:
+    """Порядковый номер дня -> строка DD-MM-YYYY ("" для 0)."""
+    return format_day(ordinal)
+
+
+def _to_int(text: str, default: int) -> int:
+    try:
+        return int(float(str(text).strip()))
+    except (TypeError, ValueError):
+        return default
+
+
+def _to_progress(text: str) -> float:
+    try:
+        return float(str(text).strip().strip("%"))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class Habit(Mapping):
+    """
+    Запись привычки.
+
+    Attributes:
+        name (str): Название.
+        category (str): Категория.
+        frequency (str): Периодичность ("daily" и т.п.).
+        start (int): Порядковый номер дня начала (0 — неизвестно).
+        last (int): Порядковый номер дня последней отметки (0 — не отмечалась).
+        streak (int): Текущая серия дней.
+        target (int): Цель в днях.
+        progress (float): Прогресс в процентах (streak / target).
+        history (CompletionHistory): Выполненные дни; last, streak и progress
+            выводятся из неё менеджером.
+    """
+
+    __slots__ = ("name", "category", "frequency", "start",
+                 "last", "streak", "target", "progress", "history")
+
+    def __init__(self, name: str, category: str = "Общее", frequency: str = "daily",
+                 start: int = 0, last: int = 0, streak: int = 0, target: int = 30,
+                 progress: float = 0.0, history: CompletionHistory = None):
+        self.name = name
+        self.category = category
+        self.frequency = frequency
+        self.start = start
+        self.last = last
+        self.streak = streak
+        self.target = target
+        self.progress = progress
+        self.history = history
+
+    @classmethod
+    def from_row(cls, row: Mapping) -> "Habit":
+        """Разбирает строку CSV (словарь строк) — единственное место парсинга."""
+        return cls(
+            name=row.get("name") or "",
+            category=row.get("category") or "",
+            frequency=row.get("frequency") or "daily",
+            start=date_to_ordinal(row.get("start_date")),
+            last=date_to_ordinal(row.get("last_done")),
+            streak=_to_int(row.get("streak"), 0),
+            target=_to_int(row.get("target"), 30),
+            progress=_to_progress(row.get("progress")),
+        )
+
+    def to_row(self) -> Dict[str, str]:
+        """Сериализует запись в словарь строк для CSV/журнала."""
+        return {field: self[field] for field in FIELDNAMES}
+
+    def copy(self) -> "Habit":
+        """Копия записи (история копируется, остальные поля неизменяемы)."""
+        history = self.history.copy() if self.history is not None else None
+        return Habit(self.name, self.category, self.frequency, self.start,
+                     self.last, self.streak, self.target, self.progress, history)
+
+    def snapshot(self) -> "Habit":
+        """Копия скалярных полей без истории (дёшево, для событий изменения)."""
+        return Habit(self.name, self.category, self.frequency, self.start,
+                     self.last, self.streak, self.target, self.progress)
+
+    def restore(self, other: "Habit") -> None:
+        """Переписывает поля значениями из other (для отката транзакции)."""
+        for slot in self.__slots__:
+            setattr(self, slot, getattr(other, slot))
+
+    def __getitem__(self, key: str) -> str:
+        if key == "name":
+            return self.name
+        if key == "category":
+            return self.category
+        if key == "frequency":
+            return self.frequency
+        if key == "start_date":
+            return ordinal_to_date(self.start)
+        if key == "last_done":
+            return ordinal_to_date(self.last)
+        if key == "streak":
+            return str(self.streak)
+        if key == "target":
+            return str(self.target)
+        if key == "progress":
+            return f"{self.progress:.1f}%"
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDNAMES)
+
+    def __len__(self) -> int:
+        return len(FIELDNAMES)
+
+    def __repr__(self) -> str:
+        return f"Habit({self.to_row()!r})"
+
+
+def streak_of(habit: Union[Habit, Mapping]) -> int:
+    """Streak записи; для словаря строк разбирает поле (ValueError при ошибке)."""
+    if isinstance(habit, Habit):
+        return habit.streak
+    return int(habit.get("streak", "0"))
+
+
+def progress_of(habit: Union[Habit, Mapping]) -> float:
+    """Прогресс в процентах; для словаря строк разбирает поле (ValueError при ошибке)."""
+    if isinstance(habit, Habit):
+        return habit.progress
+    return float(habit.get("progress", "0%").strip().strip("%"))
+
+
+def last_done_of(habit: Union[Habit, Mapping]) -> int:
+    """
+    Порядковый номер дня последней отметки (0 — не отмечалась).
+
+    Raises:
+        ValueError: если у словаря строк дата в неверном формате.
+    """
+    if isinstance(habit, Habit):
+        return habit.last
+    last = habit.get("last_done", "").strip()
+    return parse_day(last) if last else 0
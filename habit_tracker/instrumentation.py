@@ -0,0 +1,177 @@
+# instrumentation.py
+"""
+Лёгкая инструментовка: счётчики и гистограммы задержек.
+
+Декоратор ``@timed("имя")`` и контекст ``timer("имя")`` замеряют время
+вызовов, ``count("имя")`` увеличивает счётчик. Пока сбор выключен (по
+умолчанию), обёртка только проверяет флаг и вызывает функцию, а timer()
+возвращает общий пустой контекст. Включается enable() — например,
+флагом ``main.py --profile``.
+
+Гистограммы — логарифмические корзины (степени двойки наносекунд), поэтому
+запись стоит O(1) и не хранит отдельные замеры; перцентили приблизительные
+(верхняя граница корзины).
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, Optional
+
+_enabled = False
+_lock = threading.Lock()
+_NULL = nullcontext()
+
+
+class Histogram:
+    """Гистограмма задержек в наносекундах по корзинам 2**k."""
+
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+        self.buckets: List[int] = [0] * 64
+
+    def add(self, ns: int) -> None:
+        if not self.count or ns < self.min:
+            self.min = ns
+        if ns > self.max:
+            self.max = ns
+        self.count += 1
+        self.total += ns
+        self.buckets[min(ns.bit_length(), 63)] += 1
+
+    def percentile(self, q: float) -> int:
+        """Верхняя граница корзины, в которую попадает q-й перцентиль (нс)."""
+        if not self.count:
+            return 0
+        rank = q / 100 * self.count
+        seen = 0
+        for k, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(1 << k, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, float]:
+        """Сводка в миллисекундах."""
+        ms = 1e-6
+        return {
+            "count": self.count,
+            "total_ms": self.total * ms,
+            "mean_ms": self.total / self.count * ms if self.count else 0.0,
+            "min_ms": self.min * ms,
+            "p50_ms": self.percentile(50) * ms,
+            "p90_ms": self.percentile(90) * ms,
+            "p99_ms": self.percentile(99) * ms,
+            "max_ms": self.max * ms,
+        }
+
+
+_histograms: Dict[str, Histogram] = {}
+_counters: Dict[str, int] = {}
+
+
+def enable() -> None:
+    """Включает сбор метрик."""
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    """Выключает сбор метрик (накопленное сохраняется)."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Очищает накопленные метрики."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def record(name: str, ns: int) -> None:
+    """Добавляет замер длительностью ns наносекунд в гистограмму name."""
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram()
+        hist.add(ns)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Увеличивает счётчик name на n (ничего не делает, пока сбор выключен)."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+@contextmanager
+def _timer(name: str):
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter_ns() - start)
+
+
+def timer(name: str):
+    """Контекст, замеряющий блок кода (при выключенном сборе — пустой)."""
+    if not _enabled:
+        return _NULL
+    return _timer(name)
+
+
+def timed(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """
+    Декоратор замера вызовов функции или метода.
+
+    Args:
+        name (str): Имя метрики (по умолчанию module.qualname функции).
+    """
+    def decorate(fn: Callable) -> Callable:
+        metric = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(metric, time.perf_counter_ns() - start)
+        return wrapper
+    return decorate
+
+
+def report() -> Dict[str, object]:
+    """Снимок метрик: {"timers": {имя: сводка}, "counters": {имя: значение}}."""
+    with _lock:
+        return {
+            "timers": {k: h.to_dict() for k, h in sorted(_histograms.items())},
+            "counters": dict(sorted(_counters.items())),
+        }
+
+
+def format_report(data: Optional[Dict[str, object]] = None) -> str:
+    """Текстовый отчёт: таймеры по убыванию суммарного времени, затем счётчики."""
+    data = data or report()
+    timers = sorted(data["timers"].items(), key=lambda kv: kv[1]["total_ms"], reverse=True)
+    lines = [f"{'метрика':40} {'вызовов':>8} {'всего мс':>10} {'p50 мс':>9} {'p99 мс':>9} {'max мс':>9}"]
+    for name, t in timers:
+        lines.append(f"{name:40} {t['count']:8d} {t['total_ms']:10.2f} "
+                     f"{t['p50_ms']:9.3f} {t['p99_ms']:9.3f} {t['max_ms']:9.3f}")
+    for name, value in data["counters"].items():
+        lines.append(f"{name:40} {value:8d}")
+    return "\n".join(lines)
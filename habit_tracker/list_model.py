@@ -0,0 +1,85 @@
+# list_model.py
+"""
+Модель списка привычек для виртуализированного виджета GUI.
+
+Модель не зависит от Tk: хранит порядок записей, отдаёт текст только для
+запрошенного окна строк и применяет события HabitManager построчно,
+сообщая виджету, нужно ли перерисовывать видимую область.
+"""
+
+from typing import Dict, Iterable, List, Mapping, Optional
+
+from habit_record import normalize_name
+
+EMPTY_TEXT = "Нет привычек. Добавьте первую!"
+
+
+def format_row(habit: Mapping) -> str:
+    """Строка списка для одной привычки."""
+    return (f"{habit['name']} [{habit.get('category', '')}] — streak: {habit.get('streak', '0')}"
+            f" — progress: {habit.get('progress', '0%')}")
+
+
+class HabitListModel:
+    """
+    Упорядоченный список записей с позиционным индексом.
+
+    Записи менеджера изменяются на месте, поэтому событие "update" не
+    трогает список — достаточно перерисовать строку, если она видна.
+    """
+
+    def __init__(self, habits: Iterable[Mapping] = ()):
+        self.reset(habits)
+
+    def reset(self, habits: Iterable[Mapping]) -> None:
+        """Полная замена содержимого (первичная загрузка, "Обновить", откат)."""
+        self._rows: List[Mapping] = list(habits)
+        self._keys: List[str] = [normalize_name(h["name"]) for h in self._rows]
+        self._pos: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def index_of(self, key: str) -> int:
+        """Позиция записи по ключу (-1, если нет). Индекс перестраивается после удалений."""
+        if self._pos is None:
+            self._pos = {k: i for i, k in enumerate(self._keys)}
+        return self._pos.get(key, -1)
+
+    def row(self, index: int) -> Mapping:
+        """Запись по позиции."""
+        return self._rows[index]
+
+    def window(self, first: int, count: int) -> List[str]:
+        """Тексты строк [first, first + count) — форматируется только окно."""
+        if not self._rows:
+            return [EMPTY_TEXT] if first == 0 and count > 0 else []
+        return [format_row(h) for h in self._rows[first:first + count]]
+
+    def on_change(self, event: str, key: Optional[str],
+                  before: Optional[Mapping], after: Optional[Mapping]) -> int:
+        """
+        Применяет событие HabitManager.
+
+        Returns:
+            int: Позиция затронутой строки: строки с неё и ниже (для "add" и
+            "remove") или только она (для "update") требуют перерисовки.
+            -1 — событие "load", модель нужно заполнить заново через reset().
+        """
+        if event == "add":
+            index = len(self._rows)
+            self._rows.append(after)
+            self._keys.append(key)
+            if self._pos is not None:
+                self._pos[key] = index
+            return index
+        if event == "remove":
+            index = self.index_of(key)
+            if index >= 0:
+                del self._rows[index]
+                del self._keys[index]
+                self._pos = None
+            return index
+        if event == "update":
+            return self.index_of(key)
+        return -1
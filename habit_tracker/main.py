@@ -1,38 +1,303 @@
-# main.py
-"""
-Точка запуска проекта. Поддерживает CLI-параметр --nogui для работы в консоли.
-"""
-
-import argparse
-import sys
-
-from habit_manager import HabitManager
-from notifications import random_motivation
-from gui import HabitTrackerApp
-
-
-def run_cli():
-    """Простой CLI: печатает сводку и мотивацию."""
-    manager = HabitManager()
-    habits = manager.list_habits()
-    print("Habit Tracker Pro — CLI режим")
-    print(f"Всего привычек: {len(habits)}")
-    for h in habits:
-        print(f"- {h['name']} | streak: {h.get('streak','0')} | progress: {h.get('progress','0%')}")
-    print("\n" + random_motivation())
-
-
-def main(argv=None):
-    parser = argparse.ArgumentParser(description="Habit Tracker Pro")
-    parser.add_argument("--nogui", action="store_true", help="Запуск без GUI (CLI summary).")
-    args = parser.parse_args(argv)
-    if args.nogui:
-        run_cli()
-    else:
-        # Запуск GUI
-        app = HabitTrackerApp(manager=HabitManager())
-        app.mainloop()
-
-
-if __name__ == "__main__":
-    main()
+# main.py
+"""
+Точка запуска проекта. Без аргументов запускает GUI, с --nogui печатает
+сводку в консоли, подкоманды (summary, add, mark, attention, search,
+import, export) служат для быстрых скриптовых вызовов, --remind запускает фоновые
+напоминания, --serve — локальный HTTP/JSON API (api_server).
+С --profile любой режим в конце печатает в stderr отчёт инструментовки
+(счётчики и гистограммы задержек), с --cprofile сохраняет профиль cProfile.
+
+GUI (customtkinter, tkinter) и matplotlib импортируются только при запуске
+GUI, поэтому консольные режимы стартуют быстро и работают без Tk.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+import instrumentation
+from habit_manager import HabitManager, HabitError, DEFAULT_FILE, migrate_to_sqlite
+from notifications import random_motivation
+from storage import DEFAULT_CHUNK_SIZE, JOURNAL_SUFFIX, open_storage
+
+
+def run_cli(file_path: str = DEFAULT_FILE):
+    """Простой CLI: печатает сводку и мотивацию."""
+    manager = HabitManager(file_path=file_path)
+    try:
+        habits = manager.list_habits()
+    finally:
+        manager.close()
+    print("Habit Tracker Pro — CLI режим")
+    print(f"Всего привычек: {len(habits)}")
+    for h in habits:
+        print(f"- {h['name']} | streak: {h.get('streak','0')} | progress: {h.get('progress','0%')}")
+    print("\n" + random_motivation())
+
+
+def run_cli_stream(file_path: str = DEFAULT_FILE, json_lines: bool = False,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    CLI-сводка за один проход по файлу порциями chunk_size.
+
+    Память ограничена порцией, строки печатаются по мере чтения. С
+    json_lines каждая привычка и итог выводятся отдельными JSON-строками.
+    Если рядом с CSV есть журнал, он накладывается на снимок.
+    """
+    from analytics import SummaryAccumulator
+    storage = open_storage(file_path, journal=os.path.exists(file_path + JOURNAL_SUFFIX))
+    acc = SummaryAccumulator()
+    if not json_lines:
+        print("Habit Tracker Pro — CLI режим")
+    try:
+        for chunk in storage.iter_chunks(chunk_size):
+            for row in acc.add_chunk(chunk):
+                if json_lines:
+                    print(json.dumps(dict(row, type="habit"), ensure_ascii=False))
+                else:
+                    print(f"- {row['name']} | streak: {row['streak']} | progress: {row['progress']}%")
+            sys.stdout.flush()
+    except (OSError, ValueError) as exc:
+        raise HabitError(f"Ошибка чтения данных: {exc}") from exc
+    finally:
+        storage.close()
+    result = acc.result()
+    if json_lines:
+        print(json.dumps(dict(result, type="summary"), ensure_ascii=False))
+        return
+    print(f"Всего привычек: {result['total']}")
+    print(f"Средний streak: {result['avg_streak']:.2f}")
+    print(f"Проблемных: {result['problems']}, требуют внимания: {result['attention']}")
+    print("\n" + random_motivation())
+
+
+async def run_reminders(manager: HabitManager, log_path: str = "") -> None:
+    """Цикл напоминаний как задача asyncio: вывод в консоль и, при log_path, в файл."""
+    from reminders import ConsoleSink, FileSink, ReminderScheduler
+    sinks = [ConsoleSink()]
+    if log_path:
+        sinks.append(FileSink(log_path))
+    scheduler = ReminderScheduler(manager, sinks)
+    task = asyncio.create_task(scheduler.run())
+    try:
+        await task
+    finally:
+        scheduler.stop()
+
+
+def run_gui(file_path: str = DEFAULT_FILE):
+    """Запускает GUI; тяжёлые модули импортируются только здесь."""
+    from gui import HabitTrackerApp, WRITE_BEHIND_WINDOW
+    manager = HabitManager(file_path=file_path, write_behind=WRITE_BEHIND_WINDOW)
+    app = HabitTrackerApp(manager=manager)
+    try:
+        app.mainloop()
+    finally:
+        manager.close()
+
+
+def cmd_summary(manager: HabitManager, args) -> None:
+    """Печатает сводку analytics.summary."""
+    from analytics import summary
+    data = summary(manager)
+    print(f"Всего привычек: {data['total']}")
+    print(f"Средний streak: {data['avg_streak']:.2f}")
+    print("Проблемные: " + (", ".join(data["problems"]) or "нет"))
+
+
+def cmd_add(manager: HabitManager, args) -> None:
+    """Добавляет привычку."""
+    manager.add_habit(args.name, category=args.category, frequency=args.frequency, target=args.target)
+    print(f"Привычка '{args.name}' добавлена.")
+
+
+def cmd_mark(manager: HabitManager, args) -> None:
+    """Отмечает выполнение привычки."""
+    try:
+        manager.mark_done(args.name, args.date)
+    except ValueError as exc:
+        raise HabitError(str(exc)) from exc
+    habit = manager.find_habit(args.name)
+    print(f"{habit['name']} | streak: {habit['streak']} | progress: {habit['progress']}")
+
+
+def cmd_attention(manager: HabitManager, args) -> None:
+    """Печатает привычки, не выполнявшиеся args.days дней, или args.top самых запущенных."""
+    if args.top:
+        for name, days in manager.most_overdue(args.top):
+            print(f"{name} | " + (f"{days} дн." if days is not None else "не отмечалась"))
+        return
+    for name in manager.overdue(days_threshold=args.days):
+        print(name)
+
+
+def cmd_search(manager: HabitManager, args) -> None:
+    """Печатает привычки, подходящие под текст и фильтры (HabitManager.search)."""
+    found = manager.search(args.query, category=args.category, overdue_days=args.overdue,
+                           min_progress=args.min_progress, max_progress=args.max_progress,
+                           prefix_only=args.prefix, limit=args.limit or None)
+    for h in found:
+        print(f"- {h['name']} [{h['category']}] | streak: {h['streak']} | progress: {h['progress']}")
+    print(f"Найдено: {len(found)}")
+
+
+def cmd_import(manager: HabitManager, args) -> None:
+    """Импортирует привычки из CSV/JSON Lines и печатает отчёт."""
+    from bulk_io import import_habits
+    report = import_habits(manager, args.path, fmt=args.format)
+    print(f"Импортировано: {report.imported}, отклонено: {report.failed}")
+    for line, error in report.errors[:args.show_errors]:
+        print(f"  строка {line}: {error}")
+
+
+def cmd_export(manager: HabitManager, args) -> None:
+    """Выгружает привычки в CSV/JSON Lines."""
+    from bulk_io import export_habits
+    total = export_habits(manager.storage, args.path, fmt=args.format)
+    print(f"Выгружено: {total} -> {args.path}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Парсер аргументов командной строки."""
+    parser = argparse.ArgumentParser(description="Habit Tracker Pro")
+    parser.add_argument("--nogui", action="store_true", help="Запуск без GUI (CLI summary).")
+    parser.add_argument("--data", default=DEFAULT_FILE,
+                        help="Файл данных: CSV или база SQLite (.db).")
+    parser.add_argument("--migrate", metavar="DB_PATH",
+                        help="Перенести привычки из --data (CSV) в базу SQLite и выйти.")
+    parser.add_argument("--stream", action="store_true",
+                        help="С --nogui: читать файл порциями, не загружая целиком.")
+    parser.add_argument("--json", action="store_true",
+                        help="С --stream: вывод в формате JSON Lines.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Размер порции для --stream.")
+    parser.add_argument("--remind", action="store_true",
+                        help="Запустить напоминания по полю frequency (Ctrl+C — выход).")
+    parser.add_argument("--remind-log", default="",
+                        help="С --remind: дописывать напоминания в этот файл.")
+    parser.add_argument("--serve", action="store_true",
+                        help="Запустить локальный HTTP/JSON API (Ctrl+C — выход).")
+    parser.add_argument("--host", default="127.0.0.1", help="С --serve: адрес.")
+    parser.add_argument("--port", type=int, default=8765, help="С --serve: порт (0 — любой).")
+    parser.add_argument("--profile", action="store_true",
+                        help="Собрать тайминги и счётчики и вывести отчёт в stderr.")
+    parser.add_argument("--profile-out", metavar="JSON", default="",
+                        help="С --profile: сохранить отчёт в JSON.")
+    parser.add_argument("--cprofile", metavar="PATH", default="",
+                        help="Записать профиль cProfile (pstats) в PATH.")
+    sub = parser.add_subparsers(dest="command")
+
+    p = sub.add_parser("summary", help="Сводка: число привычек, средний streak, проблемные.")
+    p.set_defaults(func=cmd_summary)
+
+    p = sub.add_parser("add", help="Добавить привычку.")
+    p.add_argument("name")
+    p.add_argument("--category", default="Общее")
+    p.add_argument("--frequency", default="daily")
+    p.add_argument("--target", type=int, default=30)
+    p.set_defaults(func=cmd_add)
+
+    p = sub.add_parser("mark", help="Отметить выполнение.")
+    p.add_argument("name")
+    p.add_argument("--date", default="", help="Дата DD-MM-YYYY (по умолчанию сегодня).")
+    p.set_defaults(func=cmd_mark)
+
+    p = sub.add_parser("attention", help="Привычки без отметки N дней.")
+    p.add_argument("--days", type=int, default=3)
+    p.add_argument("--top", type=int, default=0, help="Показать N самых запущенных привычек.")
+    p.set_defaults(func=cmd_attention)
+
+    p = sub.add_parser("search", help="Поиск привычек по имени, категории, давности, прогрессу.")
+    p.add_argument("query", nargs="?", default="", help="Подстрока имени (без учёта регистра).")
+    p.add_argument("--prefix", action="store_true", help="Искать по началу слов имени.")
+    p.add_argument("--category", default=None)
+    p.add_argument("--overdue", type=int, metavar="DAYS", default=None,
+                   help="Только без отметки DAYS дней.")
+    p.add_argument("--min-progress", type=float, default=None)
+    p.add_argument("--max-progress", type=float, default=None)
+    p.add_argument("--limit", type=int, default=0)
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("import", help="Импорт привычек из CSV или JSON Lines.")
+    p.add_argument("path")
+    p.add_argument("--format", choices=("csv", "jsonl"), help="По умолчанию — по расширению.")
+    p.add_argument("--show-errors", type=int, default=20, help="Сколько ошибок показать.")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("export", help="Экспорт привычек в CSV или JSON Lines.")
+    p.add_argument("path")
+    p.add_argument("--format", choices=("csv", "jsonl"), help="По умолчанию — по расширению.")
+    p.set_defaults(func=cmd_export)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        instrumentation.enable()
+    profiler = None
+    if args.cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        return run(args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.cprofile)
+        if args.profile:
+            report = instrumentation.report()
+            print(instrumentation.format_report(report), file=sys.stderr)
+            if args.profile_out:
+                with open(args.profile_out, "w", encoding="utf-8") as f:
+                    json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def run(args) -> int:
+    """Выполняет режим, выбранный аргументами; возвращает код выхода."""
+    try:
+        if args.migrate:
+            count = migrate_to_sqlite(args.data, args.migrate)
+            print(f"Перенесено привычек: {count} -> {args.migrate}")
+        elif args.remind:
+            manager = HabitManager(file_path=args.data)
+            try:
+                asyncio.run(run_reminders(manager, args.remind_log))
+            except KeyboardInterrupt:
+                pass
+            finally:
+                manager.close()
+        elif args.serve:
+            from api_server import serve
+            manager = HabitManager(file_path=args.data)
+            try:
+                asyncio.run(serve(manager, args.host, args.port))
+            except KeyboardInterrupt:
+                pass
+            finally:
+                manager.close()
+        elif args.command:
+            # менеджер держит блокировку файла и открытое хранилище — закрываем сразу
+            manager = HabitManager(file_path=args.data)
+            try:
+                args.func(manager, args)
+            finally:
+                manager.close()
+        elif args.nogui and args.stream:
+            run_cli_stream(args.data, json_lines=args.json, chunk_size=args.chunk_size)
+        elif args.nogui:
+            run_cli(args.data)
+        else:
+            # Запуск GUI
+            run_gui(args.data)
+    except HabitError as exc:
+        print(f"Ошибка: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
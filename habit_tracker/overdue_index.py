@@ -0,0 +1,118 @@
+# overdue_index.py
+"""
+Индекс привычек по дню последней отметки.
+
+OverdueIndex хранит отсортированный список (день последней отметки,
+порядковый номер, ключ) и обновляется по событиям HabitManager. Привычки
+без отметки N дней — это префикс списка, который находится бисекцией за
+O(log n + k) вместо обхода всех записей.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from date_codec import today as today_ordinal
+from habit_record import Habit, normalize_name
+
+# (last, seq, key); last == 0 — привычка не отмечалась и идёт первой
+Entry = Tuple[int, int, str]
+
+
+class OverdueIndex:
+    """
+    Отсортированный по дню последней отметки индекс привычек.
+
+    Результаты overdue() совпадают с notifications.needs_attention для
+    тех же записей, включая порядок (порядок менеджера).
+    """
+
+    def __init__(self, habits: Iterable[Habit] = ()):
+        self.reset(habits)
+
+    def reset(self, habits: Iterable[Habit]) -> None:
+        """Полное перестроение по привычкам в порядке менеджера."""
+        self._seq: Dict[str, int] = {}
+        self._names: Dict[str, str] = {}
+        self._last: Dict[str, int] = {}
+        entries = []
+        for seq, habit in enumerate(habits):
+            key = normalize_name(habit.name)
+            self._seq[key] = seq
+            self._names[key] = habit.name
+            self._last[key] = habit.last
+            entries.append((habit.last, seq, key))
+        entries.sort()
+        self._entries: List[Entry] = entries
+        self._next_seq = len(entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _insert(self, key: str, habit: Habit) -> None:
+        self._names[key] = habit.name
+        self._last[key] = habit.last
+        insort(self._entries, (habit.last, self._seq[key], key))
+
+    def _delete(self, key: str) -> None:
+        entry = (self._last.pop(key), self._seq[key], key)
+        i = bisect_left(self._entries, entry)
+        del self._entries[i]
+
+    def on_change(self, event: str, key: Optional[str],
+                  before: Optional[Habit], after: Optional[Habit]) -> None:
+        """
+        Применяет событие HabitManager ("add", "remove", "update").
+
+        Событие "load" индекс обработать не может — владелец перестраивает
+        его через reset().
+        """
+        if event == "add":
+            self._seq[key] = self._next_seq
+            self._next_seq += 1
+            self._insert(key, after)
+        elif event == "remove":
+            self._delete(key)
+            del self._seq[key]
+            del self._names[key]
+        elif event == "update":
+            if self._last[key] != after.last:
+                self._delete(key)
+                self._insert(key, after)
+
+    def _prefix(self, days_threshold: int, today: int) -> int:
+        """Длина префикса записей, не отмечавшихся days_threshold дней."""
+        # today - last >= days  <=>  last <= today - days; last == 0 всегда в префиксе
+        cutoff = max(today - days_threshold, 0)
+        return bisect_right(self._entries, (cutoff, float("inf"), ""))
+
+    def overdue(self, days_threshold: int = 3, today: Optional[int] = None) -> List[str]:
+        """Имена привычек без отметки days_threshold дней в порядке менеджера."""
+        if today is None:
+            today = today_ordinal()
+        found = sorted(self._entries[:self._prefix(days_threshold, today)], key=lambda e: e[1])
+        return [self._names[key] for _, _, key in found]
+
+    def overdue_count(self, days_threshold: int = 3, today: Optional[int] = None) -> int:
+        """Число привычек без отметки days_threshold дней за O(log n)."""
+        if today is None:
+            today = today_ordinal()
+        return self._prefix(days_threshold, today)
+
+    def overdue_many(self, thresholds: Iterable[int],
+                     today: Optional[int] = None) -> Dict[int, List[str]]:
+        """overdue() сразу для нескольких порогов: порог -> имена."""
+        if today is None:
+            today = today_ordinal()
+        return {days: self.overdue(days, today) for days in thresholds}
+
+    def most_overdue(self, k: int, today: Optional[int] = None) -> List[Tuple[str, Optional[int]]]:
+        """
+        k самых запущенных привычек: сначала не отмечавшиеся, затем по давности.
+
+        Returns:
+            list: Пары (имя, дней с последней отметки или None, если не отмечалась).
+        """
+        if today is None:
+            today = today_ordinal()
+        return [(self._names[key], today - last if last else None)
+                for last, _, key in self._entries[:max(k, 0)]]
@@ -0,0 +1,314 @@
+# reminders.py
+"""
+Фоновые напоминания о привычках.
+
+ReminderScheduler вычисляет момент следующего напоминания каждой привычки
+по полю frequency и дню последней отметки и держит все ожидающие
+напоминания в куче: добавление, перепланирование и срабатывание стоят
+O(log n). Расписание обновляется по событиям HabitManager; устаревшие
+элементы кучи отбрасываются лениво (по версии записи).
+
+Сработавшие напоминания передаются приёмникам (sinks) — любым
+вызываемым объектам reminder -> None: ConsoleSink, FileSink, CallbackSink
+(например, для GUI). Время берётся из часов (SystemClock или FakeClock для
+тестов), поэтому планировщик проверяется без реального ожидания.
+"""
+
+import asyncio
+import heapq
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, TextIO, Tuple
+
+from date_codec import DATE_FORMAT, today as today_ordinal
+from habit_manager import HabitError, HabitManager
+from habit_record import Habit, normalize_name
+from notifications import reminder_message
+
+DAY_SECONDS = 24 * 60 * 60
+# час напоминания в день, когда привычка «созрела»
+REMIND_HOUR = 9
+# как часто run() перечитывает данные, даже если ближайшее напоминание нескоро:
+# привычки, добавленные и отмеченные другими процессами, видны без ожидания срока
+POLL_SECONDS = 60
+
+FREQUENCY_DAYS = {
+    "daily": 1,
+    "ежедневно": 1,
+    "weekly": 7,
+    "еженедельно": 7,
+    "monthly": 30,
+    "ежемесячно": 30,
+}
+_EVERY_RE = re.compile(r"^(?:every\s+)?(\d+)\s*(?:d|days?|дн(?:я|ей)?)?$")
+
+
+class Reminder(NamedTuple):
+    """Сработавшее напоминание."""
+    name: str
+    due: float
+    message: str
+
+
+Sink = Callable[[Reminder], None]
+
+
+def frequency_days(frequency: str) -> int:
+    """
+    Интервал в днях по полю frequency.
+
+    Понимает daily/weekly/monthly (и русские варианты), "3", "3d",
+    "every 3 days". Неизвестные значения считаются ежедневными.
+    """
+    text = (frequency or "").strip().lower()
+    if text in FREQUENCY_DAYS:
+        return FREQUENCY_DAYS[text]
+    match = _EVERY_RE.match(text)
+    if match and int(match.group(1)) > 0:
+        return int(match.group(1))
+    return 1
+
+
+def day_to_timestamp(day: int, hour: int = REMIND_HOUR) -> float:
+    """Метка времени (локальное время) для часа hour дня с порядковым номером day."""
+    return (datetime.fromordinal(day) + timedelta(hours=hour)).timestamp()
+
+
+def next_due(habit: Habit, hour: int = REMIND_HOUR) -> float:
+    """
+    Момент первого напоминания: через интервал frequency после последней
+    отметки; для неотмечавшейся привычки — в день начала.
+    """
+    if habit.last:
+        day = habit.last + frequency_days(habit.frequency)
+    else:
+        day = habit.start or today_ordinal()
+    return day_to_timestamp(day, hour)
+
+
+class SystemClock:
+    """Реальное время и ожидание через asyncio."""
+
+    def now(self) -> float:
+        return time.time()
+
+    async def wait(self, event: asyncio.Event, timeout: Optional[float]) -> None:
+        """Ждёт event не дольше timeout секунд (None — без ограничения)."""
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class FakeClock:
+    """
+    Управляемые часы для тестов: время идёт только через advance().
+
+    Args:
+        start (float): Начальная метка времени.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._timers: List[Tuple[float, int, asyncio.Future]] = []
+        self._seq = 0
+
+    def now(self) -> float:
+        return self._now
+
+    async def wait(self, event: asyncio.Event, timeout: Optional[float]) -> None:
+        waiter = asyncio.ensure_future(event.wait())
+        waits = {waiter}
+        if timeout is not None:
+            timer = asyncio.get_running_loop().create_future()
+            self._seq += 1
+            heapq.heappush(self._timers, (self._now + timeout, self._seq, timer))
+            waits.add(timer)
+        try:
+            await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+
+    async def advance(self, seconds: float) -> None:
+        """Сдвигает время и даёт сработать всем ожидавшим этого момента."""
+        self._now += seconds
+        while self._timers and self._timers[0][0] <= self._now:
+            _, _, timer = heapq.heappop(self._timers)
+            if not timer.done():
+                timer.set_result(None)
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+
+class ConsoleSink:
+    """Печатает напоминания в поток (по умолчанию stdout)."""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+
+    def __call__(self, reminder: Reminder) -> None:
+        stream = self.stream or sys.stdout
+        print(reminder.message, file=stream)
+        stream.flush()
+
+
+class FileSink:
+    """Дописывает напоминания в текстовый файл с меткой времени."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __call__(self, reminder: Reminder) -> None:
+        stamp = datetime.fromtimestamp(reminder.due).strftime(DATE_FORMAT + " %H:%M")
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(f"{stamp}\t{reminder.message}\n")
+
+
+class CallbackSink:
+    """
+    Передаёт напоминание функции, например GUI-обработчику.
+
+    Вызывается в потоке цикла asyncio; GUI должен переложить вызов в свой
+    поток (например, через after()).
+    """
+
+    def __init__(self, callback: Callable[[Reminder], None]):
+        self.callback = callback
+
+    def __call__(self, reminder: Reminder) -> None:
+        self.callback(reminder)
+
+
+class ReminderScheduler:
+    """
+    Планировщик напоминаний по привычкам менеджера.
+
+    Напоминание повторяется каждый интервал frequency, пока привычка не
+    отмечена; отметка переносит его на интервал после новой даты.
+
+    Args:
+        manager (HabitManager): Источник привычек и событий.
+        sinks: Приёмники напоминаний.
+        clock: Часы (SystemClock по умолчанию).
+        hour (int): Час напоминания.
+    """
+
+    def __init__(self, manager: HabitManager, sinks: Iterable[Sink] = (),
+                 clock=None, hour: int = REMIND_HOUR):
+        self.manager = manager
+        self.sinks: List[Sink] = list(sinks)
+        self.clock = clock or SystemClock()
+        self.hour = hour
+        self.fired = 0
+        self._heap: List[Tuple[float, int, str]] = []
+        self._versions: Dict[str, int] = {}
+        self._version = 0
+        self._habits: Dict[str, Habit] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._stopped = False
+        self._rebuild()
+        manager.subscribe(self._on_change)
+
+    def __len__(self) -> int:
+        return len(self._habits)
+
+    def _rebuild(self) -> None:
+        self._habits = {}
+        self._versions = {}
+        entries = []
+        self._version += 1
+        for habit in self.manager.list_habits():
+            key = normalize_name(habit.name)
+            self._habits[key] = habit
+            self._versions[key] = self._version
+            entries.append((next_due(habit, self.hour), self._version, key))
+        heapq.heapify(entries)
+        self._heap = entries
+
+    def _schedule(self, key: str, due: float) -> None:
+        # версии сквозные, чтобы элементы удалённой и заново добавленной
+        # привычки не ожили
+        self._version += 1
+        self._versions[key] = self._version
+        heapq.heappush(self._heap, (due, self._version, key))
+
+    def _on_change(self, event: str, key: Optional[str],
+                   before: Optional[Habit], after: Optional[Habit]) -> None:
+        if event == "add":
+            self._habits[key] = after
+            self._schedule(key, next_due(after, self.hour))
+        elif event == "remove":
+            self._habits.pop(key, None)
+            self._versions.pop(key, None)
+        elif event == "update":
+            if before is None or before.last != after.last or before.frequency != after.frequency:
+                self._habits[key] = after
+                self._schedule(key, next_due(after, self.hour))
+        elif event == "load":
+            self._rebuild()
+        else:
+            return
+        if self._wake is not None:
+            self._wake.set()
+
+    def next_due(self) -> Optional[float]:
+        """Момент ближайшего напоминания (None, если напоминать нечего)."""
+        heap = self._heap
+        while heap and self._versions.get(heap[0][2]) != heap[0][1]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def fire_due(self) -> List[Reminder]:
+        """
+        Срабатывает все напоминания со сроком не позже clock.now() и
+        планирует их повтор через интервал frequency.
+        """
+        now = self.clock.now()
+        fired = []
+        while True:
+            due = self.next_due()
+            if due is None or due > now:
+                break
+            _, _, key = heapq.heappop(self._heap)
+            habit = self._habits[key]
+            days = datetime.fromtimestamp(now).toordinal() - habit.last if habit.last else None
+            reminder = Reminder(habit.name, due, reminder_message(habit.name, days))
+            for sink in self.sinks:
+                sink(reminder)
+            fired.append(reminder)
+            interval = frequency_days(habit.frequency) * DAY_SECONDS
+            # пропущенные периоды (например, пока программа не работала) не догоняем
+            periods = int((now - due) // interval) + 1
+            self._schedule(key, due + periods * interval)
+        self.fired += len(fired)
+        return fired
+
+    async def run(self) -> None:
+        """Цикл напоминаний; завершается после stop()."""
+        self._wake = asyncio.Event()
+        self._stopped = False
+        while not self._stopped:
+            # привычку могли отметить в другом процессе (CLI, GUI): перечитываем
+            # перед срабатыванием, событие "load" перестроит очередь
+            try:
+                self.manager.refresh()
+            except HabitError:
+                pass  # файл временно недоступен — напоминаем по последним данным
+            self.fire_due()
+            due = self.next_due()
+            timeout = POLL_SECONDS if due is None else min(max(due - self.clock.now(), 0.0),
+                                                           POLL_SECONDS)
+            self._wake.clear()
+            await self.clock.wait(self._wake, timeout)
+
+    def stop(self) -> None:
+        """Останавливает run() и отписывается от менеджера."""
+        self._stopped = True
+        if self._wake is not None:
+            self._wake.set()
+        try:
+            self.manager.unsubscribe(self._on_change)
+        except ValueError:
+            pass
@@ -0,0 +1,137 @@
+# render_pipeline.py
+"""
+Фоновый рендер графиков для GUI.
+
+Фигуры visualizer рисуются в RGBA-буферы Agg в пуле потоков; готовые
+буферы передаются в главный поток Tk через очередь, которую GUI опрашивает
+через after(). Tk-виджеты из рабочих потоков не трогаются. Запросы
+схлопываются: пока пул занят, хранится только самый свежий запрос, а
+устаревшие результаты отбрасываются при доставке. Готовые буферы кэшируются
+по ключу данных.
+"""
+
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Hashable, Optional, Tuple
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# (поколение, ключ, построитель фигуры)
+Job = Tuple[int, Hashable, Callable[[], Figure]]
+
+
+def render_to_buffer(fig: Figure) -> np.ndarray:
+    """Рисует фигуру через Agg и возвращает копию RGBA-буфера (h, w, 4)."""
+    canvas = FigureCanvasAgg(fig)
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba()).copy()
+
+
+class RenderPipeline:
+    """
+    Пул рендера с доставкой в главный поток.
+
+    Args:
+        deliver: Вызывается в главном потоке (из poll) с RGBA-буфером.
+        on_error: Вызывается в главном потоке с исключением рендера.
+        workers (int): Размер пула.
+        cache_size (int): Сколько готовых буферов хранить (LRU).
+    """
+
+    def __init__(self, deliver: Callable[[np.ndarray], None],
+                 on_error: Optional[Callable[[Exception], None]] = None,
+                 workers: int = 2, cache_size: int = 16):
+        self.deliver = deliver
+        self.on_error = on_error
+        self.workers = workers
+        self.cache_size = cache_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chart")
+        self._results: "queue.Queue[Tuple[int, Hashable, object]]" = queue.Queue()
+        self._cache: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._delivered = 0
+        self._running = 0
+        self._pending: Optional[Job] = None
+        self.rendered = 0
+        self.cache_hits = 0
+
+    def request(self, key: Hashable, build: Callable[[], Figure]) -> None:
+        """
+        Запрашивает график (вызывать из главного потока).
+
+        Args:
+            key: Хэшируемый ключ данных графика (для кэша).
+            build: Строит Figure из уже снятой копии данных; выполняется в
+                рабочем потоке, поэтому не должен обращаться к менеджеру и Tk.
+        """
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                self._results.put((generation, key, cached))
+                return
+            job = (generation, key, build)
+            if self._running < self.workers:
+                self._running += 1
+                self._executor.submit(self._work, job)
+            else:
+                # пул занят: более старый ожидающий запрос вытесняется
+                self._pending = job
+
+    def _work(self, job: Job) -> None:
+        while job is not None:
+            generation, key, build = job
+            if generation >= self._generation:
+                try:
+                    result = render_to_buffer(build())
+                    with self._lock:
+                        self.rendered += 1
+                        self._cache[key] = result
+                        self._cache.move_to_end(key)
+                        while len(self._cache) > self.cache_size:
+                            self._cache.popitem(last=False)
+                except Exception as exc:
+                    result = exc
+                self._results.put((generation, key, result))
+            with self._lock:
+                job, self._pending = self._pending, None
+                if job is None:
+                    self._running -= 1
+
+    def poll(self) -> bool:
+        """
+        Доставляет самый свежий готовый результат (вызывать из главного потока).
+
+        Returns:
+            bool: True, если что-то было доставлено.
+        """
+        newest = None
+        while True:
+            try:
+                item = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] > self._delivered and (newest is None or item[0] > newest[0]):
+                newest = item
+        if newest is None:
+            return False
+        self._delivered = newest[0]
+        result = newest[2]
+        if isinstance(result, Exception):
+            if self.on_error:
+                self.on_error(result)
+        else:
+            self.deliver(result)
+        return True
+
+    def shutdown(self) -> None:
+        """Останавливает пул (незавершённые рендеры дорабатывают)."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
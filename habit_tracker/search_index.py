@@ -0,0 +1,212 @@
+# search_index.py
+"""
+Поисковый индекс привычек: по категории, префиксу и подстроке имени.
+
+SearchIndex обновляется по событиям HabitManager, как OverdueIndex:
+- категория -> ключи записей (упорядоченный словарь как множество);
+- отсортированный список (слово, ключ) для поиска по началу любого слова
+  имени бисекцией за O(log n + k);
+- склеенная строка всех имён для поиска подстроки: str.find работает на
+  уровне C, а позиция совпадения переводится в запись бисекцией по
+  смещениям. Строка пересобирается лениво после изменений.
+
+Оба пути выдают совпадения потоком и с limit останавливаются на первых
+найденных: подстрока — в порядке менеджера, начало слова — в алфавитном
+порядке совпавшего слова.
+
+Сравнение без учёта регистра и с учётом Unicode: NFKC + casefold, а «ё»
+приравнивается к «е», чтобы «ёлка» находилась по «елка».
+"""
+
+import sys
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from date_codec import today as today_ordinal
+from habit_record import Habit, normalize_name
+
+# разделитель имён в склеенной строке: не встречается в сложенном тексте
+_SEP = "\x00"
+
+
+def fold(text: str) -> str:
+    """Ключ сравнения: NFKC, casefold, «ё» -> «е»."""
+    return unicodedata.normalize("NFKC", text).casefold().replace("ё", "е")
+
+
+class SearchIndex:
+    """
+    Индекс для фильтрации списка привычек.
+
+    Результаты search() по подстроке и без текста идут в порядке
+    менеджера, как у OverdueIndex; по началу слова — по алфавиту.
+    Записи хранятся ссылками на записи менеджера, поэтому фильтры по
+    прогрессу и дате последней отметки видят текущие значения.
+    """
+
+    def __init__(self, habits: Iterable[Habit] = ()):
+        self.reset(habits)
+
+    def reset(self, habits: Iterable[Habit]) -> None:
+        """Полное перестроение по привычкам в порядке менеджера."""
+        self._habits: Dict[str, Habit] = {}
+        self._folded: Dict[str, str] = {}
+        self._categories: Dict[str, Dict[str, None]] = {}
+        words = []
+        for habit in habits:
+            key = normalize_name(habit.name)
+            self._add_maps(key, habit)
+            words.extend((word, key) for word in self._words(key))
+        words.sort()
+        self._words_index: List[Tuple[str, str]] = words
+        self._blob: Optional[str] = None
+        self._starts: List[int] = []
+        self._blob_keys: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._habits)
+
+    def _words(self, key: str) -> List[str]:
+        # всё имя целиком тоже «слово»: префикс с пробелом ищется по нему;
+        # слова интернируются — одинаковые слова тысяч имён хранятся один раз
+        folded = self._folded[key]
+        return sorted({folded, *map(sys.intern, folded.split())})
+
+    def _add_maps(self, key: str, habit: Habit) -> None:
+        self._habits[key] = habit
+        self._folded[key] = fold(habit.name)
+        self._categories.setdefault(fold(habit.category), {})[key] = None
+
+    def _remove_category(self, key: str, category: str) -> None:
+        bucket = self._categories[fold(category)]
+        del bucket[key]
+        if not bucket:
+            del self._categories[fold(category)]
+
+    def on_change(self, event: str, key: Optional[str],
+                  before: Optional[Habit], after: Optional[Habit]) -> None:
+        """
+        Применяет событие HabitManager ("add", "remove", "update").
+
+        Событие "load" владелец обрабатывает перестроением через reset().
+        """
+        if event == "add":
+            self._add_maps(key, after)
+            for word in self._words(key):
+                insort(self._words_index, (word, key))
+            self._blob = None
+        elif event == "remove":
+            for word in self._words(key):
+                i = bisect_left(self._words_index, (word, key))
+                del self._words_index[i]
+            self._remove_category(key, before.category)
+            del self._habits[key], self._folded[key]
+            self._blob = None
+        elif event == "update":
+            # прогресс и дата читаются из записи при поиске; категория
+            # меняется только вместе с записью, но проверим, если есть снимок
+            if before is not None and fold(before.category) != fold(after.category):
+                self._remove_category(key, before.category)
+                self._categories.setdefault(fold(after.category), {})[key] = None
+
+    # --- текстовый поиск --------------------------------------------------
+
+    def _prefix_keys(self, text: str) -> Iterator[str]:
+        """Ключи по началу слова, по алфавиту совпавшего слова, без повторов."""
+        words = self._words_index
+        i = bisect_left(words, (text,))
+        seen = set()
+        while i < len(words):
+            word, key = words[i]
+            if not word.startswith(text):
+                return
+            if key not in seen:
+                seen.add(key)
+                yield key
+            i += 1
+
+    def prefix(self, text: str) -> List[str]:
+        """Ключи записей, у которых какое-либо слово имени начинается с text."""
+        return list(self._prefix_keys(fold(text).strip()))
+
+    def _ensure_blob(self) -> None:
+        if self._blob is not None:
+            return
+        self._blob_keys = list(self._folded)
+        starts = []
+        pos = 0
+        for key in self._blob_keys:
+            starts.append(pos)
+            pos += len(self._folded[key]) + 1
+        self._starts = starts
+        self._blob = _SEP.join(self._folded.values())
+
+    def _substring(self, text: str) -> Iterator[str]:
+        """Ключи записей с подстрокой text в имени (text уже сложен)."""
+        self._ensure_blob()
+        blob, starts, keys = self._blob, self._starts, self._blob_keys
+        pos = blob.find(text)
+        while pos >= 0:
+            row = bisect_right(starts, pos) - 1
+            yield keys[row]
+            # следующая запись: дальше в этой строке искать незачем
+            if row + 1 >= len(starts):
+                return
+            pos = blob.find(text, starts[row + 1])
+
+    def substring(self, text: str) -> List[str]:
+        """Ключи записей, имя которых содержит text, в порядке менеджера."""
+        text = fold(text)
+        if not text:
+            return list(self._habits)
+        return list(self._substring(text))
+
+    # --- комбинированный фильтр -------------------------------------------
+
+    def search(self, query: str = "", category: Optional[str] = None,
+               overdue_days: Optional[int] = None, min_progress: Optional[float] = None,
+               max_progress: Optional[float] = None, prefix_only: bool = False,
+               limit: Optional[int] = None, today: Optional[int] = None) -> List[Habit]:
+        """
+        Записи, подходящие под все заданные условия.
+
+        Args:
+            query (str): Подстрока имени (prefix_only=True — начало слова).
+            category (str): Категория (без учёта регистра).
+            overdue_days (int): Только не отмечавшиеся столько дней.
+            min_progress (float): Нижняя граница прогресса, %.
+            max_progress (float): Верхняя граница прогресса, %.
+            limit (int): Не больше стольких записей.
+            today (int): Порядковый номер «сегодня» для overdue_days.
+        """
+        bucket = None
+        if category is not None:
+            bucket = self._categories.get(fold(category).strip())
+            if bucket is None:
+                return []
+        text = fold(query).strip() if prefix_only else fold(query)
+        # кандидаты — из самого узкого источника, остальное проверяется поштучно
+        if text:
+            keys: Iterable[str] = self._prefix_keys(text) if prefix_only else self._substring(text)
+        elif bucket is not None:
+            keys, bucket = bucket, None
+        else:
+            keys = self._habits
+        habits = self._habits
+        found = (habits[key] for key in keys if bucket is None or key in bucket)
+        if overdue_days is not None:
+            if today is None:
+                today = today_ordinal()
+            cutoff = today - overdue_days
+            found = (h for h in found if not h.last or h.last <= cutoff)
+        if min_progress is not None:
+            found = (h for h in found if h.progress >= min_progress)
+        if max_progress is not None:
+            found = (h for h in found if h.progress <= max_progress)
+        return list(islice(found, limit) if limit is not None else found)
+
+    def categories(self) -> Dict[str, int]:
+        """Число записей по категориям (ключ — сложенное имя категории)."""
+        return {category: len(keys) for category, keys in self._categories.items()}
@@ -0,0 +1,183 @@
+# sharded_store.py
+"""
+Хранилище привычек многих пользователей, разбитое на шарды.
+
+У каждого пользователя свой файл данных (CSV или SQLite), с которым
+работает обычный HabitManager. Файлы раскладываются по каталогам-шардам
+``shard_NNN`` по стабильному хэшу идентификатора пользователя, так что
+ни один каталог не разрастается, а шарды можно обрабатывать параллельно
+(см. analytics.fleet_summary). Открытые менеджеры кэшируются с
+ограничением: давно не использованные закрываются.
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from typing import Dict, Iterator, List
+
+from habit_manager import HabitManager, HabitError
+from habit_record import Habit
+
+DEFAULT_SHARDS = 16
+DEFAULT_MAX_OPEN = 64
+META_FILE = "shards.json"
+BACKEND_SUFFIXES = {"csv": ".csv", "sqlite": ".db"}
+_USER_RE = re.compile(r"^[\w\-]{1,64}$")
+
+
+def normalize_user(user: str) -> str:
+    """
+    Идентификатор пользователя для имени файла (без учёта регистра).
+
+    Raises:
+        HabitError: если идентификатор пуст, длиннее 64 символов или
+            содержит что-то кроме букв, цифр, "_" и "-".
+    """
+    if not isinstance(user, str) or not _USER_RE.match(user.strip()):
+        raise HabitError(f"Неверный идентификатор пользователя: {user!r}")
+    return user.strip().lower()
+
+
+def shard_of(user: str, shards: int) -> int:
+    """Номер шарда пользователя; хэш стабилен между процессами и запусками."""
+    digest = hashlib.sha1(normalize_user(user).encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % shards
+
+
+class ShardedStore:
+    """
+    Маршрутизатор операций HabitManager по шардам пользователей.
+
+    Число шардов и тип файлов фиксируются в ``shards.json`` при создании
+    каталога, иначе после перезапуска пользователи «переехали» бы в другие
+    шарды.
+
+    Args:
+        root (str): Корневой каталог хранилища.
+        shards (int): Число шардов (для нового каталога).
+        backend (str): "csv" или "sqlite" (для нового каталога).
+        max_open (int): Сколько менеджеров держать открытыми (LRU).
+
+    Attributes:
+        hits, misses, evictions (int): Статистика кэша менеджеров.
+    """
+
+    def __init__(self, root: str, shards: int = DEFAULT_SHARDS, backend: str = "csv",
+                 max_open: int = DEFAULT_MAX_OPEN):
+        if backend not in BACKEND_SUFFIXES:
+            raise HabitError(f"Неизвестный тип хранилища: {backend}")
+        if shards < 1 or max_open < 1:
+            raise HabitError("Число шардов и размер кэша должны быть положительными.")
+        self.root = root
+        meta_path = os.path.join(root, META_FILE)
+        try:
+            if os.path.exists(meta_path):
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                shards, backend = int(meta["shards"]), meta["backend"]
+            else:
+                os.makedirs(root, exist_ok=True)
+                with open(meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"shards": shards, "backend": backend}, f)
+        except (OSError, ValueError, KeyError) as exc:
+            raise HabitError(f"Ошибка открытия хранилища: {exc}") from exc
+        self.shards = shards
+        self.backend = backend
+        self.suffix = BACKEND_SUFFIXES[backend]
+        self.max_open = max_open
+        self._open: "OrderedDict[str, HabitManager]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def shard_dir(self, index: int) -> str:
+        """Каталог шарда с номером index."""
+        return os.path.join(self.root, f"shard_{index:03d}")
+
+    def path_of(self, user: str) -> str:
+        """Файл данных пользователя."""
+        user = normalize_user(user)
+        return os.path.join(self.shard_dir(shard_of(user, self.shards)), user + self.suffix)
+
+    def manager(self, user: str) -> HabitManager:
+        """
+        HabitManager пользователя (из кэша или открывается заново).
+
+        Возвращённый менеджер не стоит хранить дольше текущей операции:
+        при вытеснении из кэша он закрывается.
+        """
+        key = normalize_user(user)
+        manager = self._open.get(key)
+        if manager is not None:
+            self._open.move_to_end(key)
+            self.hits += 1
+            return manager
+        self.misses += 1
+        manager = HabitManager(file_path=self.path_of(key))
+        self._open[key] = manager
+        self._evict()
+        return manager
+
+    def _evict(self) -> None:
+        """Закрывает давно не использованные менеджеры сверх max_open."""
+        for key in list(self._open):
+            if len(self._open) <= self.max_open:
+                return
+            manager = self._open[key]
+            if manager._batch_depth:
+                # менеджер внутри batch() ещё пишет — оставляем
+                continue
+            del self._open[key]
+            manager.close()
+            self.evictions += 1
+
+    def add_habit(self, user: str, name: str, **kwargs) -> None:
+        """HabitManager.add_habit для пользователя user."""
+        self.manager(user).add_habit(name, **kwargs)
+
+    def remove_habit(self, user: str, name: str) -> None:
+        """HabitManager.remove_habit для пользователя user."""
+        self.manager(user).remove_habit(name)
+
+    def mark_done(self, user: str, name: str, date_text: str = "") -> None:
+        """HabitManager.mark_done для пользователя user."""
+        self.manager(user).mark_done(name, date_text)
+
+    def find_habit(self, user: str, name: str) -> Habit:
+        """HabitManager.find_habit для пользователя user."""
+        return self.manager(user).find_habit(name)
+
+    def list_habits(self, user: str) -> List[Habit]:
+        """HabitManager.list_habits для пользователя user."""
+        return self.manager(user).list_habits()
+
+    def shard_files(self) -> List[List[str]]:
+        """Файлы данных по шардам (пустые шарды — пустые списки)."""
+        result = []
+        for index in range(self.shards):
+            directory = self.shard_dir(index)
+            try:
+                names = sorted(os.listdir(directory))
+            except FileNotFoundError:
+                names = []
+            result.append([os.path.join(directory, n) for n in names if n.endswith(self.suffix)])
+        return result
+
+    def users(self) -> Iterator[str]:
+        """Идентификаторы всех пользователей (по шардам)."""
+        for files in self.shard_files():
+            for path in files:
+                yield os.path.basename(path)[:-len(self.suffix)]
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика кэша открытых менеджеров."""
+        return {"open": len(self._open), "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+    def close(self) -> None:
+        """Закрывает все открытые менеджеры."""
+        while self._open:
+            _, manager = self._open.popitem()
+            manager.close()
@@ -0,0 +1,735 @@
+# storage.py
+"""
+Хранилища привычек для HabitManager.
+
+HabitStorage — интерфейс, под которым HabitManager держит данные:
+- CsvStorage: CSV-снимок + файл истории, каждая запись переписывает всё;
+- JournalStorage: CSV-снимок + append-only журнал с компактацией;
+- SnapshotStorage: CSV + бинарный снимок через mmap, строки читаются лениво;
+- SqliteStorage: SQLite (WAL, индексы), строки читаются лениво по одной.
+
+Хранилища бросают исключения ввода-вывода как есть; HabitManager
+оборачивает их в HabitError.
+
+Для работы нескольких процессов с одним файлом хранилище отдаёт
+межпроцессную блокировку (lock) и дешёвую метку версии (version):
+HabitManager сравнивает её с запомненной, чтобы перечитывать данные только
+при реальном изменении и не затирать чужие записи.
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import struct
+import warnings
+from contextlib import nullcontext
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from habit_record import Habit, FIELDNAMES, normalize_name
+from habit_history import CompletionHistory
+from binary_snapshot import SNAPSHOT_SUFFIX, Snapshot, write_snapshot
+from file_lock import LOCK_SUFFIX, FileLock
+from instrumentation import count, timed
+
+JOURNAL_SUFFIX = ".journal"
+HISTORY_SUFFIX = ".history"
+HISTORY_FIELDNAMES = ["name", "base", "bits"]
+COMPACT_THRESHOLD = 1000
+DEFAULT_CHUNK_SIZE = 10000
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+# Мутация: ("put", key, Habit) или ("del", key, None)
+Op = Tuple[str, str, Optional[Habit]]
+
+
+def stat_token(path: str) -> Optional[Tuple[int, int, int]]:
+    """(mtime_ns, размер, inode) файла или None, если его нет."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class DuplicateRowsWarning(UserWarning):
+    """В файле есть строки с повторяющимся (без учёта регистра) именем."""
+
+
+def first_wins(rows: Iterable[Tuple[str, Habit]], path: str) -> Dict[str, Habit]:
+    """
+    Индекс по ключу, где из строк с одинаковым ключом остаётся первая.
+
+    Об отброшенных строках предупреждает DuplicateRowsWarning: при следующей
+    полной перезаписи файла их не будет.
+    """
+    index: Dict[str, Habit] = {}
+    dropped = []
+    for key, habit in rows:
+        if key in index:
+            dropped.append(habit.name)
+        else:
+            index[key] = habit
+    if dropped:
+        count("storage.duplicates", len(dropped))
+        shown = ", ".join(repr(name) for name in dropped[:10])
+        more = f" и ещё {len(dropped) - 10}" if len(dropped) > 10 else ""
+        warnings.warn(f"{path}: отброшены строки с повторяющимися именами: {shown}{more}",
+                      DuplicateRowsWarning, stacklevel=2)
+    return index
+
+
+def chunked(items: Iterable[Habit], size: int) -> Iterator[List[Habit]]:
+    """Разбивает поток записей на списки длиной не больше size."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class HabitStorage:
+    """
+    Интерфейс хранилища.
+
+    Attributes:
+        path (str): Путь к основному файлу.
+        lazy (bool): True, если хранилище умеет отдавать строки по ключу
+            (get) и менеджеру не нужно загружать всё при старте.
+    """
+
+    lazy = False
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load_all(self) -> Dict[str, Habit]:
+        """Все записи в порядке хранения (ключ — нормализованное имя)."""
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[Habit]:
+        """Одна запись по ключу (только для lazy-хранилищ)."""
+        raise NotImplementedError
+
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Habit]]:
+        """
+        Потоковое чтение записей порциями по chunk_size.
+
+        Память ограничена размером порции; истории выполнений могут не
+        читаться (history — None), производные поля берутся как сохранены.
+        """
+        yield from chunked(self.load_all().values(), chunk_size)
+
+    def write(self, ops: List[Op], index: Dict[str, Habit]) -> None:
+        """
+        Фиксирует пачку мутаций одной операцией.
+
+        Args:
+            ops: Мутации в порядке применения.
+            index: Текущее состояние в памяти (для хранилищ, пишущих снимок).
+        """
+        raise NotImplementedError
+
+    def save_all(self, index: Dict[str, Habit]) -> None:
+        """Записывает все записи index."""
+        raise NotImplementedError
+
+    def compact(self, index: Dict[str, Habit]) -> None:
+        """Сжимает служебные данные хранилища (по умолчанию ничего не делает)."""
+
+    def lock(self):
+        """Контекстный менеджер межпроцессной блокировки на время чтения-записи."""
+        return nullcontext()
+
+    def version(self) -> Any:
+        """
+        Дешёвая метка состояния данных (без чтения содержимого).
+
+        Метка меняется при любой записи другим процессом; равенство меток
+        означает, что перечитывать нечего.
+        """
+        return None
+
+    def close(self) -> None:
+        """Освобождает ресурсы."""
+
+
+def write_csv_atomic(path: str, fieldnames: List[str], rows: Iterable[Dict[str, Any]]) -> None:
+    """Пишет CSV во временный файл, fsync и атомарно подменяет path."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CsvStorage(HabitStorage):
+    """
+    CSV-снимок и рядом ``<path>.history`` с историями выполнений.
+
+    Из строк с повторяющимся (без учёта регистра) именем при загрузке
+    остаётся первая (first_wins, с предупреждением): до остальных всё равно
+    нельзя было добраться через find_habit.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.history_path = path + HISTORY_SUFFIX
+        self._lock = FileLock(path + LOCK_SUFFIX)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if not os.path.exists(path):
+            # создаём CSV с заголовком
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                csv.DictWriter(f, fieldnames=FIELDNAMES).writeheader()
+
+    @timed("storage.csv.load")
+    def load_all(self) -> Dict[str, Habit]:
+        with open(self.path, "r", encoding="utf-8", newline="") as f:
+            index = first_wins(((normalize_name(h.name), h)
+                                for h in map(Habit.from_row, csv.DictReader(f))), self.path)
+        self._load_history(index)
+        return index
+
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Habit]]:
+        """
+        Читает CSV построчно и привязывает истории выполнений.
+
+        История заранее читается в словарь строк base/bits без разбора, в
+        памяти — она и одна порция записей; повторяющиеся имена здесь не
+        отбрасываются.
+        """
+        histories = self._read_history()
+
+        def rows() -> Iterator[Habit]:
+            with open(self.path, "r", encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    habit = Habit.from_row(row)
+                    stored = histories.get(normalize_name(habit.name))
+                    if stored is not None:
+                        habit.history = CompletionHistory.decode(*stored)
+                    yield habit
+
+        yield from chunked(rows(), chunk_size)
+
+    def _read_history(self) -> Dict[str, Tuple[int, str]]:
+        """Ключ -> (base, закодированные bits) из файла истории."""
+        histories = {}
+        if os.path.exists(self.history_path):
+            with open(self.history_path, "r", encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    histories[normalize_name(row["name"])] = (int(row["base"]), row["bits"])
+        return histories
+
+    @timed("storage.csv.load_history")
+    def _load_history(self, index: Dict[str, Habit]) -> None:
+        """Привязывает сохранённые истории выполнений к записям index."""
+        for key, stored in self._read_history().items():
+            habit = index.get(key)
+            if habit is not None:
+                habit.history = CompletionHistory.decode(*stored)
+
+    def lock(self) -> FileLock:
+        return self._lock
+
+    def version(self) -> Any:
+        # файлы подменяются через os.replace, поэтому inode меняется при
+        # каждой записи даже при грубом разрешении mtime
+        return stat_token(self.path), stat_token(self.history_path)
+
+    def write(self, ops: List[Op], index: Dict[str, Habit]) -> None:
+        self.save_all(index)
+
+    @timed("storage.csv.save")
+    def save_all(self, index: Dict[str, Habit]) -> None:
+        """
+        Атомарно переписывает историю и CSV (временный файл + os.replace).
+
+        История пишется первой: если сбой случится между файлами, при загрузке
+        производные поля будут пересчитаны из более новой истории.
+        """
+        write_csv_atomic(self.history_path, HISTORY_FIELDNAMES, (
+            {"name": h.name, "base": h.history.base, "bits": h.history.encode()}
+            for h in index.values() if h.history is not None))
+        write_csv_atomic(self.path, FIELDNAMES, (h.to_row() for h in index.values()))
+
+    def compact(self, index: Dict[str, Habit]) -> None:
+        self.save_all(index)
+
+
+class SnapshotStorage(CsvStorage):
+    """
+    CSV и история плюс бинарный снимок ``<path>.snap`` для быстрого старта.
+
+    CSV остаётся основным форматом. Снимок открывается через mmap: старт не
+    читает данных, get() декодирует одну строку бисекцией по ключу. Снимок
+    строится лениво при первом обращении менеджера, если его нет или он
+    устарел (метки CSV и истории не совпадают с заголовком); если записать
+    его не удалось, используются разобранные из CSV записи.
+
+    Мутации не переписывают снимок: CSV и история переписываются потоком с
+    наложенными ops, снимок на диске от этого устаревает и пересобирается
+    при следующем холодном старте (или compact()). Сам процесс продолжает
+    читать открытый снимок с наложенными поверх своими изменениями.
+    Потоковое чтение (iter_chunks) снимок не строит: без актуального
+    снимка оно читает CSV порциями.
+    """
+
+    lazy = True
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.snapshot_path = path + SNAPSHOT_SUFFIX
+        # база: открытый снимок или записи, разобранные из CSV
+        self._snapshot: Optional[Snapshot] = None
+        self._parsed: Optional[Dict[str, Habit]] = None
+        # изменения этого процесса поверх базы: ключ -> запись (None — удалена);
+        # _moved — ключи, чья позиция в базе больше недействительна
+        self._overlay: Dict[str, Optional[Habit]] = {}
+        self._moved: set = set()
+        # метка CSV и истории, которой соответствуют база с наложенными изменениями
+        self._base_version: Any = None
+
+    @staticmethod
+    def _apply_ops(overlay: Dict[str, Optional[Habit]], moved: set, ops: List[Op]) -> None:
+        """Накладывает ops: удалённая и снова добавленная запись уходит в конец."""
+        for kind, key, habit in ops:
+            if kind == "put":
+                if key in overlay and overlay[key] is None:
+                    del overlay[key]
+                overlay[key] = habit.copy()
+            else:
+                overlay.pop(key, None)
+                overlay[key] = None
+                moved.add(key)
+
+    @staticmethod
+    def _merged(rows: Iterable[Tuple[str, Habit]], overlay: Dict[str, Optional[Habit]],
+                moved: set) -> Iterator[Tuple[str, Habit]]:
+        """Строки базы с наложенным overlay в порядке хранения."""
+        placed = set()
+        for key, habit in rows:
+            if key in overlay:
+                if key in placed or key in moved or overlay[key] is None:
+                    continue
+                placed.add(key)
+                habit = overlay[key]
+            yield key, habit
+        for key, habit in overlay.items():
+            if habit is not None and key not in placed:
+                yield key, habit
+
+    def _close_snapshot(self) -> None:
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+
+    def _reset(self) -> None:
+        self._close_snapshot()
+        self._parsed = None
+        self._overlay = {}
+        self._moved = set()
+        self._base_version = None
+
+    def _open_snapshot(self, version: Any) -> bool:
+        """Открывает снимок с диска, если он соответствует version."""
+        self._reset()
+        try:
+            snapshot = Snapshot(self.snapshot_path)
+        except (OSError, ValueError):
+            return False
+        if not snapshot.matches(*version):
+            snapshot.close()
+            return False
+        self._snapshot, self._base_version = snapshot, version
+        return True
+
+    def _current(self, build: bool) -> bool:
+        """
+        Готовит базу для текущей версии файлов.
+
+        Args:
+            build (bool): Пересобрать снимок из CSV, если подходящего нет.
+
+        Returns:
+            bool: False — актуальной базы нет (только при build=False).
+        """
+        version = self.version()
+        if self._base_version == version:
+            return True
+        if self._open_snapshot(version):
+            return True
+        if not build:
+            return False
+        self._rebuild(version)
+        return True
+
+    @timed("storage.snapshot.rebuild")
+    def _rebuild(self, version: Any) -> None:
+        """Читает CSV и пересобирает снимок."""
+        index = CsvStorage.load_all(self)
+        if self.version() != version:
+            # файл изменился во время чтения: при следующем обращении метка
+            # сверится заново
+            self._parsed = index
+            return
+        self._write_snapshot(index, version)
+        if self._snapshot is None:
+            self._parsed = index
+        self._base_version = version
+
+    def _write_snapshot(self, index: Dict[str, Habit], version: Any) -> None:
+        """Пишет и открывает снимок; ошибки не фатальны — CSV уже записан."""
+        # открытый файл нельзя подменить в Windows
+        self._reset()
+        try:
+            write_snapshot(self.snapshot_path, index.values(), *version)
+            self._snapshot = Snapshot(self.snapshot_path)
+        except (OSError, ValueError, struct.error):
+            # без снимка база — записи, разобранные из CSV
+            count("storage.snapshot.write_error")
+
+    def _rows(self) -> Iterator[Tuple[str, Habit]]:
+        """(ключ, запись) базы с изменениями процесса; записи — копии."""
+        if self._snapshot is not None:
+            base = ((normalize_name(h.name), h) for h in self._snapshot.iter_rows())
+        else:
+            base = ((key, h.copy()) for key, h in self._parsed.items())
+        if not self._overlay:
+            return base
+        return ((key, habit.copy() if key in self._overlay else habit)
+                for key, habit in self._merged(base, self._overlay, self._moved))
+
+    @timed("storage.snapshot.load")
+    def load_all(self) -> Dict[str, Habit]:
+        self._current(build=True)
+        return first_wins(self._rows(), self.path)
+
+    @timed("storage.snapshot.get")
+    def get(self, key: str) -> Optional[Habit]:
+        self._current(build=True)
+        if key in self._overlay:
+            habit = self._overlay[key]
+            return habit.copy() if habit is not None else None
+        if self._snapshot is not None:
+            return self._snapshot.find(key)
+        habit = self._parsed.get(key)
+        return habit.copy() if habit is not None else None
+
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Habit]]:
+        """Из актуального снимка, иначе потоком из CSV (снимок не строится)."""
+        if self._current(build=False):
+            yield from chunked((habit for _, habit in self._rows()), chunk_size)
+        else:
+            yield from super().iter_chunks(chunk_size)
+
+    @timed("storage.snapshot.write")
+    def write(self, ops: List[Op], index: Dict[str, Habit]) -> None:
+        """
+        Переписывает CSV и историю потоком, накладывая ops.
+
+        Строки без изменений копируются из текущих файлов, поэтому index
+        (у ленивого менеджера неполный) не нужен, а память не зависит от
+        размера данных. Снимок не переписывается.
+        """
+        current = self.version() == self._base_version
+        changes: Dict[str, Optional[Habit]] = {}
+        moved: set = set()
+        self._apply_ops(changes, moved, ops)
+
+        def history_rows() -> Iterator[Dict[str, Any]]:
+            if os.path.exists(self.history_path):
+                with open(self.history_path, "r", encoding="utf-8", newline="") as f:
+                    for row in csv.DictReader(f):
+                        if normalize_name(row["name"]) not in changes:
+                            yield row
+            for habit in changes.values():
+                if habit is not None and habit.history is not None:
+                    yield {"name": habit.name, "base": habit.history.base,
+                           "bits": habit.history.encode()}
+
+        def csv_rows() -> Iterator[Dict[str, str]]:
+            with open(self.path, "r", encoding="utf-8", newline="") as f:
+                stored = ((normalize_name(row.get("name") or ""), row) for row in csv.DictReader(f))
+                for key, row in self._merged(stored, changes, moved):
+                    yield row.to_row() if isinstance(row, Habit) else row
+
+        write_csv_atomic(self.history_path, HISTORY_FIELDNAMES, history_rows())
+        write_csv_atomic(self.path, FIELDNAMES, csv_rows())
+        if current:
+            self._apply_ops(self._overlay, self._moved, ops)
+            self._base_version = self.version()
+        else:
+            self._reset()
+
+    def save_all(self, index: Dict[str, Habit]) -> None:
+        """Переписывает CSV и историю, затем снимок с их новыми метками."""
+        super().save_all(index)
+        version = self.version()
+        self._write_snapshot(index, version)
+        if self._snapshot is not None:
+            self._base_version = version
+
+    def compact(self, index: Dict[str, Habit]) -> None:
+        """Пересобирает файлы и снимок из index (менеджер передаёт полный)."""
+        self.save_all(index)
+
+    def close(self) -> None:
+        self._reset()
+
+
+class JournalStorage(CsvStorage):
+    """
+    CSV-снимок плюс append-only журнал ``<path>.journal``.
+
+    Каждая мутация дописывает одну JSON-строку вместо перезаписи CSV. При
+    загрузке журнал проигрывается поверх снимка, а после compact_threshold
+    записей снимок переписывается атомарно и журнал обнуляется. Операции
+    журнала идемпотентны, поэтому сбой в любой момент компактации не
+    теряет данных.
+    """
+
+    def __init__(self, path: str, compact_threshold: int = COMPACT_THRESHOLD):
+        super().__init__(path)
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.compact_threshold = compact_threshold
+        self.journal_len = 0
+
+    def load_all(self) -> Dict[str, Habit]:
+        index = super().load_all()
+        self.journal_len = self._replay_journal(index)
+        return index
+
+    def version(self) -> Any:
+        return super().version() + (stat_token(self.journal_path),)
+
+    @staticmethod
+    def _read_journal(f: BinaryIO) -> Iterator[Tuple[Op, int]]:
+        """
+        Разбирает журнал: пары (мутация, длина строки в байтах).
+
+        Чтение останавливается на первой повреждённой строке — это
+        недописанный хвост после сбоя.
+        """
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            try:
+                record = json.loads(line.decode("utf-8"))
+                op = record["op"]
+                if op == "put":
+                    habit = Habit.from_row(record["row"])
+                    if "bits" in record:
+                        habit.history = CompletionHistory.decode(record["base"], record["bits"])
+                    yield (op, normalize_name(habit.name), habit), len(line)
+                else:
+                    yield (op, record["key"], None), len(line)
+            except (ValueError, KeyError, TypeError):
+                return
+
+    @timed("storage.journal.replay")
+    def _replay_journal(self, index: Dict[str, Habit]) -> int:
+        """
+        Применяет записи журнала к index и возвращает их число.
+
+        Повреждённый хвост отрезается, чтобы следующие записи не склеились с ним.
+        """
+        if not os.path.exists(self.journal_path):
+            return 0
+        count = 0
+        valid_end = 0
+        with open(self.journal_path, "r+b") as f:
+            for (op, key, habit), size in self._read_journal(f):
+                if op == "put":
+                    index[key] = habit
+                else:
+                    index.pop(key, None)
+                count += 1
+                valid_end += size
+            if f.seek(0, os.SEEK_END) != valid_end:
+                f.truncate(valid_end)
+        return count
+
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Habit]]:
+        """
+        Поток снимка с наложенным журналом.
+
+        Журнал (не длиннее compact_threshold записей) читается в память
+        целиком: изменённые строки снимка подменяются, удалённые пропускаются,
+        добавленные после снимка выдаются в конце.
+        """
+        changes: Dict[str, Optional[Habit]] = {}
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f:
+                for (op, key, habit), _ in self._read_journal(f):
+                    changes[key] = habit
+
+        def merged() -> Iterator[Habit]:
+            for chunk in super(JournalStorage, self).iter_chunks(chunk_size):
+                for habit in chunk:
+                    key = normalize_name(habit.name)
+                    if key in changes:
+                        habit = changes.pop(key)
+                        if habit is None:
+                            continue
+                    yield habit
+            for habit in changes.values():
+                if habit is not None:
+                    yield habit
+
+        yield from chunked(merged(), chunk_size)
+
+    @staticmethod
+    def _encode(op: Op) -> str:
+        kind, key, habit = op
+        if kind == "put":
+            record = {"op": kind, "row": habit.to_row(),
+                      "base": habit.history.base, "bits": habit.history.encode()}
+        else:
+            record = {"op": kind, "key": key}
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+    @timed("storage.journal.append")
+    def write(self, ops: List[Op], index: Dict[str, Habit]) -> None:
+        data = "".join(self._encode(op) for op in ops)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_len += len(ops)
+        if self.journal_len >= self.compact_threshold:
+            self.compact(index)
+
+    def compact(self, index: Dict[str, Habit]) -> None:
+        """Переписывает CSV-снимок и очищает журнал."""
+        count("storage.journal.compact")
+        self.save_all(index)
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "w", encoding="utf-8") as f:
+                f.flush()
+                os.fsync(f.fileno())
+        self.journal_len = 0
+
+
+class SqliteStorage(HabitStorage):
+    """
+    Хранилище на sqlite3 в режиме WAL.
+
+    Ключ (нормализованное имя) — PRIMARY KEY, дополнительно проиндексированы
+    category и last_day. Запросы параметризованы, поэтому sqlite3 держит их
+    подготовленными в кэше соединения. find_habit и mark_done читают и
+    пишут ровно одну строку.
+    """
+
+    lazy = True
+
+    _COLUMNS = ("key, name, category, frequency, start_day, last_day, "
+                "streak, target, progress, history_base, history")
+    _SELECT = f"SELECT {_COLUMNS} FROM habits"
+    _UPSERT = (f"INSERT INTO habits ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+               "ON CONFLICT(key) DO UPDATE SET name=excluded.name, "
+               "category=excluded.category, frequency=excluded.frequency, "
+               "start_day=excluded.start_day, last_day=excluded.last_day, "
+               "streak=excluded.streak, target=excluded.target, "
+               "progress=excluded.progress, history_base=excluded.history_base, "
+               "history=excluded.history")
+    _DELETE = "DELETE FROM habits WHERE key = ?"
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # GUI читает менеджер из рабочего потока графиков
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS habits ("
+                "key TEXT PRIMARY KEY, name TEXT NOT NULL, category TEXT, "
+                "frequency TEXT, start_day INTEGER, last_day INTEGER, "
+                "streak INTEGER, target INTEGER, progress REAL, "
+                "history_base INTEGER, history BLOB)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS habits_category ON habits(category)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS habits_last_day ON habits(last_day)")
+
+    @staticmethod
+    def _to_habit(row: tuple) -> Habit:
+        (_key, name, category, frequency, start, last,
+         streak, target, progress, base, bits) = row
+        history = None
+        if base is not None:
+            history = CompletionHistory(base, bytearray(bits or b""))
+        return Habit(name, category, frequency, start, last, streak, target, progress, history)
+
+    @staticmethod
+    def _to_params(key: str, h: Habit) -> tuple:
+        history = bytes(h.history.bits).rstrip(b"\x00") if h.history is not None else None
+        base = h.history.base if h.history is not None else None
+        return (key, h.name, h.category, h.frequency, h.start, h.last,
+                h.streak, h.target, h.progress, base, history)
+
+    def version(self) -> Any:
+        # data_version меняется только после коммитов других соединений;
+        # блокировки sqlite сами сериализуют запись, lock() не нужен
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    @timed("storage.sqlite.load")
+    def load_all(self) -> Dict[str, Habit]:
+        rows = self.conn.execute(self._SELECT + " ORDER BY rowid")
+        return {row[0]: self._to_habit(row) for row in rows}
+
+    @timed("storage.sqlite.get")
+    def get(self, key: str) -> Optional[Habit]:
+        row = self.conn.execute(self._SELECT + " WHERE key = ?", (key,)).fetchone()
+        return self._to_habit(row) if row is not None else None
+
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Habit]]:
+        cursor = self.conn.execute(self._SELECT + " ORDER BY rowid")
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield [self._to_habit(row) for row in rows]
+
+    @timed("storage.sqlite.write")
+    def write(self, ops: List[Op], index: Dict[str, Habit]) -> None:
+        with self.conn:
+            for kind, key, habit in ops:
+                if kind == "put":
+                    self.conn.execute(self._UPSERT, self._to_params(key, habit))
+                else:
+                    self.conn.execute(self._DELETE, (key,))
+
+    @timed("storage.sqlite.save")
+    def save_all(self, index: Dict[str, Habit]) -> None:
+        with self.conn:
+            self.conn.executemany(self._UPSERT, (self._to_params(k, h) for k, h in index.items()))
+
+    def compact(self, index: Dict[str, Habit]) -> None:
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def open_storage(path: str, journal: bool = False,
+                 compact_threshold: int = COMPACT_THRESHOLD) -> HabitStorage:
+    """
+    Выбирает хранилище по расширению файла.
+
+    Args:
+        path (str): .db/.sqlite/.sqlite3 — SQLite, иначе CSV (с бинарным
+            снимком для быстрого старта).
+        journal (bool): Для CSV — писать мутации в журнал вместо снимка.
+        compact_threshold (int): Число записей журнала до компактации.
+    """
+    if path.lower().endswith(SQLITE_EXTENSIONS):
+        return SqliteStorage(path)
+    if journal:
+        return JournalStorage(path, compact_threshold)
+    return SnapshotStorage(path)
@@ -1,18 +1,43 @@
-# tests/test_analytics.py
-from analytics import active_habits, average_streak, top_problem_habits
-
-def test_active_and_average():
-    sample = [
-        {"name": "A", "streak": "2", "progress": "50%"},
-        {"name": "B", "streak": "4", "progress": "60%"},
-    ]
-    assert active_habits(sample) == 2
-    assert average_streak(sample) == 3
-
-def test_top_problems():
-    sample = [
-        {"name": "A", "progress": "10%"},
-        {"name": "B", "progress": "80%"},
-    ]
-    problems = top_problem_habits(sample, threshold=50)
-    assert "A" in problems and "B" not in problems
+# tests/test_analytics.py
+from analytics import active_habits, average_streak, top_problem_habits
+
+def test_active_and_average():
+    sample = [
+        {"name": "A", "streak": "2", "progress": "50%"},
+        {"name": "B", "streak": "4", "progress": "60%"},
+    ]
+    assert active_habits(sample) == 2
+    assert average_streak(sample) == 3
+
+def test_top_problems():
+    sample = [
+        {"name": "A", "progress": "10%"},
+        {"name": "B", "progress": "80%"},
+    ]
+    problems = top_problem_habits(sample, threshold=50)
+    assert "A" in problems and "B" not in problems
+
+def test_incremental_summary_tracks_mutations(tmp_path):
+    from analytics import summary, summary_full
+    from analytics_cache import IncrementalSummary
+    from habit_manager import HabitManager, HabitError
+    mgr = HabitManager(file_path=str(tmp_path / "habits.csv"))
+    cache = IncrementalSummary.for_manager(mgr)
+    cache.debug = True
+    mgr.add_habits([{"name": "A", "category": "X", "target": 2},
+                    {"name": "B", "category": "Y", "target": 1},
+                    {"name": "C", "category": "X", "target": 4}])
+    assert summary(mgr) == {"total": 3, "avg_streak": 0.0, "problems": ["A", "B", "C"]}
+    mgr.mark_done("B", "01-01-2024")
+    mgr.mark_done_many([("A", "01-01-2024"), ("A", "02-01-2024"), ("C", "01-01-2024")])
+    assert summary(mgr)["problems"] == ["C"]
+    mgr.unmark_done("B", "01-01-2024")
+    mgr.remove_habit("C")
+    try:
+        with mgr.batch():
+            mgr.remove_habit("A")
+            mgr.remove_habit("Missing")
+    except HabitError:
+        pass
+    assert summary(mgr) == summary_full(mgr) == {"total": 2, "avg_streak": 1.0, "problems": ["B"]}
+    assert cache.categories == {"X": 1, "Y": 1}
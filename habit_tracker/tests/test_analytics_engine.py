@@ -0,0 +1,61 @@
+import random
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from analytics_engine import HabitColumns
+from analytics import (average_streak, average_streak_py, top_problem_habits,
+                       top_problem_habits_py, summary, detailed_summary)
+from habit_manager import HabitManager
+from habit_record import Habit
+from notifications import needs_attention
+
+def random_rows(n, seed=1):
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        rows.append({
+            "name": f"H{i}",
+            "category": rnd.choice(["A", "B", "", "Здоровье"]),
+            "streak": rnd.choice([str(rnd.randint(0, 400)), "x", ""]),
+            "progress": rnd.choice([f"{rnd.uniform(0, 100):.1f}%", "50%", "bad"]),
+            "last_done": rnd.choice(["", "01-01-2024", f"{rnd.randint(1, 28):02d}-02-2024", "?"]),
+        })
+    return rows
+
+def test_wrappers_match_pure_python():
+    rows = random_rows(500)
+    assert average_streak(rows) == average_streak_py(rows)
+    for threshold in (0, 10, 50, 99.9, 100):
+        assert top_problem_habits(rows, threshold) == top_problem_habits_py(rows, threshold)
+    records = [Habit.from_row(r) for r in rows]
+    assert average_streak(records) == average_streak_py(records)
+    assert top_problem_habits(records) == top_problem_habits_py(records)
+
+def test_empty():
+    assert average_streak([]) == average_streak_py([]) == 0.0
+    assert HabitColumns([]).per_category() == {}
+
+def test_overdue_matches_needs_attention():
+    rows = random_rows(300, seed=2)
+    assert HabitColumns(rows).overdue(5) == needs_attention(rows, days_threshold=5)
+    assert HabitColumns(rows).overdue_count(5) == len(needs_attention(rows, days_threshold=5))
+
+def test_per_category_and_percentiles():
+    habits = [Habit("a", "X", streak=2, progress=10.0), Habit("b", "X", streak=4, progress=30.0),
+              Habit("c", "Y", streak=9, progress=90.0)]
+    cols = HabitColumns(habits)
+    assert cols.per_category() == {
+        "X": {"count": 2, "avg_streak": 3.0, "avg_progress": 20.0},
+        "Y": {"count": 1, "avg_streak": 9.0, "avg_progress": 90.0},
+    }
+    assert cols.streak_percentiles((0, 50, 100)) == {0: 2.0, 50: 4.0, 100: 9.0}
+    assert cols.progress_between(10, 30) == ["a", "b"]
+
+def test_summary(tmp_path):
+    mgr = HabitManager(file_path=str(tmp_path / "habits.csv"))
+    mgr.add_habits([{"name": "A", "target": 1}, {"name": "B"}])
+    mgr.mark_done("A", "01-01-2024")
+    assert summary(mgr) == {"total": 2, "avg_streak": 0.5, "problems": ["B"]}
+    detailed = detailed_summary(mgr)
+    assert detailed["overdue"] == 2 and detailed["categories"]["Общее"]["count"] == 2
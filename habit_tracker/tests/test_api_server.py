@@ -0,0 +1,131 @@
+import asyncio
+
+from api_server import ApiClient, HabitServer, load_test
+from habit_manager import HabitManager
+
+def test_api_crud_and_reads(tmp_path):
+    path = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=path)
+    mgr.add_habit("Run", category="Спорт")
+
+    async def scenario():
+        server = HabitServer(mgr, port=0)
+        await server.start()
+        client = ApiClient(server.host, server.port)
+        try:
+            status, rows = await client.request("GET", "/habits")
+            assert status == 200 and [r["name"] for r in rows] == ["Run"]
+            assert (await client.request("POST", "/habits", {"name": "Read"}))[0] == 201
+            assert (await client.request("POST", "/habits", {"name": "read"}))[0] == 409
+            status, row = await client.request("POST", "/habits/Run/mark", {"date": "01-01-2024"})
+            assert status == 200 and row["last_done"] == "01-01-2024"
+            assert (await client.request("POST", "/habits/Nope/mark", {}))[0] == 404
+            assert (await client.request("DELETE", "/habits/Read"))[0] == 200
+            assert (await client.request("GET", "/habits/Read"))[0] == 404
+            status, data = await client.request("GET", "/summary")
+            assert status == 200 and data["total"] == 1
+            status, names = await client.request("GET", "/attention?days=3")
+            assert status == 200 and names == ["Run"]
+            assert (await client.request("GET", "/nothing"))[0] == 404
+        finally:
+            await client.close()
+            await server.stop()
+
+    asyncio.run(scenario())
+    assert [h.name for h in HabitManager(file_path=path).list_habits()] == ["Run"]
+
+def test_api_coalesces_concurrent_writes(tmp_path):
+    mgr = HabitManager(file_path=str(tmp_path / "habits.csv"))
+
+    async def scenario():
+        server = HabitServer(mgr, port=0)
+        await server.start()
+        clients = [ApiClient(server.host, server.port) for _ in range(20)]
+        try:
+            results = await asyncio.gather(*(
+                c.request("POST", "/habits", {"name": f"H{i}"}) for i, c in enumerate(clients)))
+            assert all(status == 201 for status, _ in results)
+            assert len(server.snapshot.habits) == 20
+            assert server.flushes < 20
+        finally:
+            for c in clients:
+                await c.close()
+            await server.stop()
+
+    asyncio.run(scenario())
+    assert len(HabitManager(file_path=str(tmp_path / "habits.csv")).list_habits()) == 20
+
+def test_api_backpressure(tmp_path):
+    mgr = HabitManager(file_path=str(tmp_path / "habits.csv"))
+
+    async def scenario():
+        server = HabitServer(mgr, port=0, max_pending=1, max_connections=2)
+        await server.start()
+        clients = [ApiClient(server.host, server.port) for _ in range(6)]
+        try:
+            results = await asyncio.gather(*(
+                c.request("POST", "/habits", {"name": f"H{i}"}) for i, c in enumerate(clients)))
+            statuses = [status for status, _ in results]
+            assert 503 in statuses and 201 in statuses
+        finally:
+            for c in clients:
+                await c.close()
+            await server.stop()
+
+    asyncio.run(scenario())
+
+def test_load_test_reports_latency(tmp_path):
+    mgr = HabitManager(file_path=str(tmp_path / "habits.csv"))
+    mgr.add_habits([{"name": f"H{i}"} for i in range(10)])
+
+    async def scenario():
+        server = HabitServer(mgr, port=0)
+        await server.start()
+        try:
+            return await load_test(server, total=200, concurrency=8)
+        finally:
+            await server.stop()
+
+    stats = asyncio.run(scenario())
+    assert stats["requests"] == 200 and stats["errors"] == 0
+    assert stats["rps"] > 0 and stats["p99_ms"] >= stats["p50_ms"]
+
+def test_api_bad_input_fails_only_its_request(tmp_path, monkeypatch):
+    path = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=path)
+    add_habit = mgr.add_habit
+
+    def flaky_add(name, **kwargs):
+        if name == "Boom":
+            raise RuntimeError("сбой")
+        return add_habit(name, **kwargs)
+    monkeypatch.setattr(mgr, "add_habit", flaky_add)
+
+    async def scenario():
+        server = HabitServer(mgr, port=0)
+        await server.start()
+        client = ApiClient(server.host, server.port)
+        try:
+            # все три мутации попадают в одну пачку писателя
+            good, bad, boom = await asyncio.gather(
+                server._submit("add", {"name": "Good"}),
+                server._submit("add", {"name": "Bad", "category": 5}),
+                server._submit("add", {"name": "Boom"}))
+            assert (good[0], bad[0], boom[0]) == (201, 400, 500)
+            assert server.flushes == 1
+            assert (await client.request("POST", "/habits", {"name": "T", "target": 0}))[0] == 400
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            writer.write(b"POST /habits HTTP/1.1\r\nContent-Length: -1\r\n\r\n")
+            assert (await reader.readline()).startswith(b"HTTP/1.1 400")
+            writer.close()
+            # запись другого процесса видна следующему чтению
+            other = HabitManager(file_path=path)
+            other.add_habit("External")
+            other.close()
+            status, rows = await client.request("GET", "/habits")
+            assert status == 200 and [r["name"] for r in rows] == ["Good", "External"]
+        finally:
+            await client.close()
+            await server.stop()
+
+    asyncio.run(scenario())
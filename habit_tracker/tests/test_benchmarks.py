@@ -0,0 +1,17 @@
+from benchmarks.datagen import generate_csv
+from benchmarks.run import compare
+from habit_manager import HabitManager
+
+def test_generator_is_seeded_and_loadable(tmp_path):
+    a = generate_csv(str(tmp_path / "a.csv"), 200, seed=1, today=739000)
+    b = generate_csv(str(tmp_path / "b.csv"), 200, seed=1, today=739000)
+    assert open(a, encoding="utf-8").read() == open(b, encoding="utf-8").read()
+    habits = HabitManager(file_path=a).list_habits()
+    assert len(habits) == 200
+    assert all(h.last == 0 or h.start <= h.last <= 739000 for h in habits)
+
+def test_compare_flags_regressions():
+    base = {"results": {"load@1000": {"median": 1.0}, "find@1000": {"median": 1.0}}}
+    cur = {"results": {"load@1000": {"median": 1.5}, "find@1000": {"median": 1.1},
+                       "new@1000": {"median": 9.0}}}
+    assert [r["name"] for r in compare(cur, base, tolerance=0.25)] == ["load@1000"]
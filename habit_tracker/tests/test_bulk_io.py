@@ -0,0 +1,71 @@
+import json
+
+from bulk_io import export_habits, import_habits
+from habit_entry import record_error
+from habit_manager import HabitManager
+
+def test_record_error():
+    assert record_error({"name": "Run", "target": "10", "last_done": "01-01-2024"}) is None
+    assert record_error({"name": "Run", "last_done": "1-1-2024"}) is None
+    assert "имя" in record_error({"name": "Bad!"})
+    assert "target" in record_error({"name": "Run", "target": "ten"})
+    assert "target" in record_error({"name": "Run", "target": "3000000000"})
+    assert "streak" in record_error({"name": "Run", "streak": 10 ** 20})
+    assert "last_done" in record_error({"name": "Run", "last_done": "2024/01/01"})
+    assert "несуществующая" in record_error({"name": "Run", "start_date": "31-02-2024"})
+
+def test_import_collects_errors_and_writes_once(tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text("name,category,target,last_done,streak\n"
+                   "Run,Спорт,10,02-01-2024,2\n"
+                   "Bad!,X,5,,\n"
+                   "read,,7,,\n"
+                   "RUN,Спорт,3,,\n"
+                   "Swim,Спорт,zero,,\n", encoding="utf-8")
+    mgr = HabitManager(file_path=str(tmp_path / "habits.csv"))
+    mgr.add_habit("Read")
+    writes = []
+    real_write = mgr.storage.write
+    mgr.storage.write = lambda ops, index: (writes.append(len(ops)), real_write(ops, index))
+    report = import_habits(mgr, str(src), chunk_size=2)
+    assert report.imported == 1 and report.failed == 4
+    assert [line for line, _ in report.errors] == [3, 4, 5, 6]
+    assert writes == [1]
+    run = HabitManager(file_path=str(tmp_path / "habits.csv")).find_habit("run")
+    assert (run.streak, run.target, run["last_done"]) == (2, 10, "02-01-2024")
+
+def test_jsonl_round_trip_keeps_history(tmp_path):
+    db = str(tmp_path / "habits.db")
+    mgr = HabitManager(file_path=db)
+    mgr.add_habits([{"name": f"H{i}", "target": 4} for i in range(5)])
+    mgr.mark_done_many([("H1", "01-01-2024"), ("H1", "03-01-2024")])
+    out = str(tmp_path / "out.jsonl")
+    assert export_habits(mgr.storage, out, chunk_size=2) == 5
+    lines = open(out, encoding="utf-8").read().splitlines()
+    assert json.loads(lines[1])["name"] == "H1"
+    (tmp_path / "out.jsonl").write_text("\n".join(lines + ["{broken"]) + "\n", encoding="utf-8")
+    target = HabitManager(file_path=str(tmp_path / "copy.csv"))
+    report = import_habits(target, out)
+    assert report.imported == 5 and report.errors == [(6, "строка не является JSON-объектом")]
+    h1 = target.find_habit("H1")
+    from datetime import date
+    assert h1.history.is_done(date(2024, 1, 1).toordinal())
+    assert h1.history.is_done(date(2024, 1, 3).toordinal())
+    assert h1.streak == 1
+    csv_out = str(tmp_path / "out.csv")
+    assert export_habits(target.storage, csv_out) == 5
+
+def test_export_from_csv_keeps_history(tmp_path):
+    from storage import open_storage
+    path = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=path)
+    mgr.add_habits([{"name": "Run"}, {"name": "Read"}])
+    mgr.mark_done_many([("Run", "01-01-2024"), ("Run", "05-01-2024")])
+    assert mgr.completion_rate("Run", "01-01-2024", "05-01-2024") == 40.0
+    mgr.close()
+    out = str(tmp_path / "out.jsonl")
+    # снимка ещё нет: экспорт читает CSV потоком
+    assert export_habits(open_storage(path), out, chunk_size=1) == 2
+    copy = HabitManager(file_path=str(tmp_path / "copy.csv"))
+    assert import_habits(copy, out).imported == 2
+    assert copy.completion_rate("Run", "01-01-2024", "05-01-2024") == 40.0
@@ -0,0 +1,24 @@
+from datetime import date, datetime
+
+import pytest
+
+from date_codec import DATE_FORMAT, day_or_zero, format_day, parse_day
+
+def test_parse_matches_strptime():
+    for d in (date(2024, 2, 29), date(1999, 12, 31), date(2030, 1, 1)):
+        text = d.strftime(DATE_FORMAT)
+        assert parse_day(text) == datetime.strptime(text, DATE_FORMAT).toordinal()
+        assert format_day(d.toordinal()) == text
+    assert parse_day(" 01-02-2024 ") == date(2024, 2, 1).toordinal()
+    assert parse_day("2024-02-01") == date(2024, 2, 1).toordinal()
+
+def test_unpadded_day_and_month_like_strptime():
+    for text in ("1-2-2024", "01-2-2024", "1-02-2024", "9-12-2023"):
+        assert parse_day(text) == datetime.strptime(text, DATE_FORMAT).toordinal()
+
+def test_invalid_dates():
+    for text in ("31-02-2024", "1-2-24", "123-1-2024", "1--2024", "aa-bb-cccc", "2024", ""):
+        with pytest.raises(ValueError):
+            parse_day(text)
+        assert day_or_zero(text) == 0
+    assert format_day(0) == ""
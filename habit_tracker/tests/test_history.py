@@ -0,0 +1,46 @@
+from datetime import date
+from habit_history import CompletionHistory
+
+D = date(2024, 1, 1).toordinal()
+
+def test_mark_unmark_and_streak():
+    h = CompletionHistory(D)
+    for i in (0, 1, 2, 4, 5):
+        assert h.mark(D + i)
+    assert not h.mark(D + 1)
+    assert h.last_day() == D + 5
+    assert h.streak() == 2
+    assert h.streak(D + 2) == 3
+    h.mark(D + 3)
+    assert h.streak() == 6
+    assert h.unmark(D + 5) and not h.unmark(D + 5)
+    assert h.streak() == 5
+
+def test_backdated_before_base():
+    h = CompletionHistory(D)
+    h.mark(D)
+    h.mark(D - 20)
+    assert h.base <= D - 20
+    assert h.is_done(D - 20) and h.is_done(D) and not h.is_done(D - 1)
+    assert h.streak() == 1
+
+def test_count_and_rate():
+    h = CompletionHistory(D)
+    for i in range(0, 30, 2):
+        h.mark(D + i)
+    assert h.count(D, D + 29) == 15
+    assert h.count(D + 1, D + 1) == 0
+    assert h.completion_rate(D, D + 9) == 50.0
+    assert h.count(D - 100, D + 1000) == 15
+
+def test_encode_roundtrip():
+    h = CompletionHistory(D)
+    h.mark(D + 3)
+    h.mark(D + 17)
+    restored = CompletionHistory.decode(h.base, h.encode())
+    assert restored.last_day() == D + 17 and restored.count(D, D + 20) == 2
+
+def test_empty_history_rebases():
+    h = CompletionHistory(0)
+    h.mark(D)
+    assert h.base == D and len(h.bits) == 1
@@ -0,0 +1,57 @@
+import json
+
+import instrumentation
+import main
+from instrumentation import timed, timer
+
+def test_disabled_records_nothing():
+    instrumentation.reset()
+
+    @timed("test.fn")
+    def fn(x):
+        return x * 2
+
+    assert fn(2) == 4
+    with timer("test.block"):
+        pass
+    instrumentation.count("test.counter")
+    assert instrumentation.report() == {"timers": {}, "counters": {}}
+
+def test_histogram_and_counters():
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        @timed("test.fn")
+        def fn():
+            pass
+        for _ in range(10):
+            fn()
+        with timer("test.block"):
+            pass
+        instrumentation.count("test.counter", 3)
+    finally:
+        instrumentation.disable()
+    data = instrumentation.report()
+    assert data["timers"]["test.fn"]["count"] == 10
+    t = data["timers"]["test.fn"]
+    assert t["min_ms"] <= t["p50_ms"] <= t["p99_ms"] <= t["max_ms"]
+    assert data["timers"]["test.block"]["count"] == 1
+    assert data["counters"] == {"test.counter": 3}
+    assert "test.fn" in instrumentation.format_report(data)
+
+def test_profile_flag(tmp_path, capsys):
+    data = str(tmp_path / "habits.csv")
+    out = str(tmp_path / "profile.json")
+    pstats = str(tmp_path / "cli.pstats")
+    instrumentation.reset()
+    try:
+        assert main.main(["--profile", "--profile-out", out, "--cprofile", pstats,
+                          "--data", data, "add", "Run"]) == 0
+    finally:
+        instrumentation.disable()
+    assert "manager.add_habit" in capsys.readouterr().err
+    report = json.load(open(out, encoding="utf-8"))
+    assert report["timers"]["manager.add_habit"]["count"] == 1
+    assert "storage.snapshot.write" in report["timers"]
+    import pstats as ps
+    assert ps.Stats(pstats).total_calls > 0
@@ -0,0 +1,23 @@
+from habit_manager import HabitManager
+from list_model import HabitListModel, EMPTY_TEXT
+
+def test_model_follows_manager_events(tmp_path):
+    mgr = HabitManager(file_path=str(tmp_path / "habits.csv"))
+    model = HabitListModel(mgr.list_habits())
+    changes = []
+    mgr.subscribe(lambda *e: changes.append(model.on_change(*e)))
+    assert model.window(0, 5) == [EMPTY_TEXT]
+    mgr.add_habits({"name": f"H{i}", "category": "C"} for i in range(1000))
+    assert len(model) == 1000 and changes[-1] == 999
+    mgr.mark_done("H500", "01-01-2024")
+    assert changes[-1] == 500
+    assert model.window(500, 1) == ["H500 [C] — streak: 1 — progress: 3.3%"]
+    mgr.remove_habit("H10")
+    assert changes[-1] == 10
+    assert model.index_of("h11") == 10 and model.index_of("h10") == -1
+    assert [row.split(" ")[0] for row in model.window(9, 3)] == ["H9", "H11", "H12"]
+    assert model.window(2000, 10) == []
+
+def test_model_load_event_requests_reset():
+    model = HabitListModel([{"name": "A"}])
+    assert model.on_change("load", None, None, None) == -1
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import time
+
+import main
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("tkinter", "customtkinter", "matplotlib", "gui", "visualizer")
+
+def test_subcommands(tmp_path, capsys):
+    data = str(tmp_path / "habits.csv")
+    assert main.main(["--data", data, "add", "Run", "--target", "2"]) == 0
+    assert main.main(["--data", data, "mark", "run", "--date", "01-01-2024"]) == 0
+    assert "streak: 1 | progress: 50.0%" in capsys.readouterr().out
+    assert main.main(["--data", data, "summary"]) == 0
+    assert "Всего привычек: 1" in capsys.readouterr().out
+    assert main.main(["--data", data, "attention", "--days", "1"]) == 0
+    assert capsys.readouterr().out.strip() == "Run"
+    assert main.main(["--data", data, "attention", "--top", "1"]) == 0
+    assert capsys.readouterr().out.startswith("Run | ")
+    assert main.main(["--data", data, "search", "ru", "--overdue", "1"]) == 0
+    assert capsys.readouterr().out.splitlines() == ["- Run [Общее] | streak: 1 | progress: 50.0%",
+                                                    "Найдено: 1"]
+    assert main.main(["--data", data, "search", "un", "--prefix"]) == 0
+    assert capsys.readouterr().out.strip() == "Найдено: 0"
+    assert main.main(["--data", data, "mark", "Nope"]) == 1
+    assert main.main(["--data", data, "mark", "Run", "--date", "2024"]) == 1
+
+def test_nogui_never_imports_gui_stack(tmp_path):
+    code = ("import sys, main; main.main(['--nogui', '--data', sys.argv[1]]);"
+            "main.main(['--data', sys.argv[1], 'summary']);"
+            f"print(sorted(m for m in sys.modules if m.split('.')[0] in {HEAVY!r}))")
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code, str(tmp_path / "habits.csv")],
+                         cwd=APP_DIR, capture_output=True, text=True, check=True).stdout
+    elapsed = time.perf_counter() - start
+    assert out.strip().splitlines()[-1] == "[]"
+    # интерпретатор + CLI без GUI; с tkinter/matplotlib выходит заметно дольше
+    assert elapsed < 2.0
+
+def test_streaming_summary_json(tmp_path, capsys):
+    import json
+    from habit_manager import HabitManager
+    data = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=data, journal=True)
+    mgr.add_habits([{"name": f"H{i}", "target": 2} for i in range(5)])
+    mgr.compact()
+    mgr.mark_done("H1", "01-01-2024")
+    mgr.remove_habit("H3")
+    mgr.add_habit("Late", target=1)
+    assert main.main(["--data", data, "--nogui", "--stream", "--json", "--chunk-size", "2"]) == 0
+    lines = [json.loads(l) for l in capsys.readouterr().out.splitlines()]
+    assert [l["name"] for l in lines[:-1]] == ["H0", "H1", "H2", "H4", "Late"]
+    assert lines[1]["streak"] == 1 and lines[1]["progress"] == 50.0
+    assert lines[-1] == {"type": "summary", "total": 5, "avg_streak": 0.2,
+                         "problems": 4, "attention": 5}
+
+def test_subcommands_close_manager(tmp_path, monkeypatch, capsys):
+    from habit_manager import HabitManager
+    closed = []
+    close = HabitManager.close
+    monkeypatch.setattr(HabitManager, "close", lambda self: (closed.append(1), close(self)))
+    data = str(tmp_path / "habits.csv")
+    assert main.main(["--data", data, "add", "Run"]) == 0
+    assert main.main(["--data", data, "mark", "Nope"]) == 1
+    assert main.main(["--data", data, "summary"]) == 0
+    assert main.main(["--data", data, "--nogui"]) == 0
+    assert len(closed) == 4
@@ -1,34 +1,304 @@
-# tests/test_manager.py
-import tempfile
-import os
-import csv
-from habit_manager import HabitManager, HabitError
-
-def make_temp_manager(tmp_path):
-    f = tmp_path / "habits.csv"
-    return HabitManager(file_path=str(f))
-
-def test_add_and_find(tmp_path):
-    mgr = make_temp_manager(tmp_path)
-    mgr.add_habit("TestHabit", category="Test", target=5)
-    found = mgr.find_habit("TestHabit")
-    assert found["name"] == "TestHabit"
-    assert found["category"] == "Test"
-
-def test_remove(tmp_path):
-    mgr = make_temp_manager(tmp_path)
-    mgr.add_habit("ToRemove", category="X", target=3)
-    mgr.remove_habit("ToRemove")
-    try:
-        mgr.find_habit("ToRemove")
-        assert False, "Should have raised HabitError"
-    except HabitError:
-        assert True
-
-def test_mark_done_progress(tmp_path):
-    mgr = make_temp_manager(tmp_path)
-    mgr.add_habit("P", category="C", target=2)
-    mgr.mark_done("P")
-    h = mgr.find_habit("P")
-    assert h["streak"] in ("1", "1.0") or int(float(h["streak"])) >= 1
-    assert "%" in h["progress"]
+# tests/test_manager.py
+import tempfile
+import os
+import csv
+from habit_manager import HabitManager, HabitError
+
+def make_temp_manager(tmp_path):
+    f = tmp_path / "habits.csv"
+    return HabitManager(file_path=str(f))
+
+def test_add_and_find(tmp_path):
+    mgr = make_temp_manager(tmp_path)
+    mgr.add_habit("TestHabit", category="Test", target=5)
+    found = mgr.find_habit("TestHabit")
+    assert found["name"] == "TestHabit"
+    assert found["category"] == "Test"
+
+def test_remove(tmp_path):
+    mgr = make_temp_manager(tmp_path)
+    mgr.add_habit("ToRemove", category="X", target=3)
+    mgr.remove_habit("ToRemove")
+    try:
+        mgr.find_habit("ToRemove")
+        assert False, "Should have raised HabitError"
+    except HabitError:
+        assert True
+
+def test_mark_done_progress(tmp_path):
+    mgr = make_temp_manager(tmp_path)
+    mgr.add_habit("P", category="C", target=2)
+    mgr.mark_done("P")
+    h = mgr.find_habit("P")
+    assert h["streak"] in ("1", "1.0") or int(float(h["streak"])) >= 1
+    assert "%" in h["progress"]
+
+def test_index_case_insensitive(tmp_path):
+    mgr = make_temp_manager(tmp_path)
+    mgr.add_habit("Read Book", category="C", target=3)
+    mgr.add_habit("Run", category="C", target=3)
+    assert mgr.find_habit("  read book ")["name"] == "Read Book"
+    try:
+        mgr.add_habit("RUN", category="C")
+        assert False, "Should have raised HabitError"
+    except HabitError:
+        pass
+    mgr.remove_habit("run")
+    mgr.check_consistency()
+    assert [h["name"] for h in mgr.list_habits()] == ["Read Book"]
+
+def test_index_rebuilt_on_load(tmp_path):
+    mgr = make_temp_manager(tmp_path)
+    mgr.add_habit("A", category="C")
+    mgr.add_habit("B", category="C")
+    reloaded = make_temp_manager(tmp_path)
+    reloaded.check_consistency()
+    assert reloaded.find_habit("b")["name"] == "B"
+
+def test_journal_replay(tmp_path):
+    f = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=f, journal=True)
+    mgr.add_habit("A", category="C", target=2)
+    mgr.add_habit("B", category="C")
+    mgr.mark_done("A")
+    mgr.remove_habit("B")
+    with open(f, encoding="utf-8") as fh:
+        assert len(fh.readlines()) == 1  # снимок не переписывался
+    reloaded = HabitManager(file_path=f, journal=True)
+    assert [h["name"] for h in reloaded.list_habits()] == ["A"]
+    assert reloaded.find_habit("A")["streak"] == "1"
+
+def test_journal_torn_tail_and_compaction(tmp_path):
+    f = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=f, journal=True, compact_threshold=3)
+    mgr.add_habit("A", category="C")
+    mgr.add_habit("B", category="C")
+    with open(mgr.storage.journal_path, "a", encoding="utf-8") as fh:
+        fh.write('{"op": "put", "row": {"na')
+    reloaded = HabitManager(file_path=f, journal=True, compact_threshold=3)
+    assert len(reloaded.list_habits()) == 2
+    reloaded.add_habit("X", category="C")
+    assert "X" in [h["name"] for h in HabitManager(file_path=f, journal=True).list_habits()]
+    reloaded.remove_habit("X")
+    reloaded.compact()
+    reloaded.add_habit("C", category="C")
+    reloaded.add_habit("D", category="C")
+    reloaded.add_habit("E", category="C")
+    assert os.path.getsize(reloaded.storage.journal_path) == 0
+    assert len(HabitManager(file_path=f).list_habits()) == 5
+
+def test_batch_single_flush(tmp_path, monkeypatch):
+    mgr = make_temp_manager(tmp_path)
+    saves = []
+    monkeypatch.setattr(mgr.storage, "write", lambda ops, index: saves.append(1))
+    mgr.add_habits([{"name": "A", "category": "C", "target": 2}, {"name": "B"}])
+    mgr.mark_done_many([("A", "01-01-2024"), ("A", "02-01-2024"), ("B", "")])
+    assert len(saves) == 2
+    assert mgr.find_habit("A")["streak"] == "2"
+    assert mgr.find_habit("A")["progress"] == "100.0%"
+
+def test_batch_validates_up_front(tmp_path):
+    mgr = make_temp_manager(tmp_path)
+    mgr.add_habit("A", category="C")
+    for bad in ([("A", "01-01-2024"), ("Missing", "")], [("A", "2024/01/01")]):
+        try:
+            mgr.mark_done_many(bad)
+            assert False, "Should have raised HabitError"
+        except HabitError:
+            pass
+    assert mgr.find_habit("A")["last_done"] == ""
+    try:
+        mgr.add_habits([{"name": "B"}, {"name": "b"}])
+        assert False, "Should have raised HabitError"
+    except HabitError:
+        pass
+    for items, message in (([{"name": "B"}, {"name": "C", "colour": "red"}], "'C': colour"),
+                           ([{"name": "B", "target": "ten"}], "'B': 'ten'"),
+                           ([{"name": "B", "target": 0}], "'B': 0"),
+                           ([{"name": "B"}, "C"], "Запись 2")):
+        try:
+            mgr.add_habits(items)
+            assert False, "Should have raised HabitError"
+        except HabitError as exc:
+            assert message in str(exc)
+    assert len(mgr.list_habits()) == 1
+
+def test_batch_rollback(tmp_path):
+    mgr = make_temp_manager(tmp_path)
+    mgr.add_habit("A", category="C")
+    try:
+        with mgr.batch():
+            mgr.mark_done("A", "01-01-2024")
+            mgr.add_habit("B", category="C")
+            mgr.remove_habit("A")
+            mgr.remove_habit("A")
+    except HabitError:
+        pass
+    assert [h["name"] for h in mgr.list_habits()] == ["A"]
+    assert mgr.find_habit("A")["streak"] == "0"
+    mgr.check_consistency()
+    assert [h["name"] for h in make_temp_manager(tmp_path).list_habits()] == ["A"]
+
+def test_batch_journal(tmp_path):
+    f = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=f, journal=True)
+    with mgr.batch():
+        mgr.add_habit("A", category="C")
+        mgr.mark_done("A", "01-01-2024")
+    reloaded = HabitManager(file_path=f, journal=True)
+    assert reloaded.find_habit("A")["last_done"] == "01-01-2024"
+
+def test_backdated_mark_fills_gap(tmp_path):
+    mgr = make_temp_manager(tmp_path)
+    mgr.add_habit("H", category="C", target=4)
+    mgr.mark_done("H", "01-01-2024")
+    mgr.mark_done("H", "03-01-2024")
+    assert mgr.find_habit("H")["streak"] == "1"
+    mgr.mark_done("H", "02-01-2024")
+    h = mgr.find_habit("H")
+    assert (h["streak"], h["last_done"], h["progress"]) == ("3", "03-01-2024", "75.0%")
+    mgr.unmark_done("H", "03-01-2024")
+    assert mgr.find_habit("H")["last_done"] == "02-01-2024"
+    assert mgr.completion_rate("H", "01-01-2024", "04-01-2024") == 50.0
+    reloaded = make_temp_manager(tmp_path)
+    assert reloaded.find_habit("H")["streak"] == "2"
+    assert reloaded.completion_rate("H", "01-01-2024", "04-01-2024") == 50.0
+
+def test_history_seeded_from_legacy_rows(tmp_path):
+    f = tmp_path / "habits.csv"
+    f.write_text("name,category,frequency,start_date,last_done,streak,target,progress\n"
+                 "Old,C,daily,01-01-2024,10-01-2024,3,10,30.0%\n", encoding="utf-8")
+    mgr = HabitManager(file_path=str(f))
+    mgr.mark_done("Old", "11-01-2024")
+    assert mgr.find_habit("Old")["streak"] == "4"
+    assert mgr.completion_rate("Old", "01-01-2024", "11-01-2024") == 4 / 11 * 100
+
+def test_overdue_index_matches_needs_attention(tmp_path):
+    import random
+    from datetime import date
+    from notifications import needs_attention
+    mgr = make_temp_manager(tmp_path)
+    rng = random.Random(7)
+    today = date.today().toordinal()
+    for i in range(30):
+        mgr.add_habit(f"H{i}", target=5)
+    assert mgr.overdue(1) == needs_attention(mgr.list_habits(), 1)
+    for step in range(200):
+        name = f"H{rng.randrange(40)}"
+        day = date.fromordinal(today - rng.randrange(10)).strftime("%d-%m-%Y")
+        try:
+            if step % 7 == 0:
+                mgr.remove_habit(name)
+            elif step % 11 == 0:
+                mgr.add_habit(name)
+            elif step % 5 == 0:
+                mgr.unmark_done(name, day)
+            else:
+                mgr.mark_done(name, day)
+        except HabitError:
+            pass
+        for days in (0, 1, 3, 7):
+            assert mgr.overdue(days) == needs_attention(mgr.list_habits(), days)
+    assert mgr.overdue_many([1, 3]) == {d: needs_attention(mgr.list_habits(), d) for d in (1, 3)}
+    top = mgr.most_overdue(3)
+    ranked = sorted(mgr.list_habits(), key=lambda h: h.last)
+    assert [name for name, _ in top] == [h.name for h in ranked[:3]]
+
+def test_overdue_index_rebuilt_after_rollback(tmp_path):
+    mgr = make_temp_manager(tmp_path)
+    mgr.add_habit("A")
+    assert mgr.overdue(1) == ["A"]
+    try:
+        with mgr.batch():
+            mgr.remove_habit("A")
+            mgr.remove_habit("Missing")
+    except HabitError:
+        pass
+    assert mgr.overdue(1) == ["A"]
+    assert mgr.most_overdue(5) == [("A", None)]
+
+def test_search_filters_match_linear_scan(tmp_path):
+    import random
+    from datetime import date
+    from search_index import fold
+    mgr = make_temp_manager(tmp_path)
+    rng = random.Random(3)
+    today = date.today().toordinal()
+    words = ["Утренний бег", "Чтение", "Ёлка", "бег трусцой", "Медитация"]
+    for i in range(40):
+        mgr.add_habit(f"{words[i % len(words)]} {i}", category=["Спорт", "Здоровье"][i % 2], target=4)
+    for step in range(150):
+        name = f"{words[rng.randrange(len(words))]} {rng.randrange(50)}"
+        day = date.fromordinal(today - rng.randrange(8)).strftime("%d-%m-%Y")
+        try:
+            if step % 9 == 0:
+                mgr.remove_habit(name)
+            elif step % 13 == 0:
+                mgr.add_habit(name, category="Работа")
+            else:
+                mgr.mark_done(name, day)
+        except HabitError:
+            pass
+        habits = mgr.list_habits()
+        for query in ("бег", "БЕГ 1", "елка", "ация 3", "zzz"):
+            expected = [h.name for h in habits if fold(query) in fold(h.name)]
+            assert [h.name for h in mgr.search(query)] == expected
+        expected = sorted(h.name for h in habits
+                          if any(w.startswith("бег") for w in fold(h.name).split()))
+        assert sorted(h.name for h in mgr.search("Бег", prefix_only=True)) == expected
+        expected = [h.name for h in habits if h.category == "Спорт" and h.progress >= 25
+                    and (not h.last or today - h.last >= 2)]
+        assert [h.name for h in mgr.search(category="спорт", overdue_days=2,
+                                           min_progress=25)] == expected
+    assert len(mgr.search(limit=3)) == 3
+    assert mgr.search(category="Нет такой") == []
+
+def test_search_index_built_in_thread(tmp_path):
+    import threading
+    mgr = make_temp_manager(tmp_path)
+    mgr.add_habits([{"name": "Бег"}, {"name": "Чтение"}])
+    thread = threading.Thread(target=mgr.search_index_builder())
+    thread.start()
+    thread.join()
+    prebuilt = mgr._prebuilt[1]
+    assert [h.name for h in mgr.search("бе", prefix_only=True)] == ["Бег"]
+    assert mgr._search is prebuilt
+    # записи изменились после снимка: готовый индекс устарел и не используется
+    other = make_temp_manager(tmp_path)
+    build = other.search_index_builder()
+    other.add_habit("Бокс")
+    build()
+    assert [h.name for h in other.search("б", prefix_only=True)] == ["Бег", "Бокс"]
+
+def test_second_manager_merges_instead_of_overwriting(tmp_path):
+    path = str(tmp_path / "habits.csv")
+    m1 = HabitManager(file_path=path)
+    m2 = HabitManager(file_path=path)
+    m1.add_habit("A")
+    # внутри batch() refresh не выполняется — запись идёт по устаревшему
+    # состоянию и должна наложиться на свежий файл
+    with m2.batch():
+        m2.add_habit("B")
+    assert [h.name for h in HabitManager(file_path=path).list_habits()] == ["A", "B"]
+    events = []
+    m1.subscribe(lambda event, *rest: events.append(event))
+    assert [h.name for h in m1.list_habits()] == ["A", "B"]
+    assert events == ["load"]
+    assert m1.refresh() is False
+    m1.mark_done("A", "01-01-2024")
+    assert m2.find_habit("A").streak == 1
+    assert m2.refresh() is False
+
+def test_concurrent_processes_keep_all_writes(tmp_path):
+    import subprocess
+    import sys
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = str(tmp_path / "habits.csv")
+    HabitManager(file_path=path)
+    code = ("import sys; from habit_manager import HabitManager\n"
+            "m = HabitManager(file_path=sys.argv[1])\n"
+            "for i in range(20): m.add_habit(f'P{sys.argv[2]}_{i}')\n")
+    procs = [subprocess.Popen([sys.executable, "-c", code, path, str(p)], cwd=app_dir)
+             for p in range(4)]
+    assert all(p.wait() == 0 for p in procs)
+    assert len(HabitManager(file_path=path).list_habits()) == 80
@@ -0,0 +1,33 @@
+from habit_record import Habit, date_to_ordinal, ordinal_to_date, streak_of, progress_of
+from analytics import average_streak, top_problem_habits
+
+def test_row_roundtrip():
+    row = {"name": "Run", "category": "Sport", "frequency": "daily",
+           "start_date": "01-01-2024", "last_done": "05-01-2024",
+           "streak": "3", "target": "10", "progress": "30.0%"}
+    h = Habit.from_row(row)
+    assert h.streak == 3 and h.target == 10 and h.progress == 30.0
+    assert h.last - h.start == 4
+    assert h.to_row() == row
+    assert dict(h) == row
+
+def test_dict_view():
+    h = Habit("A")
+    assert h["name"] == "A"
+    assert h.get("last_done", "") == ""
+    assert h.get("missing", "x") == "x"
+    assert h["progress"] == "0.0%"
+
+def test_bad_values_parse_to_defaults():
+    h = Habit.from_row({"name": "A", "streak": "x", "progress": "?", "last_done": "2024"})
+    assert (h.streak, h.progress, h.last) == (0, 0.0, 0)
+
+def test_ordinals():
+    assert ordinal_to_date(date_to_ordinal("29-02-2024")) == "29-02-2024"
+    assert date_to_ordinal("") == 0 and ordinal_to_date(0) == ""
+
+def test_analytics_accepts_records():
+    habits = [Habit("A", streak=2, progress=10.0), Habit("B", streak=4, progress=80.0)]
+    assert average_streak(habits) == 3
+    assert top_problem_habits(habits) == ["A"]
+    assert streak_of({"streak": "5"}) == 5 and progress_of({"progress": "5%"}) == 5.0
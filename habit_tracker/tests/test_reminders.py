@@ -0,0 +1,110 @@
+import asyncio
+import io
+from datetime import date
+
+from habit_manager import HabitManager
+from reminders import (DAY_SECONDS, POLL_SECONDS, ConsoleSink, FakeClock, FileSink,
+                       ReminderScheduler, day_to_timestamp, frequency_days)
+
+def test_frequency_days():
+    assert frequency_days("daily") == 1
+    assert frequency_days("weekly") == 7
+    assert frequency_days("every 3 days") == 3
+    assert frequency_days("2d") == 2
+    assert frequency_days("whenever") == 1
+
+def test_scheduler_fires_and_reschedules(tmp_path):
+    mgr = HabitManager(file_path=str(tmp_path / "habits.csv"))
+    mgr.add_habits([{"name": "Run", "frequency": "daily"},
+                    {"name": "Swim", "frequency": "weekly"}])
+    mgr.mark_done_many([("Run", "01-01-2024"), ("Swim", "01-01-2024")])
+    day = date(2024, 1, 1).toordinal()
+    clock = FakeClock(day_to_timestamp(day, 0))
+    got = []
+    out = io.StringIO()
+    scheduler = ReminderScheduler(mgr, [got.append, ConsoleSink(out),
+                                        FileSink(str(tmp_path / "log.txt"))], clock=clock)
+
+    async def scenario():
+        task = asyncio.create_task(scheduler.run())
+        await clock.advance(0)
+        assert got == []
+        await clock.advance(DAY_SECONDS + 9 * 3600)
+        assert [r.name for r in got] == ["Run"]
+        # отметка переносит напоминание на день после новой даты
+        mgr.mark_done("Run", "02-01-2024")
+        await clock.advance(0)
+        await clock.advance(DAY_SECONDS)
+        assert [r.name for r in got] == ["Run", "Run"]
+        mgr.remove_habit("Run")
+        await clock.advance(6 * DAY_SECONDS)
+        assert [r.name for r in got] == ["Run", "Run", "Swim"]
+        scheduler.stop()
+        await task
+
+    asyncio.run(scenario())
+    assert scheduler.fired == 3
+    assert "Swim" in out.getvalue()
+    assert len((tmp_path / "log.txt").read_text(encoding="utf-8").splitlines()) == 3
+
+def test_many_habits_fire_in_due_order(tmp_path):
+    mgr = HabitManager(file_path=str(tmp_path / "habits.csv"))
+    mgr.add_habits([{"name": f"H{i}", "frequency": f"{i % 5 + 1}d"} for i in range(50)])
+    mgr.mark_done_many([(f"H{i}", "01-01-2024") for i in range(50)])
+    clock = FakeClock(day_to_timestamp(date(2024, 1, 1).toordinal(), 12))
+    scheduler = ReminderScheduler(mgr, clock=clock)
+    asyncio.run(clock.advance(3 * DAY_SECONDS))
+    fired = scheduler.fire_due()
+    assert len(fired) == 30
+    assert [r.due for r in fired] == sorted(r.due for r in fired)
+    assert scheduler.fire_due() == []
+
+def test_mark_from_other_manager_cancels_reminder(tmp_path):
+    path = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=path)
+    mgr.add_habit("Run", frequency="daily")
+    mgr.mark_done("Run", "01-01-2024")
+    clock = FakeClock(day_to_timestamp(date(2024, 1, 1).toordinal(), 0))
+    got = []
+    scheduler = ReminderScheduler(mgr, [got.append], clock=clock)
+
+    async def scenario():
+        task = asyncio.create_task(scheduler.run())
+        await clock.advance(0)
+        # отметка из другого процесса (CLI) до времени напоминания
+        other = HabitManager(file_path=path)
+        other.mark_done("Run", "02-01-2024")
+        other.close()
+        await clock.advance(DAY_SECONDS + 10 * 3600)
+        assert got == []
+        await clock.advance(DAY_SECONDS)
+        assert [r.name for r in got] == ["Run"]
+        scheduler.stop()
+        await task
+
+    asyncio.run(scenario())
+
+def test_empty_schedule_polls_for_other_processes(tmp_path):
+    from date_codec import today
+    path = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=path)
+    clock = FakeClock(day_to_timestamp(today(), 0))
+    got = []
+    scheduler = ReminderScheduler(mgr, [got.append], clock=clock)
+
+    async def scenario():
+        task = asyncio.create_task(scheduler.run())
+        await clock.advance(0)
+        assert scheduler.next_due() is None
+        # привычку добавляет другой процесс, пока расписание пусто
+        other = HabitManager(file_path=path)
+        other.add_habit("Run")
+        other.close()
+        await clock.advance(POLL_SECONDS)
+        assert scheduler.next_due() == day_to_timestamp(today())
+        await clock.advance(9 * 3600)
+        assert [r.name for r in got] == ["Run"]
+        scheduler.stop()
+        await task
+
+    asyncio.run(scenario())
@@ -0,0 +1,64 @@
+import threading
+import time
+import pytest
+
+pytest.importorskip("matplotlib")
+
+from render_pipeline import RenderPipeline
+from visualizer import plot_progress_single, plot_category_counts
+from habit_record import Habit
+
+def wait_for(pipeline, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if pipeline.poll():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_renders_off_thread_and_caches():
+    delivered = []
+    pipeline = RenderPipeline(lambda buf: delivered.append((threading.current_thread(), buf)))
+    habit = Habit("Run", progress=40.0)
+    pipeline.request(("single", "Run", 40.0), lambda: plot_progress_single(habit))
+    assert wait_for(pipeline)
+    thread, buf = delivered[-1]
+    assert thread is threading.main_thread()
+    assert buf.shape == (300, 500, 4)
+    pipeline.request(("single", "Run", 40.0), lambda: pytest.fail("should be cached"))
+    assert wait_for(pipeline)
+    assert pipeline.cache_hits == 1 and pipeline.rendered == 1
+    pipeline.shutdown()
+
+def test_rapid_requests_coalesce():
+    delivered = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return plot_category_counts({"A": 1})
+
+    pipeline = RenderPipeline(delivered.append, workers=1)
+    pipeline.request("slow", slow)
+    started.wait(5)
+    for i in range(20):
+        pipeline.request(("n", i), lambda i=i: plot_category_counts({"A": 1, "B": i + 1}))
+    release.set()
+    assert wait_for(pipeline)
+    while pipeline._running:
+        time.sleep(0.01)
+    pipeline.poll()
+    # рендер занятого задания + только последний из 20 запросов
+    assert pipeline.rendered == 2
+    assert len(delivered) <= 2
+    pipeline.shutdown()
+
+def test_errors_are_delivered():
+    errors = []
+    pipeline = RenderPipeline(lambda buf: None, on_error=errors.append)
+    pipeline.request("bad", lambda: 1 / 0)
+    assert wait_for(pipeline)
+    assert isinstance(errors[0], ZeroDivisionError)
+    pipeline.shutdown()
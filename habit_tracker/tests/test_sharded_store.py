@@ -0,0 +1,41 @@
+import os
+import pytest
+
+from analytics import SummaryAccumulator, fleet_summary
+from habit_manager import HabitError, HabitManager
+from sharded_store import ShardedStore, shard_of
+
+def fill(store, users=12):
+    for u in range(users):
+        user = f"user{u}"
+        for i in range(u % 4 + 1):
+            store.add_habit(user, f"H{i}", target=2)
+        store.mark_done(user, "H0", "01-01-2024")
+
+def test_routing_and_handle_cache(tmp_path):
+    root = str(tmp_path / "fleet")
+    store = ShardedStore(root, shards=4, max_open=3)
+    fill(store)
+    assert store.stats()["open"] == 3
+    assert store.evictions > 0
+    assert store.find_habit("USER5", "h0").streak == 1
+    path = store.path_of("user5")
+    assert os.path.basename(os.path.dirname(path)) == f"shard_{shard_of('user5', 4):03d}"
+    assert sorted(store.users()) == sorted(f"user{u}" for u in range(12))
+    with pytest.raises(HabitError):
+        store.manager("../etc")
+    store.close()
+    # параметры шардирования берутся из shards.json, а не из аргументов
+    reopened = ShardedStore(root, shards=99)
+    assert reopened.shards == 4
+    assert len(reopened.list_habits("user7")) == 4
+
+def test_fleet_summary_matches_single_pass(tmp_path):
+    store = ShardedStore(str(tmp_path / "fleet"), shards=4)
+    fill(store)
+    expected = SummaryAccumulator()
+    for user in store.users():
+        expected.add_chunk(HabitManager(file_path=store.path_of(user)).list_habits())
+    result = fleet_summary(store, workers=2)
+    assert result == dict(expected.result(), users=12)
+    assert fleet_summary(store, workers=0) == result
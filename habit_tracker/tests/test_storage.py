@@ -0,0 +1,189 @@
+import os
+
+from habit_manager import HabitManager, HabitError, migrate_to_sqlite
+
+def test_sqlite_roundtrip_and_order(tmp_path):
+    db = str(tmp_path / "habits.db")
+    mgr = HabitManager(file_path=db)
+    mgr.add_habits([{"name": "B", "category": "X"}, {"name": "A", "category": "Y", "target": 2}])
+    mgr.mark_done("a", "01-01-2024")
+    mgr.mark_done("A", "02-01-2024")
+    mgr.close()
+    reopened = HabitManager(file_path=db)
+    assert [h["name"] for h in reopened.list_habits()] == ["B", "A"]
+    assert reopened.find_habit("A")["progress"] == "100.0%"
+    assert reopened.completion_rate("A", "01-01-2024", "02-01-2024") == 100.0
+
+def test_sqlite_is_lazy(tmp_path):
+    db = str(tmp_path / "habits.db")
+    mgr = HabitManager(file_path=db)
+    mgr.add_habits({"name": f"H{i}", "category": "C"} for i in range(50))
+    mgr.close()
+    lazy = HabitManager(file_path=db)
+    lazy.mark_done("H7", "01-01-2024")
+    assert len(lazy._index) == 1
+    lazy.remove_habit("H8")
+    try:
+        lazy.add_habit("h9", category="C")
+        assert False, "Should have raised HabitError"
+    except HabitError:
+        pass
+    assert len(lazy.list_habits()) == 49
+    lazy.check_consistency()
+
+def test_sqlite_batch_rollback(tmp_path):
+    mgr = HabitManager(file_path=str(tmp_path / "habits.db"))
+    mgr.add_habit("A", category="C")
+    try:
+        with mgr.batch():
+            mgr.remove_habit("A")
+            mgr.add_habit("B", category="C")
+            mgr.find_habit("A")
+    except HabitError:
+        pass
+    assert [h["name"] for h in mgr.list_habits()] == ["A"]
+
+def test_sqlite_schema_indexes(tmp_path):
+    mgr = HabitManager(file_path=str(tmp_path / "habits.db"))
+    conn = mgr.storage.conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    names = {r[1] for r in conn.execute("PRAGMA index_list(habits)")}
+    assert {"habits_category", "habits_last_day"} <= names
+
+def test_migrate_csv(tmp_path):
+    csv_path = str(tmp_path / "habits.csv")
+    src = HabitManager(file_path=csv_path)
+    src.add_habit("Read", category="C", target=4)
+    src.mark_done_many([("Read", "01-01-2024"), ("Read", "02-01-2024")])
+    assert migrate_to_sqlite(csv_path, str(tmp_path / "habits.db")) == 1
+    dst = HabitManager(file_path=str(tmp_path / "habits.db"))
+    h = dst.find_habit("read")
+    assert (h["streak"], h["last_done"], h["progress"]) == ("2", "02-01-2024", "50.0%")
+
+def test_iter_chunks_sqlite_and_csv(tmp_path):
+    for path in (tmp_path / "habits.db", tmp_path / "habits.csv"):
+        mgr = HabitManager(file_path=str(path))
+        mgr.add_habits({"name": f"H{i}"} for i in range(7))
+        chunks = list(mgr.storage.iter_chunks(3))
+        assert [len(c) for c in chunks] == [3, 3, 1]
+        assert [h.name for c in chunks for h in c] == [f"H{i}" for i in range(7)]
+        mgr.close()
+
+def test_csv_snapshot_is_lazy(tmp_path):
+    path = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=path)
+    mgr.add_habits([{"name": "B", "category": "X"}, {"name": "Ёлка", "target": 2}])
+    mgr.mark_done("ёлка", "01-01-2024")
+    mgr.close()
+    assert os.path.exists(path + ".snap")
+    lazy = HabitManager(file_path=path)
+    assert lazy.find_habit("ЁЛКА")["progress"] == "50.0%"
+    assert len(lazy._index) == 1
+    assert lazy.storage.get("nope") is None
+    lazy.add_habit("A", category="Y")
+    assert [h["name"] for h in lazy.list_habits()] == ["B", "Ёлка", "A"]
+    assert lazy.completion_rate("Ёлка", "01-01-2024", "02-01-2024") == 50.0
+    lazy.close()
+
+def test_stale_snapshot_falls_back_to_csv(tmp_path, monkeypatch):
+    import binary_snapshot
+    import storage
+    path = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=path)
+    mgr.add_habit("A")
+    mgr.close()
+    # CSV изменён в обход снимка: снимок устарел и пересобирается
+    other = HabitManager(storage=storage.CsvStorage(path))
+    other.add_habit("B")
+    assert HabitManager(file_path=path).find_habit("b") is not None
+    snap = binary_snapshot.Snapshot(path + ".snap")
+    assert snap.matches(*storage.CsvStorage(path).version()) and snap.count == 2
+    snap.close()
+    # битый снимок, который нельзя переписать: работаем по CSV
+    with open(path + ".snap", "wb") as f:
+        f.write(b"garbage")
+    def fail(*args):
+        raise OSError("read-only")
+    monkeypatch.setattr(storage, "write_snapshot", fail)
+    mgr = HabitManager(file_path=path)
+    assert [h["name"] for h in mgr.list_habits()] == ["A", "B"]
+    mgr.remove_habit("A")
+    assert [h.name for c in mgr.storage.iter_chunks() for h in c] == ["B"]
+    mgr.close()
+
+def test_streaming_reads_never_build_snapshot(tmp_path, monkeypatch, capsys):
+    import main
+    import storage
+    from bulk_io import export_habits
+    path = str(tmp_path / "habits.csv")
+    writer = HabitManager(storage=storage.CsvStorage(path))
+    writer.add_habits({"name": f"H{i}"} for i in range(5))
+    def no_load(self):
+        raise AssertionError("load_all при потоковом чтении")
+    monkeypatch.setattr(storage.CsvStorage, "load_all", no_load)
+    monkeypatch.setattr(storage.SnapshotStorage, "load_all", no_load)
+    main.run_cli_stream(path, json_lines=True, chunk_size=2)
+    assert len(capsys.readouterr().out.splitlines()) == 6
+    assert export_habits(storage.open_storage(path), str(tmp_path / "out.jsonl")) == 5
+    assert not os.path.exists(path + ".snap")
+
+def test_write_streams_csv_without_rewriting_snapshot(tmp_path):
+    import binary_snapshot
+    path = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=path)
+    mgr.add_habits({"name": f"H{i}"} for i in range(4))
+    mgr.compact()
+    built = os.stat(path + ".snap").st_mtime_ns
+    lazy = HabitManager(file_path=path)
+    lazy.remove_habit("H1")
+    lazy.mark_done("H2", "01-01-2024")
+    lazy.add_habit("H1")
+    assert os.stat(path + ".snap").st_mtime_ns == built
+    # процесс читает снимок со своими изменениями поверх
+    assert [h["name"] for h in lazy.list_habits()] == ["H0", "H2", "H3", "H1"]
+    assert lazy.find_habit("h2")["streak"] == "1"
+    lazy.close()
+    # устаревший снимок пересобирается при следующем холодном старте
+    assert HabitManager(file_path=path).find_habit("H2")["streak"] == "1"
+    snap = binary_snapshot.Snapshot(path + ".snap")
+    assert snap.count == 4 and snap.find("h1") is not None
+    snap.close()
+
+def test_snapshot_large_values_reload(tmp_path):
+    path = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=path)
+    mgr.add_habit("Big", target=3_000_000_000)
+    # вне int64: снимок не пишется, данные читаются из CSV
+    mgr.add_habit("Huge", target=10 ** 20)
+    mgr.compact()
+    mgr.close()
+    for _ in range(2):
+        lazy = HabitManager(file_path=path)
+        assert lazy.find_habit("big")["target"] == "3000000000"
+        assert [h["target"] for h in lazy.list_habits()] == ["3000000000", str(10 ** 20)]
+        lazy.close()
+
+def test_save_all_from_lazy_manager_keeps_rows(tmp_path):
+    import storage
+    path = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=path)
+    mgr.add_habits({"name": f"H{i}"} for i in range(3))
+    mgr.close()
+    lazy = HabitManager(file_path=path)
+    lazy.find_habit("H1")
+    lazy._save_habits()
+    lazy.close()
+    assert list(storage.CsvStorage(path).load_all()) == ["h0", "h1", "h2"]
+
+def test_duplicate_rows_keep_first_and_warn(tmp_path):
+    import pytest
+    import storage
+    path = tmp_path / "habits.csv"
+    path.write_text("name,category,target\nRun,A,5\nRead,B,5\nRUN,C,7\n", encoding="utf-8")
+    with pytest.warns(storage.DuplicateRowsWarning, match="'RUN'"):
+        assert storage.CsvStorage(str(path)).load_all()["run"].category == "A"
+    with pytest.warns(storage.DuplicateRowsWarning):
+        mgr = HabitManager(file_path=str(path))
+        assert [h["category"] for h in mgr.list_habits()] == ["A", "B"]
+    assert mgr.find_habit("run")["target"] == "5"
+    mgr.close()
@@ -0,0 +1,56 @@
+import os
+import pytest
+
+pytest.importorskip("matplotlib")
+
+from visualizer import export_charts
+from habit_record import Habit
+
+def make_habits():
+    return [Habit("Run", category="Спорт", progress=40.0),
+            Habit("Read / books", category="Учёба", progress=75.0)]
+
+def read_all(out):
+    return {name: open(os.path.join(out, name), "rb").read() for name in sorted(os.listdir(out))}
+
+def test_export_is_deterministic_and_cached(tmp_path):
+    cache = str(tmp_path / "cache")
+    first = export_charts(make_habits(), str(tmp_path / "a"), cache_dir=cache, workers=2)
+    assert first["rendered"] == 3 and first["cached"] == 0
+    second = export_charts(make_habits(), str(tmp_path / "b"), cache_dir=cache, workers=2)
+    assert second["rendered"] == 0 and second["cached"] == 3
+    a, b = read_all(str(tmp_path / "a")), read_all(str(tmp_path / "b"))
+    assert set(a) == {"categories.png", "progress_Run.png", "progress_Read___books.png"}
+    assert a == b
+    # рендер в другом каталоге кэша даёт те же байты
+    fresh = export_charts(make_habits(), str(tmp_path / "c"), cache_dir=str(tmp_path / "cache2"), workers=0)
+    assert fresh["rendered"] == 3
+    assert read_all(str(tmp_path / "c")) == a
+
+def test_changed_data_rerenders_only_affected(tmp_path):
+    cache = str(tmp_path / "cache")
+    export_charts(make_habits(), str(tmp_path / "a"), cache_dir=cache, workers=0)
+    habits = make_habits()
+    habits[0].progress = 50.0
+    report = export_charts(habits, str(tmp_path / "b"), cache_dir=cache, workers=0)
+    assert report["rendered"] == 1 and report["cached"] == 2
+
+def test_cache_is_bounded(tmp_path):
+    cache = str(tmp_path / "cache")
+    report = export_charts(make_habits(), str(tmp_path / "a"), cache_dir=cache, workers=0,
+                           max_cache_bytes=1)
+    assert report["evicted"] == 3
+    assert os.listdir(cache) == []
+    assert len(os.listdir(str(tmp_path / "a"))) == 3
+
+def test_colliding_names_and_category_order(tmp_path):
+    cache = str(tmp_path / "cache")
+    habits = [Habit("a b", category="X"), Habit("a_b", category="Y"), Habit("A?b", category="X")]
+    export_charts(habits, str(tmp_path / "a"), cache_dir=cache, workers=0)
+    a = read_all(str(tmp_path / "a"))
+    assert len(a) == 4 and "progress_a_b.png" in a
+    # те же счётчики категорий в другом порядке — тот же PNG из кэша
+    report = export_charts([habits[1], habits[0], habits[2]], str(tmp_path / "b"),
+                           cache_dir=cache, workers=0)
+    assert report["rendered"] == 0
+    assert read_all(str(tmp_path / "b"))["categories.png"] == a["categories.png"]
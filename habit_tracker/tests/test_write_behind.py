@@ -0,0 +1,96 @@
+import pytest
+
+from habit_manager import HabitManager, HabitError
+
+def _names(path):
+    return sorted(h.name for h in HabitManager(file_path=path).list_habits())
+
+def test_mutations_return_before_disk_and_flush_writes(tmp_path):
+    path = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=path, write_behind=60, write_behind_max_delay=60)
+    mgr.add_habit("Run")
+    mgr.mark_done("Run", "01-01-2024")
+    assert _names(path) == []
+    mgr.flush()
+    assert _names(path) == ["Run"]
+    assert HabitManager(file_path=path).find_habit("Run")["last_done"] == "01-01-2024"
+    mgr.close()
+
+def test_burst_is_coalesced(tmp_path):
+    path = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=path, write_behind=0.05)
+    for i in range(50):
+        mgr.add_habit(f"H{i}")
+        mgr.mark_done(f"H{i}", "01-01-2024")
+    mgr.flush()
+    stats = mgr.persistence_stats()
+    assert stats["ops_submitted"] == 100 and stats["writes"] < 10
+    mgr.close()
+    assert len(_names(path)) == 50
+
+def test_write_errors_are_counted_and_retried(tmp_path, monkeypatch):
+    path = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=path, write_behind=60)
+    original = mgr.storage.write
+    calls = []
+
+    def failing(ops, index):
+        calls.append(len(ops))
+        if len(calls) == 1:
+            raise OSError("диск переполнен")
+        original(ops, index)
+
+    monkeypatch.setattr(mgr.storage, "write", failing)
+    mgr.add_habit("Run")
+    with pytest.raises(HabitError):
+        mgr.flush()
+    stats = mgr.persistence_stats()
+    assert stats["errors"] == 1 and stats["pending"] == 1
+    mgr.flush()
+    assert mgr.persistence_stats()["pending"] == 0
+    assert _names(path) == ["Run"]
+    mgr.close()
+
+def test_external_change_is_merged(tmp_path):
+    path = str(tmp_path / "habits.csv")
+    mgr = HabitManager(file_path=path, write_behind=60)
+    other = HabitManager(file_path=path)
+    mgr.add_habit("Run")
+    other.add_habit("Swim")
+    mgr.flush()
+    assert _names(path) == ["Run", "Swim"]
+    assert sorted(h.name for h in mgr.list_habits()) == ["Run", "Swim"]
+    mgr.close()
+
+def test_lazy_reads_exclude_background_write(tmp_path):
+    import threading
+    path = str(tmp_path / "habits.csv")
+    seed = HabitManager(file_path=path)
+    seed.add_habits({"name": f"H{i}"} for i in range(3))
+    seed.close()
+    mgr = HabitManager(file_path=path, write_behind=0.01)
+    storage = mgr.storage
+    calls = []
+
+    def probe():
+        acquired = mgr._io_lock.acquire(blocking=False)
+        if acquired:
+            mgr._io_lock.release()
+        calls.append(acquired)
+
+    def guarded(read):
+        def wrapper(*args):
+            # другой поток (как WriteBehind) не должен получить блокировку, пока идёт чтение
+            thread = threading.Thread(target=probe)
+            thread.start()
+            thread.join()
+            return read(*args)
+        return wrapper
+    storage.get = guarded(storage.get)
+    storage.load_all = guarded(storage.load_all)
+    for i in range(20):
+        mgr.add_habit(f"N{i}")
+        assert mgr.find_habit("H1") is not None
+    assert len(mgr.list_habits()) == 23
+    mgr.close()
+    assert calls and not any(calls)
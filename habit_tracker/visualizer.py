@@ -1,60 +1,231 @@
-# visualizer.py
-"""
-Визуализация привычек с помощью matplotlib.
-Содержит функции для построения графиков, возвращающих объект Figure.
-"""
-
-import os
-from typing import List, Dict
-from datetime import datetime, timedelta
-
-import matplotlib
-# Не навязываем GUI backend — он выберется автоматически при встраивании
-from matplotlib.figure import Figure
-
-from habit_manager import HabitManager, DATE_FORMAT
-
-
-def plot_progress_single(habit: Dict[str, str]) -> Figure:
-    """
-    Возвращает matplotlib Figure с простым графиком прогресса в % (по streak/target).
-    Для упрощения используем текущий прогресс как точку.
-    """
-    fig = Figure(figsize=(5, 3), dpi=100)
-    ax = fig.add_subplot(111)
-    try:
-        progress = float(habit.get("progress", "0%").strip().strip("%"))
-    except Exception:
-        progress = 0.0
-    ax.bar([habit["name"]], [progress])
-    ax.set_ylim(0, 100)
-    ax.set_ylabel("Progress (%)")
-    ax.set_title(f"Progress: {habit['name']}")
-    return fig
-
-
-def plot_category_distribution(habits: List[Dict[str, str]]) -> Figure:
-    """Круговая диаграмма распределения привычек по категориям."""
-    fig = Figure(figsize=(5, 4), dpi=100)
-    ax = fig.add_subplot(111)
-    categories = {}
-    for h in habits:
-        cat = h.get("category", "Общее") or "Общее"
-        categories[cat] = categories.get(cat, 0) + 1
-    if not categories:
-        ax.text(0.5, 0.5, "Нет данных", ha="center")
-        return fig
-    labels = list(categories.keys())
-    sizes = list(categories.values())
-    ax.pie(sizes, labels=labels, autopct="%1.1f%%", startangle=90)
-    ax.set_title("Categories distribution")
-    return fig
-
-
-def save_figure(fig: Figure, filename: str) -> str:
-    """Сохраняет Figure в файл PNG и возвращает путь."""
-    out_dir = os.path.join(os.path.dirname(__file__), "data")
-    os.makedirs(out_dir, exist_ok=True)
-    out_path = os.path.join(out_dir, filename)
-    fig.savefig(out_path)
-    return out_path
+# visualizer.py
+"""
+Визуализация привычек с помощью matplotlib.
+Содержит функции для построения графиков, возвращающих объект Figure,
+и пакетный экспорт PNG с кэшем по содержимому (export_charts).
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable, List, Dict, Optional, Tuple
+from datetime import datetime, timedelta
+
+import matplotlib
+# Не навязываем GUI backend — он выберется автоматически при встраивании
+from matplotlib.figure import Figure
+
+from habit_manager import HabitManager
+from habit_record import progress_of
+from instrumentation import count, timed
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), "data", "chart_cache")
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+# меняется вместе с оформлением графиков, чтобы старый кэш не подходил
+CHART_STYLE_VERSION = 2
+
+
+@timed("visualizer.plot_progress_single")
+def plot_progress_single(habit: Dict[str, str]) -> Figure:
+    """
+    Возвращает matplotlib Figure с простым графиком прогресса в % (по streak/target).
+    Для упрощения используем текущий прогресс как точку.
+    """
+    fig = Figure(figsize=(5, 3), dpi=100)
+    ax = fig.add_subplot(111)
+    try:
+        progress = progress_of(habit)
+    except Exception:
+        progress = 0.0
+    ax.bar([habit["name"]], [progress])
+    ax.set_ylim(0, 100)
+    ax.set_ylabel("Progress (%)")
+    ax.set_title(f"Progress: {habit['name']}")
+    return fig
+
+
+def plot_category_distribution(habits: List[Dict[str, str]]) -> Figure:
+    """Круговая диаграмма распределения привычек по категориям."""
+    categories = {}
+    for h in habits:
+        cat = h.get("category", "Общее") or "Общее"
+        categories[cat] = categories.get(cat, 0) + 1
+    return plot_category_counts(categories)
+
+
+@timed("visualizer.plot_category_counts")
+def plot_category_counts(categories: Dict[str, int]) -> Figure:
+    """
+    Круговая диаграмма по готовым счётчикам категория -> число привычек.
+
+    Секторы идут по алфавиту категорий: картинка не зависит от порядка
+    словаря (на этом держится кэш export_charts).
+    """
+    fig = Figure(figsize=(5, 4), dpi=100)
+    ax = fig.add_subplot(111)
+    if not categories:
+        ax.text(0.5, 0.5, "Нет данных", ha="center")
+        return fig
+    labels = sorted(categories)
+    sizes = [categories[label] for label in labels]
+    ax.pie(sizes, labels=labels, autopct="%1.1f%%", startangle=90)
+    ax.set_title("Categories distribution")
+    return fig
+
+
+@timed("visualizer.save_figure")
+def save_figure(fig: Figure, filename: str) -> str:
+    """Сохраняет Figure в файл PNG и возвращает путь."""
+    out_dir = os.path.join(os.path.dirname(__file__), "data")
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, filename)
+    fig.savefig(out_path)
+    return out_path
+
+
+@timed("visualizer.figure_to_png")
+def figure_to_png(fig: Figure) -> bytes:
+    """PNG-байты фигуры без метаданных версии — одинаковые данные дают одинаковые байты."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", metadata={"Software": None})
+    return buf.getvalue()
+
+
+def _render_chart(job: Tuple[str, Any]) -> bytes:
+    """Рендер одного графика в PNG (выполняется в процессе пула)."""
+    kind, payload = job
+    if kind == "progress":
+        fig = plot_progress_single(payload)
+    else:
+        fig = plot_category_counts(payload)
+    return figure_to_png(fig)
+
+
+def _chart_key(kind: str, payload: Any) -> str:
+    """Хэш входных данных графика — адрес в кэше."""
+    raw = json.dumps([CHART_STYLE_VERSION, matplotlib.__version__, kind, payload],
+                     sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _safe_filename(name: str) -> str:
+    return re.sub(r"[^\w\-]", "_", name.strip()) or "_"
+
+
+def _unique_filename(name: str, used: set) -> str:
+    """
+    progress_<имя>.png, не совпадающее с уже выданными.
+
+    Разные имена могут дать одно безопасное ("a b" и "a_b"); повтор получает
+    короткий хэш исходного имени. Сравнение без учёта регистра — для
+    файловых систем Windows и macOS.
+    """
+    filename = f"progress_{_safe_filename(name)}.png"
+    if filename.casefold() in used:
+        digest = hashlib.sha256(name.encode("utf-8")).hexdigest()[:8]
+        filename = f"progress_{_safe_filename(name)}-{digest}.png"
+    used.add(filename.casefold())
+    return filename
+
+
+def _evict(cache_dir: str, max_bytes: int) -> int:
+    """Удаляет самые давно использованные файлы кэша сверх max_bytes; возвращает их число."""
+    entries = []
+    total = 0
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".png"):
+            st = entry.stat()
+            entries.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+    evicted = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
+        evicted += 1
+    return evicted
+
+
+@timed("visualizer.export_charts")
+def export_charts(habits: Iterable[Dict[str, str]], out_dir: str,
+                  cache_dir: str = DEFAULT_CACHE_DIR, workers: Optional[int] = None,
+                  max_cache_bytes: int = CACHE_MAX_BYTES) -> Dict[str, object]:
+    """
+    Экспортирует графики прогресса каждой привычки и диаграмму категорий.
+
+    Графики адресуются хэшем входных данных: если такой PNG уже есть в
+    cache_dir, он копируется без рендера. Новые графики рендерятся в пуле
+    процессов. Кэш вытесняет давно использованные файлы сверх max_cache_bytes
+    (время использования — mtime, обновляется при попадании).
+
+    Args:
+        habits: Привычки одного пользователя.
+        out_dir (str): Куда писать progress_<имя>.png и categories.png.
+        cache_dir (str): Каталог кэша.
+        workers (int): Размер пула процессов; 0 — рендер в текущем процессе.
+        max_cache_bytes (int): Предел размера кэша.
+
+    Returns:
+        dict: rendered, cached, evicted, seconds, charts_per_sec.
+    """
+    start = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    jobs: List[Tuple[str, Tuple[str, Any]]] = []
+    categories: Dict[str, int] = {}
+    used = {"categories.png"}
+    for h in habits:
+        try:
+            progress = progress_of(h)
+        except Exception:
+            progress = 0.0
+        jobs.append((_unique_filename(h["name"], used),
+                     ("progress", {"name": h["name"], "progress": f"{progress}%"})))
+        cat = h.get("category", "Общее") or "Общее"
+        categories[cat] = categories.get(cat, 0) + 1
+    jobs.append(("categories.png", ("categories", categories)))
+
+    missing: Dict[str, Tuple[str, Any]] = {}
+    targets = []
+    for filename, job in jobs:
+        key = _chart_key(*job)
+        targets.append((filename, key))
+        if not os.path.exists(os.path.join(cache_dir, key + ".png")):
+            missing.setdefault(key, job)
+    cached = len(jobs) - len(missing)
+    count("visualizer.export.cache_hit", cached)
+    count("visualizer.export.rendered", len(missing))
+
+    keys = list(missing)
+    pending = [missing[k] for k in keys]
+    if workers == 0 or len(pending) <= 1:
+        results = [_render_chart(job) for job in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_chart, pending, chunksize=8))
+    for key, png in zip(keys, results):
+        tmp = os.path.join(cache_dir, key + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(png)
+        os.replace(tmp, os.path.join(cache_dir, key + ".png"))
+
+    for filename, key in targets:
+        cache_path = os.path.join(cache_dir, key + ".png")
+        shutil.copyfile(cache_path, os.path.join(out_dir, filename))
+        os.utime(cache_path)
+    evicted = _evict(cache_dir, max_cache_bytes)
+
+    seconds = time.perf_counter() - start
+    return {
+        "rendered": len(keys),
+        "cached": cached,
+        "evicted": evicted,
+        "seconds": seconds,
+        "charts_per_sec": len(jobs) / seconds if seconds > 0 else float("inf"),
+    }
@@ -0,0 +1,246 @@
+# write_behind.py
+"""
+Отложенная запись (write-behind) для HabitManager.
+
+Мутации менеджера сразу меняют данные в памяти, а операции хранилища
+копятся в WriteBehind. Фоновый поток ждёт, пока поток мутаций утихнет на
+``window`` секунд (но не дольше ``max_delay`` от первой операции), и
+записывает всё накопленное одним вызовом. Несколько операций над одной
+записью схлопываются в последнюю. Сама запись в CSV идёт через временный
+файл, fsync и os.replace (storage.write_csv_atomic).
+
+flush() записывает накопленное немедленно и ждёт результата, close()
+делает то же и останавливает поток. Владельцы очередей, отмеченные
+close_at_exit, закрываются при выходе интерпретатора. Ошибки записи не
+теряют операции: они остаются в очереди и повторяются через retry_delay,
+а счётчики доступны через stats() и instrumentation ("write_behind.*").
+"""
+
+import atexit
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional
+
+from instrumentation import count, timer
+from storage import Op
+
+DEFAULT_WINDOW = 0.5
+DEFAULT_MAX_DELAY = 2.0
+RETRY_DELAY = 1.0
+
+# write(ops) -> True, если записано; False — отложить до следующего submit/flush
+Writer = Callable[[List[Op]], bool]
+
+
+class WriteBehind:
+    """
+    Очередь отложенной записи с фоновым потоком.
+
+    Args:
+        write (Writer): Вызывается в фоновом потоке с пачкой операций.
+            Исключение считается ошибкой записи (операции повторяются),
+            False — запись отложена вызывающей стороной (например, файл
+            изменён другим процессом и нужно слияние в основном потоке).
+        window (float): Пауза без новых операций, после которой пишем.
+        max_delay (float): Максимальная задержка записи от первой операции.
+        retry_delay (float): Пауза перед повтором после ошибки записи.
+    """
+
+    def __init__(self, write: Writer, window: float = DEFAULT_WINDOW,
+                 max_delay: float = DEFAULT_MAX_DELAY, retry_delay: float = RETRY_DELAY):
+        self._write = write
+        self.window = window
+        self.max_delay = max(max_delay, window)
+        self.retry_delay = retry_delay
+        self._cond = threading.Condition()
+        self._pending: Dict[str, Op] = {}
+        self._inflight: Dict[str, Op] = {}
+        self._first = 0.0
+        self._last = 0.0
+        self._flush_requested = False
+        self._postponed = False
+        self._writing = False
+        self._closed = False
+        self._generation = 0
+        self._last_attempt = 0.0
+        self._flush_at = 0.0
+        self.writes = 0
+        self.ops_submitted = 0
+        self.ops_written = 0
+        self.errors = 0
+        self.last_error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="habit-write-behind", daemon=True)
+        self._thread.start()
+
+    def submit(self, ops: List[Op]) -> None:
+        """Добавляет операции в очередь (последняя операция над ключом побеждает)."""
+        if not ops:
+            return
+        with self._cond:
+            now = time.monotonic()
+            if not self._pending:
+                self._first = now
+            self._last = now
+            for op in ops:
+                # удаляем и вставляем заново, чтобы порядок был порядком последних операций
+                self._pending.pop(op[1], None)
+                self._pending[op[1]] = op
+            self.ops_submitted += len(ops)
+            self._postponed = False
+            self._cond.notify()
+
+    def pending(self) -> int:
+        """Сколько операций ещё не записано."""
+        with self._cond:
+            return len(self._pending)
+
+    def unwritten(self) -> Dict[str, Op]:
+        """Ещё не записанные операции по ключу, включая записываемые сейчас."""
+        with self._cond:
+            ops = dict(self._inflight)
+            ops.update(self._pending)
+            return ops
+
+    def resume(self) -> None:
+        """Снимает отсрочку (после того как вызывающая сторона устранила её причину)."""
+        with self._cond:
+            self._postponed = False
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Записывает очередь немедленно и ждёт завершения.
+
+        Returns:
+            bool: True, если очередь пуста; False — запись отложена
+            (writer вернул False) или не успела за timeout.
+
+        Raises:
+            Exception: последняя ошибка записи, если очередь так и не записана.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            # попытка, которая заберёт текущую очередь, — следующая после идущей
+            target = self._generation + (2 if self._writing else 1)
+            self._flush_requested = True
+            self._flush_at = time.monotonic()
+            self._cond.notify_all()
+            try:
+                while (self._pending or self._writing) and not self._postponed:
+                    if self._generation >= target and not self._writing and self.last_error is not None:
+                        raise self.last_error
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._flush_requested = False
+            return not self._pending
+
+    def close(self) -> None:
+        """Записывает очередь и останавливает поток."""
+        try:
+            self.flush()
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        """Останавливает поток без записи (повторный вызов безопасен)."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики: записей, операций, ошибок, очередь и последняя ошибка."""
+        with self._cond:
+            return {
+                "writes": self.writes,
+                "ops_submitted": self.ops_submitted,
+                "ops_written": self.ops_written,
+                "pending": len(self._pending),
+                "errors": self.errors,
+                "last_error": repr(self.last_error) if self.last_error else None,
+            }
+
+    def _due(self) -> Optional[float]:
+        """Сколько ещё ждать до записи (0 — пора, None — нечего писать)."""
+        if not self._pending or self._postponed:
+            return None
+        now = time.monotonic()
+        # flush() даёт одну немедленную попытку, дальше повторы идут с паузой
+        deadline = 0.0 if self._flush_requested else min(self._last + self.window,
+                                                         self._first + self.max_delay)
+        if self.last_error is not None and self._last_attempt > self._flush_at:
+            deadline = max(deadline, self._last_attempt + self.retry_delay)
+        return max(0.0, deadline - now)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    due = self._due()
+                    if due == 0.0:
+                        break
+                    self._cond.wait(due)
+                self._inflight, self._pending = self._pending, {}
+                ops = list(self._inflight.values())
+                self._writing = True
+            error = None
+            written = False
+            try:
+                with timer("write_behind.write"):
+                    written = self._write(ops)
+            except Exception as exc:  # операции вернутся в очередь
+                error = exc
+            with self._cond:
+                self._writing = False
+                self._inflight = {}
+                self._generation += 1
+                self._last_attempt = time.monotonic()
+                if written and error is None:
+                    self.writes += 1
+                    self.ops_written += len(ops)
+                    self.last_error = None
+                    count("write_behind.writes")
+                    count("write_behind.ops", len(ops))
+                else:
+                    # вернуть операции в начало: более новые остаются поверх
+                    newer = self._pending
+                    self._pending = {op[1]: op for op in ops}
+                    for key, op in newer.items():
+                        self._pending.pop(key, None)
+                        self._pending[key] = op
+                    if error is not None:
+                        self.errors += 1
+                        self.last_error = error
+                        count("write_behind.errors")
+                    else:
+                        self._postponed = True
+                self._cond.notify_all()
+
+
+_live: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+def close_at_exit(owner: Any) -> None:
+    """Регистрирует владельца очереди: его close() вызовется при выходе."""
+    _live.add(owner)
+
+
+def forget(owner: Any) -> None:
+    """Снимает регистрацию close_at_exit (после явного close())."""
+    _live.discard(owner)
+
+
+@atexit.register
+def _close_all() -> None:
+    """Хук завершения: закрывает владельцев с незаписанными очередями."""
+    for owner in list(_live):
+        try:
+            owner.close()
+        except Exception:
+            pass